@@ -0,0 +1,184 @@
+"""
+基准测试套件 - 依次运行各项基准测试，汇总为一个 JSON 结果
+
+每项测试在独立的子进程中运行（python -m benchmarks.bench_<name>），互不影响
+全局状态和内存统计。结果附带版本信息（git 提交、Python、yt-dlp、平台），
+--compare 与之前保存的结果逐项对比测量值，便于比较不同版本。
+
+运行:
+    python -m benchmarks                         运行全部测试（各测试的默认规模）
+    python -m benchmarks engine history --quick  只运行指定测试，使用较小规模
+    python -m benchmarks --output base.json      结果同时写入文件
+    python -m benchmarks --compare base.json     与之前的结果对比
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 测试名 -> --quick 时的参数
+SUITE: Dict[str, List[str]] = {
+    'engine': ['--parse-rounds', '5', '--size-mb', '16', '--fragments', '50',
+               '--formats-fragments', '600', '--formats-rounds', '5'],
+    'history': ['--records', '10000', '--rounds', '5'],
+    'batch_parse': ['--count', '16', '--latency', '0.1'],
+    'session_pool': ['--count', '50'],
+    'transfer': ['--size-mb', '32'],
+    'cancel': ['--size-mb', '8', '--rounds', '1'],
+    'playlist': ['--count', '500', '--legacy-count', '20', '--duration', '2'],
+    'format_memory': ['--fragments', '600'],
+    'ffmpeg_install': ['--binary-mb', '2', '--docs-mb', '2'],
+    'remux': ['--duration', '2', '--size', '640x360'],
+    'progress': ['--downloads', '5', '--duration', '2'],
+    'startup': ['--repeat', '1'],
+}
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def environment() -> dict:
+    """被测版本和运行环境"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        yt_dlp_version = version('yt-dlp')
+    except PackageNotFoundError:
+        yt_dlp_version = None
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'python': platform.python_version(),
+        'yt_dlp': yt_dlp_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def run_one(name: str, args: List[str], timeout: Optional[float]) -> dict:
+    """在子进程中运行一项测试，返回其 JSON 结果"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            [sys.executable, '-m', f'benchmarks.bench_{name}', *args],
+            cwd=ROOT, env=env, capture_output=True, text=True, encoding='utf-8',
+            errors='replace', timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {'benchmark': name, 'status': 'error', 'error': f'timed out after {timeout}s'}
+    elapsed = time.perf_counter() - start
+    
+    # 结果是 stdout 的最后一行；超出预算等情况退出码非0，但结果仍然有效
+    lines = process.stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, json.JSONDecodeError):
+        return {
+            'benchmark': name,
+            'status': 'error',
+            'exit_code': process.returncode,
+            'error': process.stderr.strip()[-500:],
+        }
+    result.setdefault('status', 'ok')
+    result['exit_code'] = process.returncode
+    result['elapsed_s'] = round(elapsed, 3)
+    return result
+
+
+def flatten(value, prefix: str = '') -> Dict[str, float]:
+    """展开嵌套结果中的数值项，键为以点分隔的路径"""
+    items = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            items.update(flatten(child, f'{prefix}.{key}' if prefix else str(key)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix] = value
+    return items
+
+
+def compare(current: dict, baseline: dict) -> List[dict]:
+    """
+    对比两次运行中同名测试的数值项
+    
+    Returns:
+        对比项列表，change 为相对变化（0.1 表示增大 10%），基准值为0时为 None
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        # 只对比测量值，不对比测试参数
+        base_values = flatten(base.get('results', {}))
+        for path, value in flatten(result.get('results', {})).items():
+            if path not in base_values:
+                continue
+            old = base_values[path]
+            rows.append({
+                'metric': f'{name}.{path}',
+                'baseline': old,
+                'current': value,
+                'change': round((value - old) / abs(old), 4) if old else None,
+            })
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument('names', nargs='*', metavar='name', help=f"测试名: {', '.join(SUITE)}")
+    arg_parser.add_argument('--quick', action='store_true', help='使用较小规模，适合 CI 和快速回归')
+    arg_parser.add_argument('--output', help='结果同时写入该文件')
+    arg_parser.add_argument('--compare', metavar='BASELINE', help='与之前保存的结果对比')
+    arg_parser.add_argument('--timeout', type=float, default=1800, help='单项测试的超时(秒)')
+    args = arg_parser.parse_args()
+    
+    unknown = [name for name in args.names if name not in SUITE]
+    if unknown:
+        arg_parser.error(f"未知的测试: {', '.join(unknown)}")
+    
+    report = {
+        'suite': 'quick' if args.quick else 'full',
+        'environment': environment(),
+        'results': {},
+    }
+    for name in args.names or SUITE:
+        print(f"运行 {name} ...", file=sys.stderr, flush=True)
+        report['results'][name] = run_one(name, SUITE[name] if args.quick else [], args.timeout)
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['baseline'] = dict(baseline.get('environment') or {}, suite=baseline.get('suite'))
+        report['comparison'] = compare(report, baseline)
+    
+    output = json.dumps(report, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    failed = [name for name, result in report['results'].items() if result['status'] == 'error']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
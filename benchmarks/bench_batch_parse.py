@@ -0,0 +1,121 @@
+"""
+基准测试 - 批量解析：固定线程逐个解析与 get_video_info_many 并发解析的对比
+
+替身服务器对每个请求注入延迟，模拟远程站点的响应时间。每个并发数下两种方式使用相同的并发：
+    threads  N 个线程各自阻塞调用 get_video_info（原解析阶段的方式）
+    async    get_video_info_many 以 N 并发解析，结果按完成顺序返回
+分别统计总耗时和第一个结果返回的时间。
+--flaky 时每个页面的第一次请求返回 503，async 会退避重试，threads 直接失败；
+不加 --flaky 时不会发生重试，两种方式只有调度方式不同。
+
+解析本身是CPU密集的（提取器、格式整理），并发数超过CPU核数后第一个结果会推迟，
+比较不同版本时应使用相同的并发数，并参考结果中的 cpu_count。
+
+运行: python -m benchmarks.bench_batch_parse [--count 64] [--latency 0.5] [--concurrency 4 16] [--flaky]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Sequence
+
+from benchmarks.stand_in import StandInServer
+from core.parser import VideoParser
+
+
+def _parser() -> VideoParser:
+    parser = VideoParser()
+    parser.use_cache = False
+    return parser
+
+
+def parse_threads(urls: List[str], workers: int) -> List[float]:
+    """返回每个成功结果的完成时间"""
+    parser = _parser()
+    start = time.perf_counter()
+    done = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parser.get_video_info, url) for url in urls]
+        for future in as_completed(futures):
+            if future.result():
+                done.append(time.perf_counter() - start)
+    return done
+
+
+def parse_async(urls: List[str], concurrency: int, backoff: float = 0.5) -> List[float]:
+    """返回每个成功结果的完成时间"""
+    parser = _parser()
+    start = time.perf_counter()
+    done = []
+    
+    def on_result(url, info):
+        if info:
+            done.append(time.perf_counter() - start)
+    
+    parser.resolve_many(urls, on_result, concurrency=concurrency, backoff=backoff)
+    return done
+
+
+def _summary(done: List[float], elapsed: float, count: int) -> dict:
+    return {
+        'total_s': round(elapsed, 3),
+        'first_result_s': round(min(done), 3) if done else None,
+        'succeeded': len(done),
+        'failed': count - len(done),
+    }
+
+
+def run(
+    count: int = 64,
+    latency: float = 0.5,
+    flaky: bool = False,
+    concurrency: Sequence[int] = (4, 16)
+) -> dict:
+    results = {}
+    with StandInServer(latency=latency, fail_first=1 if flaky else 0) as server:
+        # 预热：导入提取器模块
+        _parser().get_video_info(server.page_url('warmup'))
+        
+        for n in concurrency:
+            modes = (
+                ('threads', lambda urls: parse_threads(urls, n)),
+                # 替身服务器的 503 只出现一次，退避缩短到 0.1 秒
+                ('async', lambda urls: parse_async(urls, n, backoff=0.1)),
+            )
+            level = {}
+            for name, func in modes:
+                urls = [server.page_url(f'{name}-{n}-{i}') for i in range(count)]
+                start = time.perf_counter()
+                done = func(urls)
+                level[name] = _summary(done, time.perf_counter() - start, count)
+            threads, parsed = level['threads'], level['async']
+            level['speedup'] = round(threads['total_s'] / parsed['total_s'], 2)
+            if threads['first_result_s'] and parsed['first_result_s']:
+                level['first_result_speedup'] = round(
+                    threads['first_result_s'] / parsed['first_result_s'], 2
+                )
+            results[str(n)] = level
+    
+    return {
+        'benchmark': 'batch_parse',
+        'count': count,
+        'latency_s': latency,
+        'flaky': flaky,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--count', type=int, default=64)
+    arg_parser.add_argument('--latency', type=float, default=0.5)
+    arg_parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16])
+    arg_parser.add_argument('--flaky', action='store_true')
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.count, args.latency, args.flaky, args.concurrency), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+基准测试 - 取消下载的响应延迟
+
+替身服务器把单连接带宽限制得很低，下载线程大部分时间阻塞在 read() 上。
+下载开始后取消，统计从取消到下载线程退出的耗时及残留的临时文件：
+    hook_only 只设置取消标志，等下一次进度回调时抛出异常（旧方式）
+    token     VideoDownloader.cancel()：关闭连接并清理临时文件
+分别测试单连接下载和快速传输的多连接分段下载。
+
+运行: python -m benchmarks.bench_cancel [--bandwidth-kb 256] [--size-mb 64] [--rounds 3]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+from benchmarks.stand_in import StandInServer
+from core.downloader import VideoDownloader
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def _cancel_once(url: str, fast: bool, method: str, warmup: float) -> dict:
+    output_path = tempfile.mkdtemp(prefix='bench_cancel_')
+    try:
+        downloader = VideoDownloader(output_path)
+        downloader.use_cache = False
+        downloader.fast_transfer = fast
+        started = threading.Event()
+        downloader.add_progress_listener(
+            lambda info: info['status'] == 'downloading' and started.set()
+        )
+        thread = downloader.download_async(url)
+        if not started.wait(30):
+            raise RuntimeError("下载没有开始")
+        time.sleep(warmup)
+        
+        start = time.perf_counter()
+        if method == 'token':
+            downloader.cancel()
+        else:
+            downloader.is_cancelled = True
+        thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'latency_ms': elapsed * 1000,
+            'leftover_files': len(os.listdir(output_path)),
+        }
+    finally:
+        shutil.rmtree(output_path, ignore_errors=True)
+
+
+def run(bandwidth_kb: float = 256, size_mb: int = 64, rounds: int = 3, warmup: float = 0.5) -> dict:
+    results = {}
+    # yt-dlp 的控制台进度输出转到 stderr，stdout 只输出结果
+    with contextlib.redirect_stdout(sys.stderr), \
+            StandInServer(media_size=size_mb * 1024 * 1024, bandwidth=bandwidth_kb * 1024) as server:
+        for mode, fast in (('single', False), ('ranged', True)):
+            for method in ('hook_only', 'token'):
+                samples = [
+                    _cancel_once(server.page_url(f'{mode}-{method}-{i}'), fast, method, warmup)
+                    for i in range(rounds)
+                ]
+                latencies = [s['latency_ms'] for s in samples]
+                results[f'{mode}/{method}'] = {
+                    'latency_ms': {
+                        'p50': round(_percentile(latencies, 0.5), 2),
+                        'max': round(max(latencies), 2),
+                    },
+                    'leftover_files': max(s['leftover_files'] for s in samples),
+                }
+    
+    return {
+        'benchmark': 'cancel',
+        'bandwidth_kb_per_connection': bandwidth_kb,
+        'size_mb': size_mb,
+        'rounds': rounds,
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--bandwidth-kb', type=float, default=256)
+    arg_parser.add_argument('--size-mb', type=int, default=64)
+    arg_parser.add_argument('--rounds', type=int, default=3)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.bandwidth_kb, args.size_mb, args.rounds), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
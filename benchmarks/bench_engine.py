@@ -0,0 +1,200 @@
+"""
+基准测试 - 下载引擎：解析延迟、下载吞吐量和格式表整理耗时
+
+全部在本地替身服务器上离线执行：
+    parse       VideoParser.get_video_info 解析通用提取器网页和 HLS 播放列表的延迟（不使用缓存）
+    download    VideoDownloader.download 下载单文件 MP4 和 N 个分片的 HLS 的吞吐量，并校验文件大小
+    formats     VideoParser._parse_formats 整理大型 info 夹具（每个分片格式 N 个分片）的耗时
+    reselect    解析音视频分离的 DASH 视频（结果写入临时的元数据缓存）后下载 bestaudio，
+                校验下载的是音频流，并且缓存的解析结果可以直接使用（沿用解析时选中的
+                音视频流会下载失败，缓存条目被丢弃后重新提取）
+解析先预热一轮，延迟给出中位数、p95 和最大值（毫秒）。下载只统计传输阶段，推迟的后处理不执行。
+
+运行: python -m benchmarks.bench_engine [--parse-rounds 20] [--size-mb 64] [--fragments 200] [--formats-fragments 600 3000]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List, Sequence
+
+from benchmarks.fixtures import large_info_path
+from benchmarks.stand_in import StandInServer
+import core.downloader
+import core.parser
+from core.cache import MetadataCache
+from core.downloader import VideoDownloader
+from core.parser import VideoParser
+
+
+def summarize(samples: List[float]) -> dict:
+    """耗时样本(秒)的统计，单位毫秒"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        'rounds': len(ordered),
+        'median_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure_parse(url_for: Callable[[int], str], rounds: int) -> dict:
+    """每轮解析一个新地址，避免命中 yt-dlp 或替身服务器的任何缓存"""
+    parser = VideoParser()
+    parser.use_cache = False
+    # 预热一轮：首次解析包含加载提取器等一次性开销
+    parser.get_video_info(url_for(rounds))
+    samples, failures = [], 0
+    for i in range(rounds):
+        start = time.perf_counter()
+        info = parser.get_video_info(url_for(i))
+        elapsed = time.perf_counter() - start
+        if info:
+            samples.append(elapsed)
+        else:
+            failures += 1
+    result = summarize(samples) if samples else {'rounds': 0}
+    result['failures'] = failures
+    return result
+
+
+def measure_download(url: str, expected_size: int) -> dict:
+    output_path = tempfile.mkdtemp(prefix='bench_engine_')
+    try:
+        downloader = VideoDownloader(output_path)
+        downloader.use_cache = False
+        errors = []
+        downloader.set_callbacks(error=errors.append)
+        start = time.perf_counter()
+        filepath = downloader.download(url, defer_postprocess=True)
+        elapsed = time.perf_counter() - start
+        if not filepath:
+            return {'status': 'error', 'error': str(errors[-1] if errors else 'download failed')}
+        size = os.path.getsize(filepath)
+        return {
+            'status': 'ok',
+            'total_s': round(elapsed, 3),
+            'mb_per_s': round(size / 1024 / 1024 / elapsed, 1),
+            'bytes': size,
+            'verified': size == expected_size,
+            'extract_s': round(downloader.timings.get('extract', 0.0), 3),
+            'transfer_s': round(downloader.timings.get('download', 0.0), 3),
+        }
+    finally:
+        shutil.rmtree(output_path, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def _temporary_cache(directory: str):
+    """解析器和下载器临时改用 directory 中的元数据缓存，不读写程序自己的缓存"""
+    cache = MetadataCache(os.path.join(directory, 'metadata_cache.db'))
+    saved = core.parser.metadata_cache, core.downloader.metadata_cache
+    core.parser.metadata_cache = core.downloader.metadata_cache = cache
+    try:
+        yield cache
+    finally:
+        core.parser.metadata_cache, core.downloader.metadata_cache = saved
+
+
+def measure_reselect(server: StandInServer, video_size: int, audio_size: int) -> dict:
+    output_path = tempfile.mkdtemp(prefix='bench_engine_')
+    url = server.dash_url('reselect', video_size, audio_size)
+    try:
+        with _temporary_cache(output_path) as cache:
+            if not VideoParser().get_video_info(url):
+                return {'status': 'error', 'error': 'parse failed'}
+            downloader = VideoDownloader(output_path)
+            errors = []
+            downloader.set_callbacks(error=errors.append)
+            filepath = downloader.download(url, 'bestaudio', defer_postprocess=True)
+            if not filepath:
+                return {'status': 'error', 'error': str(errors[-1] if errors else 'download failed')}
+            with open(filepath, 'rb') as f:
+                data = f.read()
+            # 下载时缓存条目出错会被删除
+            reused = cache.get(url) is not None
+            return {
+                'status': 'ok',
+                'bytes': len(data),
+                'cache_reused': reused,
+                'verified': reused and data == b'A' * audio_size,
+            }
+    finally:
+        shutil.rmtree(output_path, ignore_errors=True)
+
+
+def measure_formats(fragments: int, rounds: int) -> dict:
+    with open(large_info_path(fragments), 'r', encoding='utf-8') as f:
+        formats = json.load(f)['formats']
+    parser = VideoParser()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parsed = parser._parse_formats(formats)
+        samples.append(time.perf_counter() - start)
+    result = summarize(samples)
+    result['input_formats'] = len(formats)
+    result['output_formats'] = len(parsed)
+    return result
+
+
+def run(
+    parse_rounds: int = 20,
+    size_mb: int = 64,
+    fragments: int = 200,
+    fragment_kb: int = 256,
+    formats_fragments: Sequence[int] = (600, 3000),
+    formats_rounds: int = 20
+) -> dict:
+    size = size_mb * 1024 * 1024
+    fragment_size = fragment_kb * 1024
+    results = {}
+    # yt-dlp 的控制台输出转到 stderr，stdout 只输出结果
+    with contextlib.redirect_stdout(sys.stderr), \
+            StandInServer(media_size=size, fragment_size=fragment_size) as server:
+        results['parse'] = {
+            'page': measure_parse(lambda i: server.page_url(f'parse-{i}'), parse_rounds),
+            'hls': measure_parse(lambda i: server.hls_url(f'parse-{i}', fragments), parse_rounds),
+        }
+        results['download'] = {
+            'progressive': measure_download(server.page_url('progressive'), size),
+            'hls': measure_download(server.hls_url('hls', fragments), fragments * fragment_size),
+        }
+        results['reselect'] = measure_reselect(server, 1024 * 1024, 128 * 1024)
+    results['formats'] = {
+        str(n): measure_formats(n, formats_rounds) for n in formats_fragments
+    }
+    
+    return {
+        'benchmark': 'engine',
+        'parse_rounds': parse_rounds,
+        'size_mb': size_mb,
+        'fragments': fragments,
+        'fragment_kb': fragment_kb,
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--parse-rounds', type=int, default=20)
+    arg_parser.add_argument('--size-mb', type=int, default=64)
+    arg_parser.add_argument('--fragments', type=int, default=200)
+    arg_parser.add_argument('--fragment-kb', type=int, default=256)
+    arg_parser.add_argument('--formats-fragments', type=int, nargs='+', default=[600, 3000])
+    arg_parser.add_argument('--formats-rounds', type=int, default=20)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(
+        args.parse_rounds, args.size_mb, args.fragments, args.fragment_kb,
+        args.formats_fragments, args.formats_rounds
+    ), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
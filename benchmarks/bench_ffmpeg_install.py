@@ -0,0 +1,200 @@
+"""
+基准测试 - FFmpeg 安装：下载后整体解压与流式解压、续传、校验的对比
+
+替身服务器提供仿照便携版结构的测试压缩包（bin 下的 ffmpeg/ffprobe/ffplay 和大量文档）
+以及 sha256sum 格式的校验文件：
+    legacy        urlretrieve 保存整个压缩包后 extractall（旧方式）
+    zip           install() 边下载边解压 zip，只写出 ffmpeg/ffprobe
+    zip_streamed  同上，压缩包成员使用数据描述符（流式写出的 zip）
+    tar_xz        同上，tar.xz 压缩包（Linux 版）
+    interrupted   服务器每个响应只发送一部分就断开，下载在同一次调用中续传
+    resumed       已有一半的 .part 文件（上次下载中断），统计本次实际传输的字节数
+    corrupted     校验文件中的哈希不匹配，安装应失败且不改动安装目录
+统计耗时、服务器发送的字节数和写入磁盘的字节数。
+
+运行: python -m benchmarks.bench_ffmpeg_install [--binary-mb 16] [--docs-mb 16]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import urllib.request
+import zipfile
+
+from benchmarks.stand_in import StandInServer
+from utils.ffmpeg_installer import FFmpegBuild, ResumableDownload, install, part_path
+
+
+ROOT = 'ffmpeg-master-latest-stand-in-gpl'
+
+
+def _members(binary_size: int, docs_size: int) -> dict:
+    """压缩包内容：二进制不可压缩，文档可压缩"""
+    members = {
+        f'{ROOT}/LICENSE.txt': b'GPL stand-in\n' * 1000,
+    }
+    for name in ('ffmpeg', 'ffprobe', 'ffplay'):
+        members[f'{ROOT}/bin/{name}'] = os.urandom(binary_size)
+    page = b'<html><body>' + b'FFmpeg documentation stand-in. ' * 2000 + b'</body></html>'
+    for i in range(max(1, docs_size // len(page))):
+        members[f'{ROOT}/doc/page{i}.html'] = page
+    return members
+
+
+def make_zip(members: dict, streamed: bool = False) -> bytes:
+    """生成 zip；streamed 为True时写到不可定位的流，成员带数据描述符"""
+    class Unseekable(io.RawIOBase):
+        def __init__(self):
+            self.buffer = io.BytesIO()
+        
+        def writable(self):
+            return True
+        
+        def write(self, data):
+            return self.buffer.write(data)
+    
+    target = Unseekable() if streamed else io.BytesIO()
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return (target.buffer if streamed else target).getvalue()
+
+
+def make_tar_xz(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:xz', preset=1) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for root, _dirs, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def measure_legacy(server: StandInServer, url: str, work_dir: str) -> dict:
+    base = os.path.join(work_dir, 'legacy')
+    os.makedirs(base)
+    sent = server.file_bytes_sent
+    start = time.perf_counter()
+    zip_path = os.path.join(base, 'ffmpeg_temp.zip')
+    urllib.request.urlretrieve(url, zip_path)
+    with zipfile.ZipFile(zip_path, 'r') as archive:
+        archive.extractall(base)
+    elapsed = time.perf_counter() - start
+    written = _disk_usage(base)
+    return {
+        'seconds': round(elapsed, 3),
+        'bytes_sent': server.file_bytes_sent - sent,
+        'bytes_written': written,
+    }
+
+
+def measure_install(server: StandInServer, build: FFmpegBuild, work_dir: str, name: str) -> dict:
+    dest = os.path.join(work_dir, name, 'ffmpeg')
+    downloads = os.path.join(work_dir, name, 'download')
+    sent = server.file_bytes_sent
+    peak_written = [0]
+    
+    def progress(downloaded, total):
+        # 下载过程中 .part 文件与已解压文件的总大小
+        peak_written[0] = max(peak_written[0], _disk_usage(os.path.join(work_dir, name)))
+    
+    start = time.perf_counter()
+    try:
+        extracted = install(build, dest, downloads, progress)
+        error = None
+    except Exception as e:
+        extracted, error = [], f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    result = {
+        'seconds': round(elapsed, 3),
+        'bytes_sent': server.file_bytes_sent - sent,
+        'peak_bytes_on_disk': peak_written[0],
+        'installed': sorted(os.listdir(os.path.join(dest, 'bin'))) if os.path.isdir(dest) else [],
+        'extracted': sorted(extracted),
+        'download_dir_left': os.path.exists(downloads) and bool(os.listdir(downloads)),
+    }
+    if error:
+        result['error'] = error
+    return result
+
+
+def run(binary_mb: float = 16, docs_mb: float = 16) -> dict:
+    members = _members(int(binary_mb * 1024 * 1024), int(docs_mb * 1024 * 1024))
+    archives = {
+        'stand-in.zip': make_zip(members),
+        'stand-in-streamed.zip': make_zip(members, streamed=True),
+        'stand-in.tar.xz': make_tar_xz(members),
+    }
+    checksums = ''.join(
+        f'{hashlib.sha256(data).hexdigest()}  {name}\n' for name, data in archives.items()
+    ).encode('utf-8')
+    work_dir = tempfile.mkdtemp(prefix='bench_ffmpeg_install_')
+    results = {}
+    try:
+        with StandInServer() as server:
+            urls = {name: server.add_file(name, data) for name, data in archives.items()}
+            checksum_url = server.add_file('checksums.sha256', checksums)
+            bad_checksum_url = server.add_file(
+                'bad.sha256', checksums.replace(checksums[:8], b'0' * 8, 1)
+            )
+            zip_build = FFmpegBuild([urls['stand-in.zip']], checksum_url)
+            
+            results['legacy'] = measure_legacy(server, urls['stand-in.zip'], work_dir)
+            results['zip'] = measure_install(server, zip_build, work_dir, 'zip')
+            results['zip_streamed'] = measure_install(
+                server, FFmpegBuild([urls['stand-in-streamed.zip']], checksum_url), work_dir, 'zip_streamed'
+            )
+            results['tar_xz'] = measure_install(
+                server, FFmpegBuild([urls['stand-in.tar.xz']], checksum_url), work_dir, 'tar_xz'
+            )
+            
+            size = len(archives['stand-in.zip'])
+            server.drop_after = size // 3 + 1
+            results['interrupted'] = measure_install(server, zip_build, work_dir, 'interrupted')
+            server.drop_after = None
+            
+            # 上次下载读到一半时退出
+            downloads = os.path.join(work_dir, 'resumed', 'download')
+            partial = ResumableDownload(urls['stand-in.zip'], part_path(downloads, urls['stand-in.zip'])).open()
+            while partial.position < size // 2:
+                partial.read(partial.chunk_size)
+            partial.close()
+            results['resumed'] = measure_install(server, zip_build, work_dir, 'resumed')
+            
+            results['corrupted'] = measure_install(
+                server, FFmpegBuild([urls['stand-in.zip']], bad_checksum_url), work_dir, 'corrupted'
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    return {
+        'benchmark': 'ffmpeg_install',
+        'archive_bytes': {name: len(data) for name, data in archives.items()},
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--binary-mb', type=float, default=16)
+    arg_parser.add_argument('--docs-mb', type=float, default=16)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.binary_mb, args.docs_mb), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
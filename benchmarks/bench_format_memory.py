@@ -0,0 +1,89 @@
+"""
+基准测试 - 解析结果中保留 raw_formats 与 FormatTable 的内存占用对比
+
+运行: python -m benchmarks.bench_format_memory [--fragments 600]
+"""
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.fixtures import large_info_path
+from core.formats import FormatTable
+from core.parser import VideoParser
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_raw(parser, info, path):
+    """旧结构：解析结果保留完整 formats 列表"""
+    return {
+        'formats': parser._parse_formats(info['formats']),
+        'raw_formats': info['formats'],
+    }
+
+
+def build_table(parser, info, path):
+    """新结构：只保留格式表，原始格式按需读取"""
+    return {
+        'formats': parser._parse_formats(info['formats']),
+        'format_table': FormatTable.from_formats(
+            info['formats'],
+            loader=lambda: _load(path)['formats']
+        ),
+    }
+
+
+def retained_bytes(build, parser, path):
+    """测量解析结果在原始 info 释放后仍然占用的内存"""
+    gc.collect()
+    tracemalloc.start()
+    info = _load(path)
+    result = build(parser, info, path)
+    del info
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def run(fragments: int = 600) -> dict:
+    path = large_info_path(fragments)
+    parser = VideoParser()
+    
+    results = {}
+    for name, build in (('raw_formats', build_raw), ('format_table', build_table)):
+        result, current, peak = retained_bytes(build, parser, path)
+        results[name] = {'retained_bytes': current, 'peak_bytes': peak}
+    
+    table = result['format_table']
+    start = time.perf_counter()
+    raw = table.get_raw(table.records[-1].format_id)
+    results['format_table']['get_raw_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    assert raw is not None
+    
+    return {
+        'benchmark': 'format_memory',
+        'fixture_bytes': os.path.getsize(path),
+        'formats': len(table),
+        'results': results,
+        'reduction': round(
+            results['raw_formats']['retained_bytes'] / results['format_table']['retained_bytes'], 1
+        ),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--fragments', type=int, default=600)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.fragments), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+基准测试 - 下载历史：不同记录数下的写入与查询耗时
+
+每个规模使用临时数据库（不限制记录数），依次测量：
+    add         add_record 逐条加入全部记录的耗时，以及 flush 等到全部写入数据库的总耗时
+    reopen      重新打开数据库（建立去重索引）的耗时
+    search      search_history 搜索常见词、罕见词和不存在的词（取前 50 条）
+    count       count 统计搜索结果数
+    page        get_history 读取第一页和中间一页
+    downloaded  is_downloaded 判断链接是否已下载（check_file=False）
+查询耗时给出中位数、p95 和最大值（毫秒）。
+
+运行: python -m benchmarks.bench_history [--records 10000 100000] [--rounds 20]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Sequence
+
+from benchmarks.bench_engine import summarize
+from utils.history_manager import HistoryManager
+
+
+WORDS = [
+    '教程', '音乐', '游戏', '直播', '旅行', '美食', '科技', '电影', '新闻', '体育',
+    'tutorial', 'music', 'gaming', 'review', 'travel', 'cooking', 'science', 'trailer',
+]
+PLATFORMS = ['YouTube', 'Bilibili', 'Twitter', 'TikTok', 'Instagram']
+
+# 搜索词：常见、罕见（只出现在一条记录中）、不存在
+KEYWORDS = {
+    'common': 'music',
+    'rare': 'rare-record-7',
+    'missing': 'no-such-title',
+}
+
+
+def _title(rng: random.Random, i: int) -> str:
+    words = ' '.join(rng.choice(WORDS) for _ in range(4))
+    return f"{words} #{i}"
+
+
+def _timed(func, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def measure(records: int, rounds: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    work_dir = tempfile.mkdtemp(prefix='bench_history_')
+    db_path = os.path.join(work_dir, 'download_history.db')
+    try:
+        manager = HistoryManager(db_path, max_records=None)
+        manager.wait_loaded()
+        start = time.perf_counter()
+        for i in range(records):
+            manager.add_record(
+                f'https://www.youtube.com/watch?v=v{i:010d}',
+                'rare-record-7' if i == records // 2 else _title(rng, i),
+                rng.choice(PLATFORMS),
+                os.path.join(work_dir, f'v{i}.mp4'),
+                duration=rng.randint(10, 3600),
+                quality='1080p',
+            )
+        enqueued = time.perf_counter() - start
+        manager.flush()
+        written = time.perf_counter() - start
+        manager.close()
+        
+        start = time.perf_counter()
+        manager = HistoryManager(db_path, max_records=None)
+        manager.wait_loaded()
+        reopened = time.perf_counter() - start
+        
+        probe_url = f'https://youtu.be/v{records // 3:010d}'
+        result = {
+            'add': {
+                'enqueue_s': round(enqueued, 3),
+                'written_s': round(written, 3),
+                'records_per_s': round(records / written),
+            },
+            'reopen_s': round(reopened, 3),
+            'search': {
+                name: _timed(lambda k=keyword: manager.search_history(k, limit=50), rounds)
+                for name, keyword in KEYWORDS.items()
+            },
+            'count': {
+                name: _timed(lambda k=keyword: manager.count(k), rounds)
+                for name, keyword in KEYWORDS.items()
+            },
+            'page': {
+                'first': _timed(lambda: manager.get_history(50), rounds),
+                'middle': _timed(lambda: manager.get_history(50, records // 2), rounds),
+            },
+            'downloaded': _timed(lambda: manager.is_downloaded(probe_url, check_file=False), rounds),
+            'downloaded_hit': manager.is_downloaded(probe_url, check_file=False) is not None,
+            'stored': manager.count(),
+        }
+        manager.close()
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run(records: Sequence[int] = (10000, 100000), rounds: int = 20) -> dict:
+    return {
+        'benchmark': 'history',
+        'rounds': rounds,
+        'results': {str(n): measure(n, rounds) for n in records},
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--records', type=int, nargs='+', default=[10000, 100000])
+    arg_parser.add_argument('--rounds', type=int, default=20)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.records, args.rounds), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
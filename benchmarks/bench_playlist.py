@@ -0,0 +1,101 @@
+"""
+基准测试 - 播放列表：完整解析后再下载与平面展开边展开边下载的对比
+
+替身服务器提供 RSS 播放列表，每个条目是一个视频页面：
+    legacy     get_video_info 解析整个列表（逐个解析所有条目），返回后才能开始下载
+    streaming  DownloadScheduler.submit_playlist 平面展开，条目逐个进入调度器
+streaming 统计第一个下载完成的时间，以及运行期间同时存在的未结束任务数的峰值。
+
+运行: python -m benchmarks.bench_playlist [--count 10000] [--legacy-count 200] [--duration 5]
+"""
+import argparse
+import contextlib
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.stand_in import StandInServer
+from core.parser import VideoParser
+from core.scheduler import DownloadScheduler, DownloadJob
+
+
+def measure_legacy(server: StandInServer, count: int) -> dict:
+    parser = VideoParser()
+    parser.use_cache = False
+    start = time.perf_counter()
+    info = parser.get_video_info(server.feed_url('legacy', count))
+    return {
+        'entries': count,
+        'first_download_start_s': round(time.perf_counter() - start, 3),
+        'parsed': info is not None,
+    }
+
+
+def measure_streaming(server: StandInServer, count: int, duration: float) -> dict:
+    output_path = tempfile.mkdtemp(prefix='bench_playlist_')
+    parser = VideoParser()
+    parser.use_cache = False
+    scheduler = DownloadScheduler(parser=parser, output_path=output_path)
+    first_completed = threading.Event()
+    completed = [0]
+    
+    def on_finished(job: DownloadJob):
+        if job.state == DownloadJob.COMPLETED:
+            completed[0] += 1
+            first_completed.set()
+    
+    try:
+        start = time.perf_counter()
+        scheduler.submit_playlist(server.feed_url('streaming', count), on_finished=on_finished)
+        first_completed.wait(60)
+        first_s = time.perf_counter() - start
+        
+        peak = 0
+        deadline = start + duration
+        while time.perf_counter() < deadline:
+            with scheduler._lock:
+                peak = max(peak, sum(1 for job in scheduler._jobs if not job.is_finished))
+            time.sleep(0.05)
+    finally:
+        scheduler.shutdown()
+        shutil.rmtree(output_path, ignore_errors=True)
+    
+    return {
+        'entries': count,
+        'first_download_completed_s': round(first_s, 3),
+        'completed_in_window': completed[0],
+        'peak_unfinished_jobs': peak,
+    }
+
+
+def run(count: int = 10000, legacy_count: int = 200, duration: float = 5, latency: float = 0.02) -> dict:
+    # yt-dlp 的控制台进度输出转到 stderr，stdout 只输出结果
+    with contextlib.redirect_stdout(sys.stderr), \
+            StandInServer(latency=latency, media_size=256 * 1024) as server:
+        results = {
+            'legacy': measure_legacy(server, legacy_count),
+            'streaming': measure_streaming(server, count, duration),
+        }
+    return {
+        'benchmark': 'playlist',
+        'latency_s': latency,
+        'window_s': duration,
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--count', type=int, default=10000)
+    arg_parser.add_argument('--legacy-count', type=int, default=200)
+    arg_parser.add_argument('--duration', type=float, default=5)
+    arg_parser.add_argument('--latency', type=float, default=0.02)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.count, args.legacy_count, args.duration, args.latency), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+基准测试 - 进度刷新方式对 Tk 事件循环延迟的影响
+
+N 个模拟下载线程以固定频率调用 VideoDownloader._progress_hook：
+    per_hook   每次回调 after(0, ...) 更新一次标签（旧方式）
+    aggregated 回调写入进度槽，100ms 定时器批量更新所有标签
+同时每 10ms 投递一个探测事件，统计它实际被执行的延迟。
+没有显示器时结果为 skipped。
+
+运行: python -m benchmarks.bench_progress [--downloads 20] [--rate 300] [--duration 5]
+"""
+import argparse
+import json
+import threading
+import time
+from typing import List
+
+from core.downloader import VideoDownloader
+from core.progress import ProgressAggregator
+
+
+PROBE_INTERVAL_MS = 10
+REFRESH_INTERVAL_MS = 100
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def _simulate(downloader: VideoDownloader, rate: float, stop: threading.Event):
+    """以 rate 次/秒的频率调用进度钩子"""
+    total = 500 * 1024 * 1024
+    downloaded = 0
+    interval = 1.0 / rate
+    next_time = time.perf_counter()
+    while not stop.is_set():
+        downloaded = (downloaded + 64 * 1024) % total
+        downloader._progress_hook({
+            'status': 'downloading',
+            'downloaded_bytes': downloaded,
+            'total_bytes': total,
+            'speed': 8 * 1024 * 1024,
+            'eta': 10,
+            'filename': 'video.mp4',
+        })
+        next_time += interval
+        delay = next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def measure(mode: str, downloads: int, rate: float, duration: float) -> dict:
+    import tkinter as tk
+    
+    root = tk.Tk()
+    root.withdraw()
+    labels = [tk.Label(root, text='0%') for _ in range(downloads)]
+    for label in labels:
+        label.pack()
+    
+    updates = [0]
+    aggregator = ProgressAggregator()
+    downloaders = []
+    for i in range(downloads):
+        downloader = VideoDownloader(output_path='.')
+        if mode == 'per_hook':
+            def progress(info, label=labels[i]):
+                def apply():
+                    updates[0] += 1
+                    label.configure(text=f"{info['percent']:.1f}%")
+                root.after(0, apply)
+            downloader.set_callbacks(progress=progress)
+        else:
+            downloader.progress_slot = aggregator.register(i)
+        downloaders.append(downloader)
+    
+    def refresh():
+        for i, slot in aggregator.changed():
+            updates[0] += 1
+            labels[i].configure(text=f"{slot.percent:.1f}%")
+        root.after(REFRESH_INTERVAL_MS, refresh)
+    
+    lags: List[float] = []
+    
+    def probe(expected: float):
+        lags.append((time.perf_counter() - expected) * 1000)
+        root.after(PROBE_INTERVAL_MS, probe, time.perf_counter() + PROBE_INTERVAL_MS / 1000)
+    
+    if mode == 'aggregated':
+        root.after(REFRESH_INTERVAL_MS, refresh)
+    root.after(PROBE_INTERVAL_MS, probe, time.perf_counter() + PROBE_INTERVAL_MS / 1000)
+    
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_simulate, args=(d, rate, stop), daemon=True)
+        for d in downloaders
+    ]
+    for thread in threads:
+        thread.start()
+    root.after(int(duration * 1000), root.quit)
+    root.mainloop()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    root.destroy()
+    
+    return {
+        'probe_lag_ms': {
+            'p50': round(_percentile(lags, 0.5), 2),
+            'p99': round(_percentile(lags, 0.99), 2),
+            'max': round(max(lags), 2),
+        },
+        'probes': len(lags),
+        'label_updates': updates[0],
+    }
+
+
+def run(downloads: int = 20, rate: float = 300, duration: float = 5) -> dict:
+    result = {
+        'benchmark': 'progress',
+        'downloads': downloads,
+        'hook_rate_per_download': rate,
+        'duration_s': duration,
+    }
+    try:
+        result['results'] = {
+            mode: measure(mode, downloads, rate, duration)
+            for mode in ('per_hook', 'aggregated')
+        }
+        result['status'] = 'ok'
+    except Exception as e:
+        # 没有显示器或缺少 Tk 时无法测量
+        result['status'] = 'skipped'
+        result['reason'] = str(e)
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--downloads', type=int, default=20)
+    arg_parser.add_argument('--rate', type=float, default=300)
+    arg_parser.add_argument('--duration', type=float, default=5)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.downloads, args.rate, args.duration), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+基准测试 - 输出格式转换：转码与按编码选择的重新封装的对比
+
+用 ffmpeg 的 lavfi 测试源在本地生成测试片段（h264/aac 的 mp4、vp9/opus 的 mkv），
+对每个场景分别执行：
+    transcode  FFmpegVideoConvertor（旧方式，非 mp4 输出一律转码）
+    chosen     VideoDownloader 按实际编码选择的后处理器（兼容时为 FFmpegVideoRemuxer）
+统计墙钟时间和 ffmpeg 子进程消耗的CPU时间（用户态+内核态）。
+找不到 ffmpeg 时结果为 skipped。
+
+运行: python -m benchmarks.bench_remux [--duration 10] [--size 1280x720] [--rounds 1]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from core.downloader import VideoDownloader
+from utils.ffmpeg_manager import ffmpeg_manager
+
+
+# 测试片段：文件名 -> (编码参数, info 中的 vcodec, acodec)
+CLIPS = {
+    'h264_aac.mp4': (
+        ['-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-c:a', 'aac'],
+        'avc1.64001F', 'mp4a.40.2',
+    ),
+    'vp9_opus.mkv': (
+        ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8', '-b:v', '1M', '-c:a', 'libopus'],
+        'vp09.00.40.08', 'opus',
+    ),
+}
+
+# 场景：(测试片段, 目标容器)
+SCENARIOS = (
+    ('h264_aac.mp4', 'mkv'),
+    ('h264_aac.mp4', 'mov'),
+    ('vp9_opus.mkv', 'webm'),
+)
+
+
+def _find_ffmpeg() -> Optional[str]:
+    capabilities = ffmpeg_manager.probe()
+    return capabilities.ffmpeg if capabilities is not None else None
+
+
+def generate_clip(ffmpeg: str, path: str, codec_args: List[str], duration: float, size: str):
+    subprocess.run(
+        [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=30:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={duration}',
+            *codec_args, '-shortest', path,
+        ],
+        check=True, capture_output=True,
+    )
+
+
+def _children_cpu() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def measure(ydl, key: str, source: str, info: Dict, target: str, rounds: int) -> dict:
+    from yt_dlp.postprocessor import get_postprocessor
+    
+    walls, cpus = [], []
+    for _ in range(rounds):
+        pp = get_postprocessor(key)(ydl, preferedformat=target)
+        cpu_start = _children_cpu()
+        start = time.perf_counter()
+        _files, result = pp.run(dict(info, filepath=source))
+        walls.append(time.perf_counter() - start)
+        cpus.append(_children_cpu() - cpu_start)
+        os.remove(result['filepath'])
+    return {
+        'postprocessor': key,
+        'wall_s': round(min(walls), 3),
+        'cpu_s': round(min(cpus), 3),
+    }
+
+
+def run(duration: float = 10, size: str = '1280x720', rounds: int = 1) -> dict:
+    result = {
+        'benchmark': 'remux',
+        'clip_duration_s': duration,
+        'clip_size': size,
+        'rounds': rounds,
+    }
+    ffmpeg = _find_ffmpeg()
+    if ffmpeg is None:
+        result['status'] = 'skipped'
+        result['reason'] = 'ffmpeg not found'
+        return result
+    
+    import yt_dlp
+    
+    work_dir = tempfile.mkdtemp(prefix='bench_remux_')
+    results = {}
+    try:
+        # yt-dlp 的后处理输出转到 stderr，stdout 只输出结果
+        with contextlib.redirect_stdout(sys.stderr), yt_dlp.YoutubeDL({
+            'quiet': True,
+            'ffmpeg_location': os.path.dirname(ffmpeg),
+        }) as ydl:
+            for clip, target in SCENARIOS:
+                codec_args, vcodec, acodec = CLIPS[clip]
+                name = f"{os.path.splitext(clip)[0]}_to_{target}"
+                source = os.path.join(work_dir, clip)
+                try:
+                    if not os.path.exists(source):
+                        generate_clip(ffmpeg, source, codec_args, duration, size)
+                except subprocess.CalledProcessError as e:
+                    # 缺少对应编码器的 ffmpeg 构建
+                    results[name] = {'status': 'skipped', 'reason': e.stderr.decode(errors='replace').strip()[-300:]}
+                    continue
+                
+                info = {'ext': os.path.splitext(clip)[1][1:], 'vcodec': vcodec, 'acodec': acodec}
+                downloader = VideoDownloader(work_dir)
+                downloader.output_format = target
+                chosen = downloader._container_postprocessors(
+                    [{'key': 'FFmpegVideoConvertor', 'preferedformat': target}], [info]
+                )[0]['key']
+                
+                transcode = measure(ydl, 'FFmpegVideoConvertor', source, info, target, rounds)
+                selected = measure(ydl, chosen, source, info, target, rounds)
+                results[name] = {
+                    'status': 'ok',
+                    'transcode': transcode,
+                    'chosen': selected,
+                    'wall_speedup': round(transcode['wall_s'] / max(selected['wall_s'], 1e-6), 1),
+                    'cpu_saved_s': round(transcode['cpu_s'] - selected['cpu_s'], 3),
+                }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    result['status'] = 'ok'
+    result['results'] = results
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--duration', type=float, default=10)
+    arg_parser.add_argument('--size', default='1280x720')
+    arg_parser.add_argument('--rounds', type=int, default=1)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.duration, args.size, args.rounds), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+基准测试 - 每次新建 YoutubeDL 与会话池复用的解析耗时对比
+
+运行: python -m benchmarks.bench_session_pool [--count 200]
+"""
+import argparse
+import json
+import time
+
+import yt_dlp
+
+from benchmarks.stand_in import StandInServer
+from core.session import YoutubeDLPool
+
+
+YDL_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': False,
+}
+
+
+def parse_fresh(urls):
+    """旧路径：每个URL构造一个新的 YoutubeDL"""
+    for url in urls:
+        with yt_dlp.YoutubeDL(YDL_OPTS) as ydl:
+            ydl.extract_info(url, download=False)
+
+
+def parse_pooled(urls):
+    """新路径：从会话池借出实例"""
+    pool = YoutubeDLPool()
+    for url in urls:
+        with pool.session(YDL_OPTS) as ydl:
+            ydl.extract_info(url, download=False)
+    pool.close_all()
+
+
+def run(count: int = 200) -> dict:
+    with StandInServer() as server:
+        urls = [server.page_url(i) for i in range(count)]
+        # 预热：导入提取器模块
+        parse_fresh(urls[:1])
+        
+        results = {}
+        for name, func in (('fresh', parse_fresh), ('pooled', parse_pooled)):
+            start = time.perf_counter()
+            func(urls)
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'total_s': round(elapsed, 4),
+                'per_url_ms': round(elapsed / count * 1000, 3),
+            }
+    
+    return {
+        'benchmark': 'session_pool',
+        'count': count,
+        'results': results,
+        'speedup': round(results['fresh']['total_s'] / results['pooled']['total_s'], 2),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--count', type=int, default=200)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.count), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+基准测试 - 单连接下载与快速传输（多连接分段下载）的耗时对比
+
+替身服务器对每个请求注入延迟并限制单连接带宽，模拟远程CDN。
+两种模式都走完整的 VideoDownloader.download 流程，并校验下载内容。
+
+运行: python -m benchmarks.bench_transfer [--size-mb 300] [--latency 0.05] [--bandwidth-mb 50]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.stand_in import StandInServer
+from core.downloader import VideoDownloader
+
+
+def _verify(filepath: str, size: int) -> bool:
+    """校验文件内容：第 i 个字节应为 i % 256"""
+    if os.path.getsize(filepath) != size:
+        return False
+    expected = bytes(range(256)) * 4096
+    with open(filepath, 'rb') as f:
+        while True:
+            data = f.read(len(expected))
+            if not data:
+                return True
+            if data != expected[:len(data)]:
+                return False
+
+
+def _download(url: str, output_path: str, fast: bool, connections: int) -> str:
+    downloader = VideoDownloader(output_path)
+    downloader.use_cache = False
+    downloader.fast_transfer = fast
+    downloader.ranged_connections = connections
+    errors = []
+    downloader.set_callbacks(error=errors.append)
+    filepath = downloader.download(url)
+    if not filepath:
+        raise RuntimeError(f"下载失败: {errors}")
+    return filepath
+
+
+def run(
+    size_mb: int = 300,
+    latency: float = 0.05,
+    bandwidth_mb: float = 50,
+    connections: int = 4
+) -> dict:
+    size = size_mb * 1024 * 1024
+    results = {}
+    # yt-dlp 的控制台进度输出转到 stderr，stdout 只输出结果
+    with contextlib.redirect_stdout(sys.stderr), \
+            StandInServer(latency=latency, media_size=size, bandwidth=bandwidth_mb * 1024 * 1024) as server:
+        for name, fast in (('single', False), ('fast', True)):
+            output_path = tempfile.mkdtemp(prefix='bench_transfer_')
+            try:
+                start = time.perf_counter()
+                filepath = _download(server.page_url(name), output_path, fast, connections)
+                elapsed = time.perf_counter() - start
+                results[name] = {
+                    'total_s': round(elapsed, 3),
+                    'mb_per_s': round(size_mb / elapsed, 1),
+                    'verified': _verify(filepath, size),
+                }
+            finally:
+                shutil.rmtree(output_path, ignore_errors=True)
+    
+    return {
+        'benchmark': 'transfer',
+        'size_mb': size_mb,
+        'latency_s': latency,
+        'bandwidth_mb_per_connection': bandwidth_mb,
+        'connections': connections,
+        'results': results,
+        'speedup': round(results['single']['total_s'] / results['fast']['total_s'], 2),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--size-mb', type=int, default=300)
+    arg_parser.add_argument('--latency', type=float, default=0.05)
+    arg_parser.add_argument('--bandwidth-mb', type=float, default=50)
+    arg_parser.add_argument('--connections', type=int, default=4)
+    args = arg_parser.parse_args()
+    print(json.dumps(run(args.size_mb, args.latency, args.bandwidth_mb, args.connections), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+基准测试数据 - 生成大型 info JSON 等测试夹具
+"""
+import json
+import os
+import random
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+HEIGHTS = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+VCODECS = ['avc1.640028', 'vp09.00.40.08', 'av01.0.08M.08']
+FPS = [30, 60]
+PROTOCOLS = ['https', 'm3u8_native', 'http_dash_segments']
+
+
+def make_large_info(fragments: int = 600, seed: int = 0) -> dict:
+    """
+    构造一个类似 YouTube 的大型 info 字典
+    
+    Args:
+        fragments: 每个分片格式的分片数量
+        seed: 随机种子，保证结果可重复
+    """
+    rng = random.Random(seed)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-us,en;q=0.5',
+        'Sec-Fetch-Mode': 'navigate',
+    }
+    base_url = 'https://rr1---sn-stand-in.googlevideo.com/videoplayback?' + 'x' * 900
+    
+    formats = []
+    for i in range(24):
+        formats.append({
+            'format_id': f'a{i}',
+            'ext': 'm4a' if i % 2 else 'webm',
+            'vcodec': 'none',
+            'acodec': 'mp4a.40.2' if i % 2 else 'opus',
+            'abr': 48 + i * 8,
+            'tbr': 48 + i * 8,
+            'filesize': rng.randint(1, 10) * 1_000_000,
+            'url': f'{base_url}&itag=a{i}',
+            'protocol': 'https',
+            'http_headers': dict(headers),
+        })
+    
+    for height in HEIGHTS:
+        for vcodec in VCODECS:
+            for fps in FPS:
+                for protocol in PROTOCOLS:
+                    format_id = f'{height}-{vcodec.split(".")[0]}-{fps}-{protocol}'
+                    tbr = height * fps / 30 * rng.uniform(2.0, 4.0)
+                    fmt = {
+                        'format_id': format_id,
+                        'ext': 'webm' if vcodec.startswith('vp09') else 'mp4',
+                        'width': height * 16 // 9,
+                        'height': height,
+                        'fps': fps,
+                        'vcodec': vcodec,
+                        'acodec': 'none',
+                        'tbr': round(tbr, 3),
+                        'filesize': int(tbr * 1000 / 8 * 600) if protocol == 'https' else None,
+                        'filesize_approx': int(tbr * 1000 / 8 * 600),
+                        'url': f'{base_url}&itag={format_id}',
+                        'protocol': protocol,
+                        'http_headers': dict(headers),
+                    }
+                    if protocol != 'https':
+                        fmt['fragment_base_url'] = base_url
+                        fmt['fragments'] = [
+                            {'url': f'{base_url}&sq={n}', 'duration': 5.005}
+                            for n in range(fragments)
+                        ]
+                    formats.append(fmt)
+    
+    return {
+        'id': 'standin00001',
+        'title': 'Stand-in large video',
+        'extractor': 'youtube',
+        'extractor_key': 'Youtube',
+        'webpage_url': 'https://www.youtube.com/watch?v=standin00001',
+        'duration': 3000,
+        'formats': formats,
+    }
+
+
+def large_info_path(fragments: int = 600) -> str:
+    """返回大型 info JSON 夹具路径，不存在时生成"""
+    path = os.path.join(DATA_DIR, f'large_info_{fragments}.json')
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_large_info(fragments), f)
+    return path
@@ -0,0 +1,334 @@
+"""
+本地HTTP替身服务器 - 离线基准测试使用的假视频站点
+"""
+import hashlib
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """替身站点请求处理"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self._dispatch(head=True)
+    
+    def do_GET(self):
+        self._dispatch(head=False)
+    
+    def _dispatch(self, head: bool):
+        server = self.server.stand_in
+        if server.latency:
+            time.sleep(server.latency)
+        
+        path, _, query = self.path.partition('?')
+        match = re.fullmatch(r'/page/([\w-]+)\.html', path)
+        if match:
+            if server.should_fail(path):
+                return self.send_error(503)
+            return self._send_page(match.group(1), head)
+        match = re.fullmatch(r'/media/([\w-]+)\.mp4', path)
+        if match:
+            return self._send_media(server.media_size, head)
+        match = re.fullmatch(r'/feed/([\w-]+)\.rss', path)
+        if match:
+            count = re.search(r'count=(\d+)', query)
+            return self._send_feed(match.group(1), int(count.group(1)) if count else 10, head)
+        match = re.fullmatch(r'/hls/([\w-]+)\.m3u8', path)
+        if match:
+            count = re.search(r'fragments=(\d+)', query)
+            return self._send_playlist(match.group(1), int(count.group(1)) if count else 10, head)
+        match = re.fullmatch(r'/hls/[\w-]+/(\d+)\.ts', path)
+        if match:
+            return self._send_fragment(int(match.group(1)), head)
+        match = re.fullmatch(r'/files/([\w.-]+)', path)
+        if match and match.group(1) in server.files:
+            return self._send_file(server.files[match.group(1)], head)
+        self.send_error(404)
+    
+    def _send_page(self, video_id: str, head: bool):
+        body = (
+            '<!DOCTYPE html><html><head>'
+            f'<title>Stand-in video {video_id}</title>'
+            f'<meta property="og:title" content="Stand-in video {video_id}">'
+            '</head><body>'
+            f'<video src="/media/{video_id}.mp4" width="1280" height="720"></video>'
+            '</body></html>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def _send_feed(self, feed_id: str, count: int, head: bool):
+        server = self.server.stand_in
+        items = ''.join(
+            f'<item><title>Stand-in video {feed_id}-{i}</title>'
+            f'<link>{server.page_url(f"{feed_id}-{i}")}</link></item>'
+            for i in range(count)
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f'<title>Stand-in feed {feed_id}</title>{items}</channel></rss>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def _send_playlist(self, video_id: str, count: int, head: bool):
+        duration = self.server.stand_in.fragment_duration
+        lines = [
+            '#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-PLAYLIST-TYPE:VOD',
+            f'#EXT-X-TARGETDURATION:{int(duration + 0.999)}', '#EXT-X-MEDIA-SEQUENCE:0',
+        ]
+        for i in range(count):
+            lines.append(f'#EXTINF:{duration:.3f},')
+            lines.append(f'{video_id}/{i}.ts')
+        lines.append('#EXT-X-ENDLIST')
+        body = ('\n'.join(lines) + '\n').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+    
+    def _send_fragment(self, index: int, head: bool):
+        server = self.server.stand_in
+        size = server.fragment_size
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp2t')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        if head:
+            return
+        # 分片内容与分片序号有关，拼接错位时可以发现
+        offset = index % 256
+        try:
+            remaining = size
+            while remaining > 0:
+                n = min(remaining, len(server.chunk) - 256)
+                self.wfile.write(server.chunk[offset:offset + n])
+                remaining -= n
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def _send_file(self, data: bytes, head: bool):
+        server = self.server.stand_in
+        etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+        start = 0
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range') or '')
+        if_range = self.headers.get('If-Range')
+        if match and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(data)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        if head:
+            return
+        
+        body = data[start:]
+        if server.drop_after is not None and len(body) > server.drop_after:
+            # 模拟连接中断：只发送一部分后关闭连接
+            body = body[:server.drop_after]
+            self.close_connection = True
+        try:
+            self.wfile.write(body)
+            with server._failures_lock:
+                server.file_bytes_sent += len(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def _send_media(self, size: int, head: bool):
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), size - 1)
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if head:
+            return
+        
+        server = self.server.stand_in
+        chunk = server.chunk
+        position = start
+        remaining = end - start + 1
+        started = time.monotonic()
+        try:
+            while remaining > 0:
+                # 内容只与文件内偏移有关，分段下载拼接后与整体下载一致
+                offset = position % 256
+                n = min(remaining, len(chunk) - 256)
+                self.wfile.write(chunk[offset:offset + n])
+                position += n
+                remaining -= n
+                if server.bandwidth:
+                    # 按单连接带宽限速
+                    delay = (position - start) / server.bandwidth - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class StandInServer:
+    """本地替身服务器
+    
+    /page/<id>.html  带 <video> 标签的网页，可由 yt-dlp 通用提取器解析
+    /media/<id>.mp4  固定大小的假视频数据，支持 Range 请求
+    /feed/<id>.rss   包含 count 个视频页面的 RSS 播放列表
+    /hls/<id>.m3u8   包含 fragments 个分片的 HLS 点播列表，分片为 /hls/<id>/<i>.ts
+    /files/<name>    add_file 登记的文件，支持 Range 和 If-Range；
+                     dash_url 登记的 DASH 清单及其音频、视频流也在这里
+    """
+    
+    def __init__(
+        self,
+        latency: float = 0.0,
+        media_size: int = 1024 * 1024,
+        bandwidth: Optional[float] = None,
+        fail_first: int = 0,
+        fragment_size: int = 64 * 1024,
+        fragment_duration: float = 2.0
+    ):
+        """
+        初始化服务器
+        
+        Args:
+            latency: 每个请求注入的延迟(秒)
+            media_size: 假视频文件大小(字节)
+            bandwidth: 每个连接的带宽上限(字节/秒)，None 表示不限速
+            fail_first: 每个页面的前几次请求返回 503，模拟临时故障
+            fragment_size: HLS 分片大小(字节)
+            fragment_duration: HLS 分片时长(秒)
+        """
+        self.latency = latency
+        self.media_size = media_size
+        self.bandwidth = bandwidth
+        self.fail_first = fail_first
+        self.fragment_size = fragment_size
+        self.fragment_duration = fragment_duration
+        self.files: Dict[str, bytes] = {}
+        # /files 的每个响应最多发送的字节数，超出后断开连接，None 表示不中断
+        self.drop_after: Optional[int] = None
+        self.file_bytes_sent = 0
+        self._failures: Dict[str, int] = {}
+        self._failures_lock = threading.Lock()
+        # 第 i 个字节为 i % 256，多出的 256 字节用于按偏移切片
+        self.chunk = bytes(range(256)) * 257
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def page_url(self, video_id) -> str:
+        """视频页面URL"""
+        return f"{self.base_url}/page/{video_id}.html"
+    
+    def media_url(self, video_id) -> str:
+        """视频文件URL"""
+        return f"{self.base_url}/media/{video_id}.mp4"
+    
+    def should_fail(self, path: str) -> bool:
+        """该路径的本次请求是否应返回失败"""
+        if not self.fail_first:
+            return False
+        with self._failures_lock:
+            count = self._failures.get(path, 0)
+            self._failures[path] = count + 1
+        return count < self.fail_first
+    
+    def hls_url(self, video_id, fragments: int = 10) -> str:
+        """HLS 播放列表URL"""
+        return f"{self.base_url}/hls/{video_id}.m3u8?fragments={fragments}"
+    
+    def add_file(self, name: str, data: bytes) -> str:
+        """登记一个静态文件，返回其URL"""
+        self.files[name] = data
+        return f"{self.base_url}/files/{name}"
+    
+    def dash_url(self, video_id, video_size: int, audio_size: int) -> str:
+        """登记一个音视频分离的 DASH 清单（各一路单文件流），返回清单URL"""
+        # 两路流的内容不同，下载到错误的流时可以发现
+        video = self.add_file(f'{video_id}-video.mp4', b'V' * video_size)
+        audio = self.add_file(f'{video_id}-audio.m4a', b'A' * audio_size)
+        manifest = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+            'mediaPresentationDuration="PT10S" minBufferTime="PT2S" '
+            'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011"><Period>'
+            '<AdaptationSet mimeType="video/mp4">'
+            '<Representation id="video" codecs="avc1.64001f" width="1280" height="720" bandwidth="800000">'
+            f'<BaseURL>{video}</BaseURL></Representation></AdaptationSet>'
+            '<AdaptationSet mimeType="audio/mp4">'
+            '<Representation id="audio" codecs="mp4a.40.2" audioSamplingRate="44100" bandwidth="128000">'
+            f'<BaseURL>{audio}</BaseURL></Representation></AdaptationSet>'
+            '</Period></MPD>'
+        )
+        return self.add_file(f'{video_id}.mpd', manifest.encode('utf-8'))
+    
+    def feed_url(self, feed_id, count: int) -> str:
+        """播放列表URL"""
+        return f"{self.base_url}/feed/{feed_id}.rss?count={count}"
+    
+    def start(self) -> 'StandInServer':
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *args):
+        self.stop()
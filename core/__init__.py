@@ -1,3 +1,4 @@
 # Core package
 from .downloader import VideoDownloader
 from .parser import VideoParser
+from .scheduler import DownloadScheduler, DownloadJob
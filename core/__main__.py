@@ -0,0 +1,10 @@
+"""
+无界面模式入口: python -m core
+"""
+import sys
+
+from core.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+带宽管理 - 令牌桶限速，所有下载共享全局、单任务和站点三级上限
+"""
+import threading
+import time
+from typing import Optional, Callable, Dict, List
+
+
+# 最小桶容量，避免很低的限速下单次读取就超过容量
+MIN_CAPACITY = 64 * 1024
+
+# 限速时单次读取的最大字节数
+# 预约方式下每次读取越多分到的带宽越多，统一读取粒度使各连接公平分配
+MAX_READ = 64 * 1024
+
+
+class TokenBucket:
+    """令牌桶
+    
+    采用预约方式：取用时直接扣除令牌，不足部分记为欠额，
+    返回调用方需要等待的时间。多个线程同时取用时各自按欠额顺延，
+    总速率保持在 rate。rate 为 0 表示不限速。
+    """
+    
+    def __init__(self, rate: float = 0, burst: float = 0.5):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 速率上限(字节/秒)，0 表示不限速
+            burst: 允许的突发量(秒)
+        """
+        self._lock = threading.Lock()
+        self.burst = burst
+        self.rate = 0.0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.set_rate(rate)
+    
+    @property
+    def capacity(self) -> float:
+        return max(self.rate * self.burst, MIN_CAPACITY)
+    
+    def set_rate(self, rate: Optional[float]):
+        """运行时修改速率，已有的欠额按新速率偿还"""
+        with self._lock:
+            rate = float(rate or 0)
+            if rate and not self.rate:
+                # 从不限速切换为限速时从满桶开始
+                self.tokens = max(rate * self.burst, MIN_CAPACITY)
+            self.rate = rate
+            self.updated = time.monotonic()
+    
+    def reserve(self, n: int) -> float:
+        """
+        取用 n 字节的令牌
+        
+        Returns:
+            调用方需要等待的秒数
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthShare:
+    """单个下载任务的带宽份额
+    
+    每次从网络读到数据后调用 consume()，依次向任务、站点和全局三个令牌桶取用，
+    按其中最长的等待时间休眠。
+    """
+    
+    def __init__(
+        self,
+        manager: 'BandwidthManager',
+        host: str,
+        limit: Optional[float],
+        wait: Optional[Callable[[float], object]]
+    ):
+        self.manager = manager
+        self.host = host
+        self.limit = limit
+        self.bucket = TokenBucket(manager.job_limit if limit is None else limit)
+        self._wait = wait or time.sleep
+    
+    def set_limit(self, limit: Optional[float]):
+        """
+        修改本任务的速率上限
+        
+        Args:
+            limit: 字节/秒，0 表示不限速，None 表示使用管理器的单任务默认上限
+        """
+        self.limit = limit
+        self.bucket.set_rate(self.manager.job_limit if limit is None else limit)
+    
+    @property
+    def max_read(self) -> Optional[int]:
+        """限速生效时单次读取的字节数上限，不限速时为None"""
+        if self.bucket.rate or any(b.rate for b in self.manager._buckets(self.host)):
+            return MAX_READ
+        return None
+    
+    def consume(self, n: int):
+        """记录读取了 n 字节，超出上限时休眠"""
+        delay = self.bucket.reserve(n)
+        for bucket in self.manager._buckets(self.host):
+            delay = max(delay, bucket.reserve(n))
+        if delay > 0:
+            self._wait(delay)
+    
+    def close(self):
+        """任务结束，归还份额"""
+        self.manager.release(self)
+
+
+class BandwidthManager:
+    """带宽管理器
+    
+    所有下载器共享一个全局令牌桶，桶中的令牌谁在读取谁取用：
+    空闲或被服务器限速的任务用不完的预算自动留给其它活动任务，
+    总吞吐量保持在全局上限。另可为单个任务和单个站点设置上限。
+    所有上限都可以在下载过程中修改，下一次读取即生效。
+    """
+    
+    def __init__(self, global_limit: float = 0, job_limit: float = 0):
+        """
+        初始化带宽管理器
+        
+        Args:
+            global_limit: 全局速率上限(字节/秒)，0 表示不限速
+            job_limit: 单任务默认速率上限(字节/秒)，0 表示不限速
+        """
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_limit)
+        self.job_limit = job_limit
+        self._host_buckets: Dict[str, TokenBucket] = {}
+        self._shares: List[BandwidthShare] = []
+    
+    @property
+    def global_limit(self) -> float:
+        return self._global.rate
+    
+    @property
+    def active(self) -> int:
+        """正在下载的任务数"""
+        return len(self._shares)
+    
+    def set_global_limit(self, rate: Optional[float]):
+        """设置全局速率上限(字节/秒)，0 或 None 表示不限速"""
+        self._global.set_rate(rate)
+    
+    def set_job_limit(self, rate: Optional[float]):
+        """设置单任务默认速率上限，对没有单独设置上限的进行中任务同样生效"""
+        self.job_limit = float(rate or 0)
+        with self._lock:
+            shares = list(self._shares)
+        for share in shares:
+            if share.limit is None:
+                share.bucket.set_rate(self.job_limit)
+    
+    def set_host_limit(self, host: str, rate: Optional[float]):
+        """设置站点速率上限，同一站点的所有任务共享；0 或 None 表示取消"""
+        with self._lock:
+            bucket = self._host_buckets.get(host)
+            if not rate:
+                self._host_buckets.pop(host, None)
+            elif bucket is None:
+                self._host_buckets[host] = TokenBucket(rate)
+            else:
+                bucket.set_rate(rate)
+    
+    def host_limits(self) -> Dict[str, float]:
+        """获取各站点的速率上限"""
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._host_buckets.items()}
+    
+    def share(
+        self,
+        host: str = '',
+        limit: Optional[float] = None,
+        wait: Optional[Callable[[float], object]] = None
+    ) -> BandwidthShare:
+        """
+        为下载任务分配带宽份额
+        
+        Args:
+            host: 站点主机键，用于匹配站点上限
+            limit: 本任务的速率上限，None 表示使用单任务默认上限
+            wait: 休眠函数，默认 time.sleep；传入取消令牌的 wait 可在取消时立即醒来
+        
+        Returns:
+            带宽份额，任务结束后调用 close()
+        """
+        share = BandwidthShare(self, host, limit, wait)
+        with self._lock:
+            self._shares.append(share)
+        return share
+    
+    def release(self, share: BandwidthShare):
+        """归还带宽份额"""
+        with self._lock:
+            if share in self._shares:
+                self._shares.remove(share)
+    
+    def _buckets(self, host: str) -> List[TokenBucket]:
+        bucket = self._host_buckets.get(host)
+        return [self._global, bucket] if bucket is not None else [self._global]
+
+
+# 全局实例
+bandwidth_manager = BandwidthManager()
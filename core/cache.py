@@ -0,0 +1,226 @@
+"""
+元数据缓存 - 持久化保存 yt-dlp 提取结果，避免重复解析
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+def cache_key(url: str) -> str:
+    """规范化URL作为缓存键：小写主机、去掉片段、查询参数排序"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path.rstrip('/') or '/',
+        query,
+        ''
+    ))
+
+
+class MetadataCache:
+    """基于SQLite的元数据缓存
+    
+    以 "提取器:视频ID" 为主键保存 info 字典（zlib 压缩的 JSON），
+    原始URL和 webpage_url 规范化后作为别名指向同一条目。
+    条目超过 TTL 视为失效，总大小超过上限时按最近访问时间淘汰。
+    """
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl: float = 3600,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        初始化缓存
+        
+        Args:
+            db_path: 数据库文件路径，默认为 data/metadata_cache.db
+            ttl: 条目有效期(秒)，视频直链通常数小时后过期
+            max_bytes: 缓存总大小上限(压缩后字节数)
+        """
+        if db_path is None:
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_path = os.path.join(base_path, 'data', 'metadata_cache.db')
+        
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """首次使用时才打开数据库（需持有锁）"""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    id TEXT PRIMARY KEY,
+                    info BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access);
+                CREATE TABLE IF NOT EXISTS aliases (
+                    key TEXT PRIMARY KEY,
+                    id TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_aliases_id ON aliases(id);
+            ''')
+            self._db = db
+        return self._db
+    
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的 info 字典
+        
+        Args:
+            url: 视频URL
+        
+        Returns:
+            info 字典，未命中或已过期返回None
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT e.id, e.info, e.created FROM aliases a '
+                    'JOIN entries e ON e.id = a.id WHERE a.key = ?',
+                    (cache_key(url),)
+                ).fetchone()
+                
+                if row is None:
+                    self.misses += 1
+                    return None
+                
+                entry_id, blob, created = row
+                if now - created > self.ttl:
+                    self._delete(entry_id)
+                    self._conn.commit()
+                    self.misses += 1
+                    return None
+                
+                self._conn.execute(
+                    'UPDATE entries SET last_access = ? WHERE id = ?', (now, entry_id)
+                )
+                self._conn.commit()
+                self.hits += 1
+            except sqlite3.Error as e:
+                print(f"读取元数据缓存失败: {e}")
+                self.misses += 1
+                return None
+        
+        return json.loads(zlib.decompress(blob))
+    
+    def put(self, url: str, info: Dict[str, Any]):
+        """
+        写入缓存
+        
+        Args:
+            url: 请求时使用的URL
+            info: 经过 YoutubeDL.sanitize_info(remove_private_keys=True) 处理的 info 字典
+        """
+        entry_id = f"{info.get('extractor_key', 'generic')}:{info.get('id', cache_key(url))}"
+        blob = zlib.compress(json.dumps(info, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        
+        keys = {cache_key(url)}
+        if info.get('webpage_url'):
+            keys.add(cache_key(info['webpage_url']))
+        
+        with self._lock:
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO entries (id, info, size, created, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (entry_id, blob, len(blob), now, now)
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO aliases (key, id) VALUES (?, ?)',
+                    [(key, entry_id) for key in keys]
+                )
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"写入元数据缓存失败: {e}")
+    
+    def invalidate(self, url: str):
+        """删除URL对应的缓存条目"""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT id FROM aliases WHERE key = ?', (cache_key(url),)
+                ).fetchone()
+                if row:
+                    self._delete(row[0])
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"删除元数据缓存失败: {e}")
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            try:
+                self._conn.execute('DELETE FROM entries')
+                self._conn.execute('DELETE FROM aliases')
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"清空元数据缓存失败: {e}")
+    
+    def stats(self) -> Dict[str, int]:
+        """获取命中统计和缓存大小"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': size,
+        }
+    
+    def _delete(self, entry_id: str):
+        """删除条目及其别名（需持有锁）"""
+        self._conn.execute('DELETE FROM entries WHERE id = ?', (entry_id,))
+        self._conn.execute('DELETE FROM aliases WHERE id = ?', (entry_id,))
+    
+    def _evict(self):
+        """淘汰过期条目，并按LRU淘汰直到低于大小上限（需持有锁）"""
+        expired = self._conn.execute(
+            'SELECT id FROM entries WHERE created < ?', (time.time() - self.ttl,)
+        ).fetchall()
+        for (entry_id,) in expired:
+            self._delete(entry_id)
+        
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for entry_id, size in self._conn.execute(
+            'SELECT id, size FROM entries ORDER BY last_access'
+        ).fetchall():
+            self._delete(entry_id)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+# 全局实例
+metadata_cache = MetadataCache()
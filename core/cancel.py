@@ -0,0 +1,183 @@
+"""
+取消令牌 - 立即中断下载中的网络读取和 ffmpeg 子进程
+"""
+import socket
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Optional, Callable, List
+
+
+class DownloadCancelled(Exception):
+    """下载已被取消"""
+    
+    def __init__(self, message: str = "下载已取消"):
+        super().__init__(message)
+
+
+# 从响应对象找到底层 socket 时依次尝试的属性
+_SOCKET_ATTRS = ('fp', '_fp', 'raw', '_sock', 'sock', '_connection', 'connection')
+
+
+def _find_socket(obj, depth: int = 0) -> Optional[socket.socket]:
+    """在 yt-dlp / urllib / urllib3 的响应对象中查找底层 socket"""
+    if isinstance(obj, socket.socket):
+        return obj
+    if obj is None or depth > 5:
+        return None
+    for attr in _SOCKET_ATTRS:
+        sock = _find_socket(getattr(obj, attr, None), depth + 1)
+        if sock is not None:
+            return sock
+    return None
+
+
+def abort_response(response):
+    """关闭响应的底层连接，使其它线程中阻塞的 read() 立即返回"""
+    sock = _find_socket(response)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+class CancelToken:
+    """协作式取消令牌
+    
+    下载期间打开的HTTP响应和启动的子进程登记到令牌上，
+    cancel() 时关闭这些连接、结束子进程并调用注册的回调，
+    而不是等到下一次进度回调才发现已取消。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._responses = weakref.WeakSet()
+        self._processes = weakref.WeakSet()
+        self.cleanup = True
+        self.cancelled_at: Optional[float] = None
+        self.released_at: Optional[float] = None
+    
+    @property
+    def is_cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+    
+    @property
+    def release_latency(self) -> Optional[float]:
+        """从取消到资源全部释放的耗时(秒)"""
+        if self.cancelled_at is None or self.released_at is None:
+            return None
+        return self.released_at - self.cancelled_at
+    
+    def cancel(self, cleanup: bool = True):
+        """
+        取消
+        
+        Args:
+            cleanup: 是否删除未完成的临时文件；为False时保留以便之后续传
+        """
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cleanup = cleanup
+            self.cancelled_at = time.perf_counter()
+            self._event.set()
+            callbacks = list(self._callbacks)
+            responses = list(self._responses)
+            processes = list(self._processes)
+        
+        for response in responses:
+            abort_response(response)
+        for process in processes:
+            if process.poll() is None:
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"取消回调出错: {e}")
+    
+    def raise_if_cancelled(self):
+        """已取消时抛出 DownloadCancelled"""
+        if self._event.is_set():
+            raise DownloadCancelled()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待取消，可用作可中断的 sleep"""
+        return self._event.wait(timeout)
+    
+    def on_cancel(self, callback: Callable[[], None]):
+        """注册取消回调，已取消时立即调用"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def track_response(self, response):
+        """登记HTTP响应，取消时关闭其连接"""
+        with self._lock:
+            if not self._event.is_set():
+                self._responses.add(response)
+                return
+        abort_response(response)
+    
+    def track_process(self, process):
+        """登记子进程，取消时结束它"""
+        with self._lock:
+            if not self._event.is_set():
+                self._processes.add(process)
+                return
+        process.kill()
+    
+    def mark_released(self):
+        """下载线程已退出、临时文件已清理"""
+        if self.cancelled_at is not None and self.released_at is None:
+            self.released_at = time.perf_counter()
+    
+    @contextmanager
+    def activate(self):
+        """在当前线程内，yt-dlp 启动的子进程都登记到此令牌"""
+        _install_process_tracking()
+        previous = getattr(_local, 'token', None)
+        _local.token = self
+        try:
+            yield self
+        finally:
+            _local.token = previous
+
+
+_local = threading.local()
+_tracking_installed = False
+_tracking_lock = threading.Lock()
+
+
+def _install_process_tracking():
+    """包装 yt_dlp.utils.Popen，把 ffmpeg 等子进程登记到当前线程的令牌"""
+    global _tracking_installed
+    with _tracking_lock:
+        if _tracking_installed:
+            return
+        from yt_dlp.utils import Popen
+        
+        original_init = Popen.__init__
+        
+        def tracked_init(self, *args, **kwargs):
+            original_init(self, *args, **kwargs)
+            token = getattr(_local, 'token', None)
+            if token is not None:
+                token.track_process(self)
+        
+        Popen.__init__ = tracked_init
+        _tracking_installed = True
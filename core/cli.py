@@ -0,0 +1,351 @@
+"""
+命令行入口 - 无界面运行下载引擎
+
+使用方法:
+    python -m core URL [URL ...]
+    python -m core -i urls.txt -o ~/Videos
+    cat urls.txt | python -m core -
+    python main.py --headless URL
+
+进度以 JSON Lines 输出到 stdout，每行一个事件。
+退出码: 0 全部成功, 1 存在失败, 2 参数错误, 130 被中断
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Optional, List, Dict, Any
+
+from utils.helpers import is_valid_url, is_playlist_url, detect_platform, normalize_url
+from .bandwidth import bandwidth_manager
+from .downloader import VideoDownloader
+from .postprocess import postprocess_pool
+from .scheduler import DownloadScheduler, DownloadJob
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+class JsonLinesReporter:
+    """以 JSON Lines 格式输出事件，多线程安全"""
+    
+    def __init__(self, stream=None, progress_interval: float = 0.5):
+        """
+        初始化输出器
+        
+        Args:
+            stream: 输出流，默认为 stdout
+            progress_interval: 同一任务两次进度事件的最小间隔(秒)
+        """
+        self.stream = stream or sys.stdout
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._last_progress: Dict[str, float] = {}
+    
+    def emit(self, event: str, **fields: Any):
+        """输出一个事件"""
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+    
+    def progress(self, url: str, info: Dict[str, Any]):
+        """输出进度事件（按间隔限流）"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_progress.get(url, 0) < self.progress_interval:
+                return
+            self._last_progress[url] = now
+        self.emit(
+            'progress',
+            url=url,
+            percent=round(info.get('percent', 0), 1),
+            downloaded_bytes=info.get('downloaded_bytes', 0),
+            total_bytes=info.get('total_bytes', 0),
+            speed=info.get('speed') or 0,
+            eta=info.get('eta'),
+        )
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    arg_parser = argparse.ArgumentParser(
+        prog='python -m core',
+        description='视频下载器 - 无界面模式，进度以 JSON Lines 输出',
+    )
+    arg_parser.add_argument(
+        'urls', nargs='*',
+        help='视频链接，使用 - 从标准输入读取（每行一个）'
+    )
+    arg_parser.add_argument(
+        '-i', '--input-file',
+        help='从文件读取视频链接，每行一个，# 开头为注释'
+    )
+    arg_parser.add_argument(
+        '-o', '--output',
+        help='下载目录，默认为 ~/Downloads/VideoDownloader'
+    )
+    arg_parser.add_argument(
+        '-f', '--format', default='best',
+        help='best / bestaudio / 720p 等高度 / 精确的 format_id（默认 best）'
+    )
+    arg_parser.add_argument(
+        '--merge-format', default='mp4',
+        choices=['mp4', 'mkv', 'webm', 'avi', 'mov'],
+        help='输出容器格式（默认 mp4）'
+    )
+    arg_parser.add_argument(
+        '--subtitles', action='store_true',
+        help='下载字幕'
+    )
+    arg_parser.add_argument(
+        '--embed-subtitles', action='store_true',
+        help='将字幕嵌入视频'
+    )
+    arg_parser.add_argument(
+        '--no-fast-transfer', action='store_true',
+        help='关闭快速传输（分片并行下载和多连接分段下载）'
+    )
+    arg_parser.add_argument(
+        '--connections', type=int, default=4,
+        help='大文件分段下载的连接数，1 表示不分段（默认 4）'
+    )
+    arg_parser.add_argument(
+        '--limit-rate', type=float, default=0, metavar='MB',
+        help='所有下载合计的速率上限，单位 MB/s（默认 0 不限速）'
+    )
+    arg_parser.add_argument(
+        '--job-limit-rate', type=float, default=0, metavar='MB',
+        help='单个下载的速率上限，单位 MB/s（默认 0 不限速）'
+    )
+    arg_parser.add_argument(
+        '--parse-workers', type=int, default=8,
+        help='同时解析的任务数（默认 8）'
+    )
+    arg_parser.add_argument(
+        '--download-workers', type=int, default=3,
+        help='同时下载的任务数（默认 3）'
+    )
+    arg_parser.add_argument(
+        '--postprocess-workers', type=int, default=0,
+        help='同时执行的合并/转码任务数（默认 0 为CPU核数）'
+    )
+    arg_parser.add_argument(
+        '--progress-interval', type=float, default=0.5,
+        help='同一任务进度事件的最小间隔秒数（默认 0.5）'
+    )
+    arg_parser.add_argument(
+        '--no-history', action='store_true',
+        help='不写入下载历史（同时不检查是否已下载过）'
+    )
+    arg_parser.add_argument(
+        '--force', action='store_true',
+        help='即使历史记录中已下载过也重新下载'
+    )
+    return arg_parser
+
+
+def read_urls(args: argparse.Namespace, stdin=None) -> List[str]:
+    """汇总参数、文件和标准输入中的URL"""
+    stdin = stdin or sys.stdin
+    lines = [u for u in args.urls if u != '-']
+    
+    if args.input_file:
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            lines.extend(f)
+    
+    # 显式指定 - ，或没有任何URL参数且输入来自管道时读取标准输入
+    if '-' in args.urls or (not lines and not args.input_file and not stdin.isatty()):
+        lines.extend(stdin)
+    
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+
+def run(args: argparse.Namespace, reporter: Optional[JsonLinesReporter] = None) -> int:
+    """
+    执行下载任务
+    
+    Args:
+        args: 命令行参数
+        reporter: 事件输出器
+    
+    Returns:
+        退出码
+    """
+    reporter = reporter or JsonLinesReporter(progress_interval=args.progress_interval)
+    urls = read_urls(args)
+    if not urls:
+        reporter.emit('error', message='没有提供视频链接')
+        return EXIT_USAGE
+    
+    history = None
+    if not args.no_history:
+        from utils.history_manager import history_manager
+        history = history_manager
+    
+    bandwidth_manager.set_global_limit(args.limit_rate * 1024 * 1024)
+    bandwidth_manager.set_job_limit(args.job_limit_rate * 1024 * 1024)
+    if args.postprocess_workers:
+        postprocess_pool.set_workers(args.postprocess_workers)
+    
+    scheduler = DownloadScheduler(
+        parse_workers=args.parse_workers,
+        batch_parse_concurrency=args.parse_workers,
+        download_workers=args.download_workers,
+        output_path=args.output,
+        is_duplicate=history.is_downloaded if history and not args.force else None,
+    )
+    
+    # 播放列表的条目在后台线程中提交，计数需要加锁；
+    # 只统计数量而不保留任务对象，长列表的内存占用不随条目数增长
+    stats_lock = threading.Lock()
+    stats = {'total': 0, 'failed': 0}
+    seen = set()
+    
+    def submit(url: str, parse: bool = True) -> Optional[DownloadJob]:
+        """提交单个视频，重复的链接返回None"""
+        # 同一视频的不同写法只下载一次
+        key = normalize_url(url)
+        with stats_lock:
+            stats['total'] += 1
+            duplicate = key in seen
+            seen.add(key)
+        if duplicate:
+            reporter.emit('skipped', url=url, reason='duplicate')
+            return None
+        
+        downloader = VideoDownloader(args.output)
+        downloader.output_format = args.merge_format
+        downloader.download_subtitles = args.subtitles
+        downloader.embed_subtitles = args.embed_subtitles
+        downloader.fast_transfer = not args.no_fast_transfer
+        downloader.ranged_connections = args.connections
+        downloader.set_callbacks(
+            progress=lambda info, url=url: (
+                reporter.progress(url, info) if info['status'] == 'downloading' else None
+            ),
+            error=lambda message, url=url: reporter.emit('error', url=url, message=message),
+        )
+        
+        def on_parsed(job: DownloadJob):
+            reporter.emit(
+                'parsed',
+                url=job.url,
+                title=job.info.get('title'),
+                duration=job.info.get('duration'),
+                platform=job.info.get('platform'),
+            )
+        
+        def on_finished(job: DownloadJob):
+            if job.state == DownloadJob.COMPLETED:
+                reporter.emit(
+                    'completed', url=job.url, filepath=job.result,
+                    timings=_round_timings(job.downloader.timings),
+                )
+                if history:
+                    info = job.info or {}
+                    history.add_record(
+                        url=job.url,
+                        title=info.get('title', '视频'),
+                        platform=info.get('platform') or detect_platform(job.url),
+                        filepath=job.result,
+                        thumbnail=info.get('thumbnail'),
+                        duration=info.get('duration'),
+                        quality=args.format,
+                        webpage_url=info.get('webpage_url'),
+                    )
+            elif job.state == DownloadJob.SKIPPED:
+                reporter.emit('skipped', url=job.url, reason='downloaded', filepath=job.result)
+            else:
+                reporter.emit(job.state, url=job.url, error=job.error)
+                with stats_lock:
+                    stats['failed'] += 1
+        
+        reporter.emit('queued', url=url)
+        return scheduler.submit(
+            url,
+            format_id=args.format,
+            downloader=downloader,
+            on_parsed=on_parsed,
+            on_finished=on_finished,
+            parse=parse,
+        )
+    
+    jobs: List[DownloadJob] = []
+    expanders: List[threading.Thread] = []
+    for url in urls:
+        if not is_valid_url(url):
+            reporter.emit('failed', url=url, error='无效的URL')
+            with stats_lock:
+                stats['total'] += 1
+                stats['failed'] += 1
+            continue
+        if is_playlist_url(url):
+            # 播放列表和频道边展开边下载
+            expanders.append(scheduler.submit_playlist(
+                url,
+                submit=submit,
+                on_done=lambda count, url=url: reporter.emit('expanded', url=url, count=count),
+            ))
+            continue
+        job = submit(url, parse=False)
+        if job:
+            jobs.append(job)
+    
+    # 整批并发解析，每解析完一个立即开始下载
+    scheduler.resolve_batch(jobs)
+    
+    try:
+        # 分段等待，保证 Ctrl+C 能及时响应；播放列表展开结束后再等待全部任务
+        for thread in expanders:
+            while thread.is_alive():
+                thread.join(timeout=0.5)
+        while not scheduler.wait_all(timeout=0.5):
+            pass
+    except KeyboardInterrupt:
+        scheduler.shutdown()
+        reporter.emit('interrupted')
+        return EXIT_INTERRUPTED
+    finally:
+        if history:
+            history.close()
+    
+    reporter.emit('done', total=stats['total'], failed=stats['failed'])
+    return EXIT_FAILED if stats['failed'] else EXIT_OK
+
+
+def _round_timings(timings: Dict[str, Any]) -> Dict[str, Any]:
+    """各阶段耗时保留三位小数"""
+    return {
+        key: _round_timings(value) if isinstance(value, dict) else round(value, 3)
+        for key, value in timings.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行主函数"""
+    args = build_arg_parser().parse_args(argv)
+    reporter = JsonLinesReporter(progress_interval=args.progress_interval)
+    
+    # stdout 只输出 JSON 事件，引擎和 yt-dlp 的其它输出转到 stderr
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        return run(args, reporter)
+    finally:
+        sys.stdout = stdout
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,43 @@
 """
 视频下载器 - 核心下载逻辑
 """
-import yt_dlp
+import glob
 import threading
 import os
-from typing import Optional, Callable, Dict, Any
-from utils.helpers import get_default_download_path, sanitize_filename
+import time
+from typing import Optional, Callable, Dict, Any, List
+from utils.helpers import get_default_download_path, sanitize_filename, detect_platform, host_key
+from .bandwidth import bandwidth_manager
+from .cache import metadata_cache
+from .cancel import CancelToken, DownloadCancelled
+from .formats import codec_filters, remux_compatible
+from .postprocess import postprocess_pool
+from .progress import ProgressSlot
+from .session import CallOptions, ydl_pool
+from .transfer import RangedFetcher
+
+
+# 快速传输模式下各平台的 yt-dlp 分片参数
+# YouTube 对不分块的连续下载限速，按 10MB 分块请求可以绕开；
+# HLS/DASH 分片流并行下载多个分片
+FAST_TRANSFER_PROFILES = {
+    'YouTube': {
+        'concurrent_fragment_downloads': 4,
+        'http_chunk_size': 10 * 1024 * 1024,
+    },
+    'Bilibili': {
+        'concurrent_fragment_downloads': 3,
+    },
+    'default': {
+        'concurrent_fragment_downloads': 4,
+    },
+}
+
+# 上一次格式选择的结果，重新处理已提取的 info 前需要去掉，否则会沿用之前选中的流
+SELECTION_KEYS = (
+    'requested_formats', 'requested_downloads', 'requested_subtitles',
+    'filepath', '_filename', 'filename',
+)
 
 
 class VideoDownloader:
@@ -21,15 +53,33 @@ class VideoDownloader:
         self.output_path = output_path or get_default_download_path()
         self.current_download = None
         self.is_cancelled = False
+        self._cancel_token = CancelToken()
+        # 本次下载中写入过的文件：最终文件名 -> 临时文件名，取消时据此清理
+        self._partial_files: Dict[str, Optional[str]] = {}
+        self.last_cancel_latency: Optional[float] = None  # 上次取消到下载线程退出的耗时(秒)
         self._progress_callback = None
         self._complete_callback = None
         self._error_callback = None
+        self._progress_listeners: List[Callable[[Dict], None]] = []
+        # 进度槽：设置后每次回调只覆盖槽位字段，由界面定时读取
+        self.progress_slot: Optional[ProgressSlot] = None
         
         # 新增选项
         self.download_subtitles = False  # 是否下载字幕
         self.subtitle_langs = ['zh', 'en']  # 字幕语言
         self.embed_subtitles = False  # 是否嵌入字幕
         self.output_format = 'mp4'  # 输出格式
+        self.use_cache = True  # 是否复用元数据缓存中的解析结果
+        self.fast_transfer = True  # 快速传输：分片并行下载，大文件多连接分段下载
+        self.ranged_connections = 4  # 分段下载的连接数，小于2时不分段
+        self.rate_limit: Optional[float] = None  # 本任务限速(字节/秒)，None 使用全局设置的单任务上限
+        self._bandwidth = None
+        # 推迟到后处理线程池执行的后处理，由 postprocess() 取出
+        self._pending_postprocess = None
+        # 上次下载各阶段的耗时(秒)：extract / download / postprocess_queue / postprocess，
+        # postprocessors 为各个后处理器的耗时
+        self.timings: Dict[str, Any] = {}
+        self._resolved_at: Optional[float] = None
     
     def set_output_path(self, path: str):
         """设置输出目录"""
@@ -37,6 +87,18 @@ class VideoDownloader:
         if not os.path.exists(path):
             os.makedirs(path)
     
+    def set_rate_limit(self, rate: Optional[float]):
+        """
+        设置本任务的速率上限，下载过程中修改立即生效
+        
+        Args:
+            rate: 字节/秒，0 表示不限速，None 表示使用带宽管理器的单任务上限
+        """
+        self.rate_limit = rate
+        bandwidth = self._bandwidth
+        if bandwidth is not None:
+            bandwidth.set_limit(rate)
+    
     def set_callbacks(
         self,
         progress: Optional[Callable[[Dict], None]] = None,
@@ -55,10 +117,117 @@ class VideoDownloader:
         self._complete_callback = complete
         self._error_callback = error
     
+    def add_progress_listener(self, listener: Callable[[Dict], None]):
+        """
+        添加额外的进度监听器（如任务日志）
+        
+        监听器除 downloading / finished 外还会收到 status 为 resolved 的事件，
+        其中 format_id 为实际选中的格式ID（如 137+140），filename 为最终文件名。
+        """
+        self._progress_listeners.append(listener)
+    
+    def get_options(self) -> Dict[str, Any]:
+        """获取影响输出文件的选项，用于恢复任务"""
+        return {
+            'download_subtitles': self.download_subtitles,
+            'subtitle_langs': self.subtitle_langs,
+            'embed_subtitles': self.embed_subtitles,
+            'output_format': self.output_format,
+        }
+    
+    def apply_options(self, options: Dict[str, Any]):
+        """应用 get_options 保存的选项"""
+        for key, value in options.items():
+            if key in ('download_subtitles', 'subtitle_langs', 'embed_subtitles', 'output_format'):
+                setattr(self, key, value)
+    
+    def build_output_template(self, filename: Optional[str] = None) -> str:
+        """构建输出模板"""
+        if filename:
+            return os.path.join(
+                self.output_path,
+                sanitize_filename(filename) + '.%(ext)s'
+            )
+        return os.path.join(
+            self.output_path,
+            '%(title)s.%(ext)s'
+        )
+    
+    def _notify_listeners(self, info: Dict[str, Any]):
+        for listener in self._progress_listeners:
+            try:
+                listener(info)
+            except Exception as e:
+                print(f"进度监听器出错: {e}")
+    
+    def _pre_download_hook(self, info: Dict[str, Any]):
+        """格式选定后、开始下载前调用"""
+        self._resolved_at = time.perf_counter()
+        ydl = self.current_download
+        filename = ydl.prepare_filename(info) if ydl is not None else None
+        if filename and not os.path.exists(filename):
+            self._partial_files.setdefault(filename, None)
+        if self._progress_listeners:
+            self._notify_listeners({
+                'status': 'resolved',
+                'format_id': info.get('format_id'),
+                'filename': filename,
+            })
+        if filename and self.fast_transfer and self.ranged_connections > 1:
+            self._ranged_download(ydl, info, filename)
+    
+    def _ranged_download(self, ydl, info: Dict[str, Any], filename: str):
+        """
+        用多个连接分段下载单个的大文件
+        
+        成功后文件已位于最终路径，yt-dlp 会视为已下载并直接进入后处理；
+        不满足条件时什么也不做，由 yt-dlp 正常下载。
+        取消或退出时保留 .ranged 文件，下次下载同一文件时各段从断点继续；
+        分段下载出错时把开头已连续完成的部分转为 .part 文件，由 yt-dlp 续传。
+        """
+        # 需要合并的多个流、分片流由 yt-dlp 处理
+        if info.get('requested_formats') or info.get('protocol') not in ('http', 'https'):
+            return
+        # 已有文件或 yt-dlp 的 .part 文件时交给 yt-dlp 续传
+        if os.path.exists(filename) or os.path.exists(filename + '.part'):
+            return
+        
+        from yt_dlp.networking import Request
+        
+        fetcher = RangedFetcher(
+            opener=lambda url, headers: ydl.urlopen(Request(url, headers=headers)),
+            connections=self.ranged_connections,
+        )
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        try:
+            fetcher.fetch(
+                info['url'],
+                filename,
+                headers=info.get('http_headers'),
+                total=info.get('filesize'),
+                progress=self._progress_hook,
+            )
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            # 取消时关闭连接导致的读取错误
+            if self.is_cancelled:
+                raise DownloadCancelled()
+            kept = fetcher.salvage(filename)
+            print(f"分段下载失败，改为单连接下载（已保留 {kept} 字节）: {e}")
+    
     def _progress_hook(self, d: Dict[str, Any]):
         """yt-dlp进度钩子"""
         if self.is_cancelled:
-            raise Exception("下载已取消")
+            raise DownloadCancelled()
+        
+        if d['status'] == 'downloading':
+            self._partial_files[d.get('filename')] = d.get('tmpfilename')
+        if self.progress_slot is not None:
+            self.progress_slot.update(d)
+        # 没有回调需要字典时不再逐次构建
+        if not self._progress_callback and not self._progress_listeners:
+            return
         
         if d['status'] == 'downloading':
             progress_info = {
@@ -68,6 +237,7 @@ class VideoDownloader:
                 'speed': d.get('speed', 0),
                 'eta': d.get('eta', 0),
                 'filename': d.get('filename', ''),
+                'tmpfilename': d.get('tmpfilename', ''),
                 'percent': 0
             }
             
@@ -78,7 +248,8 @@ class VideoDownloader:
             
             if self._progress_callback:
                 self._progress_callback(progress_info)
-                
+            self._notify_listeners(progress_info)
+        
         elif d['status'] == 'finished':
             if self._progress_callback:
                 self._progress_callback({
@@ -91,60 +262,104 @@ class VideoDownloader:
         self,
         url: str,
         format_id: str = 'best',
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        info_dict: Optional[Dict[str, Any]] = None,
+        resolved_format: Optional[str] = None,
+        defer_postprocess: bool = False,
+        cancel_token: Optional[CancelToken] = None
     ) -> Optional[str]:
         """
         下载视频
         
+        合并、转码等后处理在后处理线程池中执行，同时运行的 ffmpeg 不超过CPU核数。
+        
         Args:
             url: 视频URL
             format_id: 格式ID，默认为最佳质量
             filename: 自定义文件名
-            
+            info_dict: 已提取的原始info字典，默认从元数据缓存读取
+            resolved_format: 恢复下载时上次实际选中的格式ID，
+                             保证续传的 .part 文件属于同一格式
+            defer_postprocess: 为True时下载完成后立即返回，不等待后处理；
+                               has_pending_postprocess 为True时调用方需再调用 postprocess()
+            cancel_token: 调用方创建的取消令牌，开始下载前已取消时直接返回None；
+                          默认为本次下载新建一个
+        
         Returns:
-            下载的文件路径，失败返回None
+            下载的文件路径，失败返回None；推迟后处理时为后处理之前的文件路径
         """
-        self.is_cancelled = False
+        self._cancel_token = token = cancel_token or CancelToken()
+        self.is_cancelled = token.is_cancelled
+        if self.is_cancelled:
+            return None
+        self._partial_files = {}
+        self._pending_postprocess = None
+        self.timings = {}
+        self._resolved_at = None
+        start = time.perf_counter()
+        # 带宽份额的休眠在取消时立即结束
+        self._bandwidth = bandwidth = bandwidth_manager.share(
+            host_key(url), self.rate_limit, wait=token.wait
+        )
+        
+        # 优先使用缓存的解析结果，避免再次提取
+        if info_dict is None and self.use_cache:
+            info_dict = metadata_cache.get(url)
         
         # 检测是否为Bilibili
         is_bilibili = 'bilibili.com' in url.lower() or 'b23.tv' in url.lower()
         
         # 构建输出模板
-        if filename:
-            output_template = os.path.join(
-                self.output_path,
-                sanitize_filename(filename) + '.%(ext)s'
-            )
-        else:
-            output_template = os.path.join(
-                self.output_path,
-                '%(title)s.%(ext)s'
-            )
+        output_template = self.build_output_template(filename)
         
-        # 根据format_id和平台构建格式选择
+        # 格式索引给出的精确格式ID：解析与下载之间格式ID可能变化（缓存过期、CDN 轮换），
+        # 按其视频流高度的画质选择兜底
+        exact = format_id not in ('best', '最佳质量', 'bestaudio') and not (
+            format_id.endswith('p') and format_id[:-1].isdigit()
+        )
+        quality = format_id
+        if exact:
+            height = self._format_height(format_id, info_dict)
+            quality = f'{height}p' if height else 'best'
+        
+        # 根据画质和平台构建格式选择
         if is_bilibili:
             # Bilibili: 需要合并视频和音频流
             # 使用 bv*+ba* 格式选择最佳视频+最佳音频
-            if format_id == 'best' or format_id == '最佳质量':
+            if quality == 'best' or quality == '最佳质量':
                 format_selector = 'bv*+ba*/b*'  # best video + best audio / best
-            elif format_id == 'bestaudio':
+            elif quality == 'bestaudio':
                 format_selector = 'ba*/b*'  # best audio / best
-            elif 'p' in format_id:
-                height = format_id.replace('p', '')
-                format_selector = f'bv*[height<={height}]+ba*/b*[height<={height}]/b*'
             else:
-                format_selector = 'bv*+ba*/b*'
+                height = quality.replace('p', '')
+                format_selector = f'bv*[height<={height}]+ba*/b*[height<={height}]/b*'
         else:
             # 其他平台（YouTube等）
-            if format_id == 'best' or format_id == '最佳质量':
+            if quality == 'best' or quality == '最佳质量':
                 format_selector = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
-            elif format_id == 'bestaudio':
+            elif quality == 'bestaudio':
                 format_selector = 'bestaudio/best'
-            elif 'p' in format_id:
-                height = format_id.replace('p', '')
-                format_selector = f'bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/best[height<={height}][ext=mp4]/best'
             else:
-                format_selector = format_id
+                height = quality.replace('p', '')
+                format_selector = f'bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/best[height<={height}][ext=mp4]/best'
+        
+        if exact:
+            format_selector = f'{format_id}/{format_selector}'
+        
+        # 输出为 webm/mov/avi 时优先选择目标容器能直接封装的编码，后处理只需重新封装；
+        # 没有这样的格式时退回上面的选择，由后处理转码
+        if self.output_format not in ('mp4', 'mkv') and format_id != 'bestaudio':
+            height_filter = self._height_filter(format_id, info_dict)
+            if height_filter is not None:
+                video_filter, audio_filter = codec_filters(self.output_format)
+                format_selector = (
+                    f'bestvideo{video_filter}{height_filter}+bestaudio{audio_filter}'
+                    f'/best{video_filter}{audio_filter}{height_filter}/{format_selector}'
+                )
+        
+        if resolved_format:
+            # 恢复任务：优先使用上次选中的格式，失效时退回原来的选择
+            format_selector = f'{resolved_format}/{format_selector}'
         
         # 基础配置
         ydl_opts = {
@@ -153,9 +368,16 @@ class VideoDownloader:
             'progress_hooks': [self._progress_hook],
             'quiet': True,
             'no_warnings': True,
-            'merge_output_format': self.output_format,  # 输出格式
+            # 输出格式；webm 只能封装 VP8/VP9/AV1 + Opus/Vorbis，其他编码先合并为 mkv 再转码
+            'merge_output_format': 'webm/mkv' if self.output_format == 'webm' else self.output_format,
+            'continuedl': True,  # 存在 .part 文件时按 HTTP Range 续传
         }
         
+        # 快速传输：按平台设置分片并发和分块大小
+        if self.fast_transfer:
+            platform = detect_platform(url)
+            ydl_opts.update(FAST_TRANSFER_PROFILES.get(platform, FAST_TRANSFER_PROFILES['default']))
+        
         # 字幕下载选项
         if self.download_subtitles:
             ydl_opts['writesubtitles'] = True
@@ -169,14 +391,11 @@ class VideoDownloader:
                     'key': 'FFmpegEmbedSubtitle',
                 })
         
-        # 尝试设置FFmpeg位置
-        try:
-            from utils.ffmpeg_manager import ffmpeg_manager
-            ffmpeg_path = ffmpeg_manager.get_ffmpeg_path()
-            if ffmpeg_path:
-                ydl_opts['ffmpeg_location'] = ffmpeg_path
-        except:
-            pass
+        # FFmpeg位置来自缓存的探测结果，不必每次下载都查找
+        from utils.ffmpeg_manager import ffmpeg_manager
+        ffmpeg = ffmpeg_manager.probe()
+        if ffmpeg is not None:
+            ydl_opts['ffmpeg_location'] = ffmpeg.location
         
         # 格式转换后处理
         postprocessors = ydl_opts.get('postprocessors', [])
@@ -188,7 +407,7 @@ class VideoDownloader:
                 'preferredcodec': 'mp3',
                 'preferredquality': '192',
             })
-        # 视频格式转换
+        # 视频格式转换，下载完成后按实际编码决定是否只需重新封装（见 postprocess）
         elif self.output_format != 'mp4':
             postprocessors.append({
                 'key': 'FFmpegVideoConvertor',
@@ -198,11 +417,33 @@ class VideoDownloader:
         if postprocessors:
             ydl_opts['postprocessors'] = postprocessors
         
+        # yt-dlp 在下载完成后调用 post_process，记录下来稍后在后处理线程池中执行
+        deferred: List[tuple] = []
+        call = CallOptions(
+            pre_download_hooks=[self._pre_download_hook],
+            cancel_token=token,
+            bandwidth=bandwidth,
+            defer_postprocess=deferred,
+        )
+        filepath = None
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with token.activate(), ydl_pool.session(ydl_opts, call) as ydl:
                 self.current_download = ydl
-                info = ydl.extract_info(url, download=True)
+                info = None
+                if info_dict is not None:
+                    info_dict = {
+                        key: value for key, value in info_dict.items() if key not in SELECTION_KEYS
+                    }
+                    try:
+                        info = ydl.process_ie_result(info_dict, download=True)
+                    except Exception:
+                        if self.is_cancelled:
+                            raise
+                        # 缓存中的直链可能已失效，丢弃后重新提取
+                        metadata_cache.invalidate(url)
+                if info is None:
+                    info = ydl.extract_info(url, download=True)
                 
                 if info:
                     # 获取实际的文件路径
@@ -210,28 +451,199 @@ class VideoDownloader:
                         filepath = info['requested_downloads'][0].get('filepath')
                     else:
                         filepath = ydl.prepare_filename(info)
-                    
-                    if self._complete_callback:
-                        self._complete_callback(filepath)
-                    
-                    return filepath
-                    
+        
         except Exception as e:
-            error_msg = str(e)
-            if "下载已取消" not in error_msg:
-                if self._error_callback:
-                    self._error_callback(error_msg)
+            # 取消导致的连接中断、进程退出不作为错误报告
+            if not self.is_cancelled and self._error_callback:
+                self._error_callback(str(e))
             return None
         finally:
             self.current_download = None
+            self._bandwidth = None
+            bandwidth.close()
+            finished = time.perf_counter()
+            resolved = self._resolved_at or finished
+            self.timings['extract'] = resolved - start
+            self.timings['download'] = finished - resolved
+            if token.is_cancelled:
+                self._release_cancelled(token)
+        
+        if not filepath:
+            return None
+        if not deferred:
+            if self._complete_callback:
+                self._complete_callback(filepath)
+            return filepath
         
+        self._pending_postprocess = (ydl_opts, deferred, filepath, time.perf_counter())
+        if defer_postprocess:
+            return filepath
+        return postprocess_pool.submit(self.postprocess).result()
+    
+    @staticmethod
+    def _height_filter(format_id: str, info_dict: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        画质选项对应的高度过滤条件
+        
+        Returns:
+            最佳质量为空字符串，"720p" 为 "[height<=720]"，
+            格式索引给出的精确格式ID按其视频流高度为 "[height=720]"，无法确定时返回None
+        """
+        if format_id in ('best', '最佳质量'):
+            return ''
+        if format_id.endswith('p') and format_id[:-1].isdigit():
+            return f'[height<={format_id[:-1]}]'
+        height = VideoDownloader._format_height(format_id, info_dict)
+        return f"[height={height}]" if height else None
+    
+    @staticmethod
+    def _format_height(format_id: str, info_dict: Optional[Dict[str, Any]]) -> Optional[int]:
+        """精确格式ID中视频流的高度，info 中找不到该格式时返回None"""
+        video_id = format_id.split('+')[0]
+        for fmt in (info_dict or {}).get('formats') or []:
+            if fmt.get('format_id') == video_id:
+                return fmt.get('height')
         return None
     
+    def _container_postprocessors(
+        self,
+        postprocessors: List[Dict[str, Any]],
+        infos: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        按下载到的编码选择封装步骤
+        
+        目标容器支持源编码（例如 h264/aac -> mkv/mov，vp9/opus -> webm）时
+        把 FFmpegVideoConvertor 换成 FFmpegVideoRemuxer，只复制流、不转码；
+        info 中没有编码信息的单个文件用 ffprobe 读取，仍然未知或不兼容时转码。
+        
+        Args:
+            postprocessors: 下载时的后处理器配置
+            infos: 等待后处理的 info 字典
+        """
+        target = self.output_format
+        if not all(
+            info.get('ext') == target or remux_compatible(target, *self._stream_codecs(info))
+            for info in infos
+        ):
+            return postprocessors
+        return [
+            {**pp, 'key': 'FFmpegVideoRemuxer'} if pp.get('key') == 'FFmpegVideoConvertor' else pp
+            for pp in postprocessors
+        ]
+    
+    @staticmethod
+    def _stream_codecs(info: Dict[str, Any]) -> tuple:
+        """下载到的文件的 (视频编码, 音频编码)，未知为None"""
+        vcodec, acodec = info.get('vcodec'), info.get('acodec')
+        # 需要合并的流在后处理中才生成文件，编码以各个流的 info 为准
+        if (vcodec is None or acodec is None) and not info.get('requested_formats'):
+            from utils.ffmpeg_manager import ffmpeg_manager
+            ffmpeg = ffmpeg_manager.probe()
+            probed = ffmpeg.stream_codecs(info.get('filepath')) if ffmpeg is not None else None
+            if probed is not None:
+                return probed
+        return vcodec, acodec
+    
+    @property
+    def has_pending_postprocess(self) -> bool:
+        """上次下载是否有等待执行的后处理"""
+        return self._pending_postprocess is not None
+    
+    def postprocess(self) -> Optional[str]:
+        """
+        执行 download(defer_postprocess=True) 推迟的后处理，在后处理线程池中调用
+        
+        取消下载时正在运行的 ffmpeg 进程会被结束。
+        
+        Returns:
+            最终的文件路径，失败或已取消返回None
+        """
+        pending, self._pending_postprocess = self._pending_postprocess, None
+        if pending is None:
+            return None
+        ydl_opts, deferred, filepath, queued_at = pending
+        token = self._cancel_token
+        start = time.perf_counter()
+        self.timings['postprocess_queue'] = start - queued_at
+        stage_times = self.timings['postprocessors'] = {}
+        started: Dict[str, float] = {}
+        
+        def postprocessor_hook(d: Dict[str, Any]):
+            name = d.get('postprocessor')
+            if d['status'] == 'started':
+                started[name] = time.perf_counter()
+            elif d['status'] == 'finished' and name in started:
+                stage_times[name] = stage_times.get(name, 0) + time.perf_counter() - started.pop(name)
+        
+        # 下载进度钩子在后处理中用不到
+        opts = {k: v for k, v in ydl_opts.items() if k != 'progress_hooks'}
+        opts['postprocessor_hooks'] = [postprocessor_hook]
+        if opts.get('postprocessors'):
+            opts['postprocessors'] = self._container_postprocessors(
+                opts['postprocessors'], [info for _filename, info, _files in deferred]
+            )
+        
+        try:
+            token.raise_if_cancelled()
+            with token.activate(), ydl_pool.session(opts, CallOptions(cancel_token=token)) as ydl:
+                for index, (filename, info, files_to_move) in enumerate(deferred):
+                    # 合并器等由 yt-dlp 在下载时创建的后处理器仍指向下载时的实例
+                    for pp in info.get('__postprocessors') or []:
+                        pp.set_downloader(ydl)
+                    info = ydl.post_process(filename, info, files_to_move)
+                    if index == 0:
+                        filepath = info.get('filepath') or filepath
+        except Exception as e:
+            if not self.is_cancelled and self._error_callback:
+                self._error_callback(str(e))
+            return None
+        finally:
+            self.timings['postprocess'] = time.perf_counter() - start
+            if token.is_cancelled:
+                self._release_cancelled(token)
+        
+        if self._complete_callback:
+            self._complete_callback(filepath)
+        return filepath
+    
+    def _release_cancelled(self, token: CancelToken):
+        """取消的下载线程或后处理线程退出前清理临时文件"""
+        if token.cleanup:
+            self._remove_partial_files()
+        token.mark_released()
+        self.last_cancel_latency = token.release_latency
+    
+    def _remove_partial_files(self):
+        """删除取消的下载留下的 .part、分片、.ytdl 和未完成的合并文件"""
+        for filename, tmpfilename in self._partial_files.items():
+            if not filename:
+                continue
+            base, ext = os.path.splitext(filename)
+            candidates = [
+                filename,
+                filename + '.part',
+                filename + '.ytdl',
+                filename + '.ranged',
+                filename + '.ranged.json',
+                f'{base}.temp{ext}',
+            ]
+            tmpfilename = tmpfilename or filename + '.part'
+            candidates.append(tmpfilename)
+            candidates.extend(glob.glob(glob.escape(tmpfilename) + '-Frag*'))
+            for path in candidates:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    
     def download_async(
         self,
         url: str,
         format_id: str = 'best',
-        filename: Optional[str] = None
+        filename: Optional[str] = None,
+        info_dict: Optional[Dict[str, Any]] = None,
+        resolved_format: Optional[str] = None
     ) -> threading.Thread:
         """
         异步下载视频
@@ -240,18 +652,28 @@ class VideoDownloader:
             url: 视频URL
             format_id: 格式ID
             filename: 自定义文件名
-            
+            info_dict: 已提取的原始info字典
+            resolved_format: 恢复下载时上次实际选中的格式ID
+        
         Returns:
             下载线程
         """
         thread = threading.Thread(
             target=self.download,
-            args=(url, format_id, filename),
+            args=(url, format_id, filename, info_dict, resolved_format),
             daemon=True
         )
         thread.start()
         return thread
     
-    def cancel(self):
-        """取消当前下载"""
+    def cancel(self, cleanup: bool = True):
+        """
+        取消当前下载
+        
+        立即关闭正在读取的网络连接并结束 ffmpeg 子进程，下载线程随即退出。
+        
+        Args:
+            cleanup: 是否删除未完成的临时文件；程序退出时传 False，保留 .part 文件以便续传
+        """
         self.is_cancelled = True
+        self._cancel_token.cancel(cleanup)
@@ -0,0 +1,398 @@
+"""
+格式表 - 紧凑保存视频格式信息
+"""
+import sys
+from typing import Optional, Dict, Any, List, Callable, Iterator, Tuple
+
+
+class FormatRecord:
+    """单个格式的精简记录，只保留选择格式所需的字段"""
+    
+    __slots__ = (
+        'format_id', 'ext', 'width', 'height', 'fps',
+        'tbr', 'filesize', 'vcodec', 'acodec',
+    )
+    
+    def __init__(self, fmt: Dict[str, Any]):
+        self.format_id = fmt.get('format_id')
+        self.ext = sys.intern(fmt.get('ext') or 'unknown')
+        self.width = fmt.get('width')
+        self.height = fmt.get('height')
+        self.fps = fmt.get('fps')
+        self.tbr = fmt.get('tbr')
+        self.filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+        # 编码名称重复度很高，驻留后所有记录共享同一个字符串
+        self.vcodec = sys.intern(fmt.get('vcodec') or 'none')
+        self.acodec = sys.intern(fmt.get('acodec') or 'none')
+    
+    @property
+    def has_video(self) -> bool:
+        return self.vcodec != 'none'
+    
+    @property
+    def has_audio(self) -> bool:
+        return self.acodec != 'none'
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __repr__(self):
+        return f"FormatRecord({self.format_id!r}, {self.height}p, {self.vcodec}/{self.acodec})"
+
+
+class FormatTable:
+    """格式表
+    
+    代替 yt-dlp 原始的 formats 列表常驻内存。原始格式（包含分片列表、
+    请求头等大字段）只在确实需要时通过 loader 按 format_id 重新读取。
+    """
+    
+    def __init__(
+        self,
+        records: List[FormatRecord],
+        loader: Optional[Callable[[], List[Dict[str, Any]]]] = None
+    ):
+        """
+        初始化格式表
+        
+        Args:
+            records: 格式记录列表
+            loader: 返回原始 formats 列表的函数，通常读取元数据缓存
+        """
+        self.records = records
+        self._loader = loader
+        self._by_id = {r.format_id: r for r in records}
+        self._index = None
+    
+    @classmethod
+    def from_formats(
+        cls,
+        formats: List[Dict[str, Any]],
+        loader: Optional[Callable[[], List[Dict[str, Any]]]] = None
+    ) -> 'FormatTable':
+        """从 yt-dlp 原始 formats 列表构建"""
+        return cls([FormatRecord(fmt) for fmt in formats], loader)
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def __iter__(self) -> Iterator[FormatRecord]:
+        return iter(self.records)
+    
+    def __contains__(self, format_id: str) -> bool:
+        return format_id in self._by_id
+    
+    @property
+    def index(self) -> 'FormatIndex':
+        """格式索引（首次访问时构建）"""
+        if self._index is None:
+            self._index = FormatIndex(self.records)
+        return self._index
+    
+    def get(self, format_id: str) -> Optional[FormatRecord]:
+        """按 format_id 获取记录"""
+        return self._by_id.get(format_id)
+    
+    def get_raw(self, format_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按需读取完整的原始格式字典
+        
+        Args:
+            format_id: 格式ID
+        
+        Returns:
+            yt-dlp 原始格式字典，不可用时返回None
+        """
+        if self._loader is None or format_id not in self._by_id:
+            return None
+        for fmt in self._loader():
+            if fmt.get('format_id') == format_id:
+                return fmt
+        return None
+
+
+def vcodec_family(vcodec: Optional[str]) -> str:
+    """视频编码族：avc1.64001F -> h264, vp09.00.40.08 -> vp9, av01.0.08M.08 -> av1（ffprobe 的编码名同样适用）"""
+    codec = (vcodec or 'none').split('.')[0].lower()
+    if codec in ('avc1', 'avc3', 'h264'):
+        return 'h264'
+    if codec in ('hev1', 'hvc1', 'h265', 'hevc'):
+        return 'h265'
+    if codec in ('vp09', 'vp9'):
+        return 'vp9'
+    if codec in ('av01', 'av1'):
+        return 'av1'
+    if codec in ('mp4v', 'mpeg4'):
+        return 'mp4v'
+    return codec
+
+
+def acodec_family(acodec: Optional[str]) -> str:
+    """音频编码族：mp4a.40.2 -> aac（ffprobe 的编码名同样适用，例如 ac3 -> ac-3）"""
+    codec = (acodec or 'none').split('.')[0].lower()
+    if codec in ('mp4a', 'aac'):
+        return 'aac'
+    if codec in ('ac-3', 'ac3'):
+        return 'ac-3'
+    if codec in ('ec-3', 'eac3'):
+        return 'ec-3'
+    return codec
+
+
+# 各容器可以直接封装（流复制，不转码）的 (视频编码族, 音频编码族)，None 表示不限
+CONTAINER_CODECS: Dict[str, Optional[Tuple[frozenset, frozenset]]] = {
+    'mp4': (
+        frozenset({'h264', 'h265', 'av1', 'vp9'}),
+        frozenset({'aac', 'mp3', 'opus', 'ac-3', 'ec-3', 'flac', 'alac'}),
+    ),
+    'mov': (
+        frozenset({'h264', 'h265'}),
+        frozenset({'aac', 'mp3', 'ac-3', 'alac'}),
+    ),
+    'webm': (
+        frozenset({'vp8', 'vp9', 'av1'}),
+        frozenset({'opus', 'vorbis'}),
+    ),
+    'avi': (
+        frozenset({'h264', 'mp4v'}),
+        frozenset({'mp3', 'ac-3'}),
+    ),
+    'mkv': None,
+}
+
+# 各容器常见的音频扩展名，与容器扩展名不同的列在这里
+_AUDIO_EXT = {
+    'mp4': 'm4a',
+    'mov': 'm4a',
+}
+
+# 编码族对应的 yt-dlp 编码字符串开头，用于格式选择中的 vcodec/acodec 过滤
+_CODEC_PATTERNS = {
+    'h264': 'avc[13]|h264',
+    'h265': 'hev1|hvc1|h265|hevc',
+    'vp8': 'vp0?8',
+    'vp9': 'vp0?9',
+    'av1': 'av0?1',
+    'mp4v': 'mp4v',
+    'aac': 'mp4a|aac',
+}
+
+
+def remux_compatible(container: str, vcodec: Optional[str], acodec: Optional[str]) -> bool:
+    """
+    判断两路编码能否不转码直接封装进目标容器
+    
+    Args:
+        container: 目标容器，例如 'webm'
+        vcodec: yt-dlp 的视频编码字符串，'none' 表示没有视频流，None 表示未知
+        acodec: 音频编码字符串，含义同上
+    
+    Returns:
+        能否只重新封装；编码未知时返回False（mkv 除外）
+    """
+    if container not in CONTAINER_CODECS:
+        return False
+    codecs = CONTAINER_CODECS[container]
+    if codecs is None:
+        return True
+    if vcodec is None or acodec is None:
+        return False
+    video, audio = codecs
+    return (
+        (vcodec == 'none' or vcodec_family(vcodec) in video)
+        and (acodec == 'none' or acodec_family(acodec) in audio)
+    )
+
+
+def codec_filters(container: str) -> Tuple[str, str]:
+    """
+    目标容器的格式选择过滤条件，选出的格式可以不转码直接封装
+    
+    Args:
+        container: 目标容器
+    
+    Returns:
+        (视频过滤, 音频过滤)，例如 ("[vcodec~='^(vp0?9|...)']", "[acodec~='^(opus|vorbis)']")；
+        不限编码的容器返回空字符串
+    """
+    codecs = CONTAINER_CODECS.get(container)
+    if codecs is None:
+        return '', ''
+    
+    def pattern(field: str, families: frozenset) -> str:
+        alternatives = '|'.join(_CODEC_PATTERNS.get(family, family) for family in sorted(families))
+        return f"[{field}~='^({alternatives})']"
+    
+    video, audio = codecs
+    return pattern('vcodec', video), pattern('acodec', audio)
+
+
+def _score(record: FormatRecord):
+    """同一分组内的优劣比较：比特率优先，其次文件大小"""
+    return (record.tbr or 0, record.filesize or 0)
+
+
+class FormatIndex:
+    """格式索引
+    
+    一次遍历把视频格式按 (高度, 帧率, 编码族) 分组，每组只保留比特率最高的一个，
+    之后的查询直接在分组结果上进行，返回可以直接交给 yt-dlp 的精确 format_id，
+    下载时不需要再解析 "bestvideo[height<=720]..." 这样的格式选择字符串。
+    """
+    
+    def __init__(self, records):
+        """
+        构建索引
+        
+        Args:
+            records: FormatRecord 序列（例如 FormatTable）
+        """
+        buckets: Dict[tuple, FormatRecord] = {}
+        audio: List[FormatRecord] = []
+        
+        for record in records:
+            if record.has_video and record.height:
+                key = (record.height, round(record.fps or 0), vcodec_family(record.vcodec))
+                current = buckets.get(key)
+                if current is None or _score(record) > _score(current):
+                    buckets[key] = record
+            elif record.has_audio:
+                audio.append(record)
+        
+        # 高度、帧率从高到低，同档位内比特率从高到低
+        self.video = sorted(
+            buckets.values(),
+            key=lambda r: (r.height, r.fps or 0, _score(r)),
+            reverse=True
+        )
+        self.audio = sorted(audio, key=_score, reverse=True)
+        self.buckets = buckets
+    
+    @staticmethod
+    def _fit(record: FormatRecord, container: str) -> int:
+        """
+        格式与目标容器的契合程度
+        
+        Returns:
+            2 编码可直接封装且扩展名与容器一致，1 编码可直接封装，0 需要转码
+        """
+        if record.has_video:
+            compatible = remux_compatible(container, record.vcodec, 'none')
+            native = record.ext == container
+        else:
+            compatible = remux_compatible(container, 'none', record.acodec)
+            native = record.ext == _AUDIO_EXT.get(container, container)
+        return (2 if native else 1) if compatible else 0
+    
+    def heights(self) -> List[int]:
+        """所有可用的视频高度（从高到低）"""
+        return sorted({r.height for r in self.video}, reverse=True)
+    
+    def best_video(
+        self,
+        max_height: Optional[int] = None,
+        min_height: Optional[int] = None,
+        vcodec: Optional[str] = None,
+        max_filesize: Optional[int] = None,
+        container: Optional[str] = None
+    ) -> Optional[FormatRecord]:
+        """
+        查询满足条件的最佳视频格式
+        
+        Args:
+            max_height: 最大高度，例如 1080
+            min_height: 最小高度
+            vcodec: 编码族，例如 'av1'、'vp9'、'h264'
+            max_filesize: 视频流自身的大小上限(字节)，大小未知的格式会被跳过
+            container: 目标容器，同一高度中优先选择可直接封装进该容器的编码和扩展名
+        """
+        candidates = []
+        for record in self.video:
+            # 只在满足条件的最高一档中比较
+            if candidates and record.height != candidates[0].height:
+                break
+            if max_height is not None and record.height > max_height:
+                continue
+            if min_height is not None and record.height < min_height:
+                break
+            if vcodec is not None and vcodec_family(record.vcodec) != vcodec:
+                continue
+            if max_filesize is not None and not (record.filesize and record.filesize <= max_filesize):
+                continue
+            if container is None:
+                return record
+            candidates.append(record)
+        if not candidates:
+            return None
+        # max 返回第一个最大值，契合程度相同时保持帧率、比特率顺序
+        return max(candidates, key=lambda r: self._fit(r, container))
+    
+    def best_audio(
+        self,
+        acodec: Optional[str] = None,
+        prefer_ext: Optional[str] = None
+    ) -> Optional[FormatRecord]:
+        """
+        查询最佳纯音频格式
+        
+        Args:
+            acodec: 编码族，例如 'aac'、'opus'
+            prefer_ext: 优先选择的扩展名，找不到时退回任意扩展名
+        """
+        candidates = [
+            r for r in self.audio
+            if acodec is None or acodec_family(r.acodec) == acodec
+        ]
+        if prefer_ext:
+            for record in candidates:
+                if record.ext == prefer_ext:
+                    return record
+        return candidates[0] if candidates else None
+    
+    def best_under(self, max_bytes: int, container: Optional[str] = None) -> Optional[str]:
+        """
+        查询总大小（视频+配对音频）不超过上限的最佳组合
+        
+        Args:
+            max_bytes: 大小上限(字节)
+            container: 目标容器，配对音频时优先选择可直接封装的编码
+        
+        Returns:
+            精确的格式选择字符串，没有满足条件的组合时返回None
+        """
+        for record in self.video:
+            if not record.filesize:
+                continue
+            audio = None if record.has_audio else self._pair_audio(record, container)
+            total = record.filesize + ((audio.filesize or 0) if audio else 0)
+            if total <= max_bytes:
+                return self.selector(record, audio)
+        return None
+    
+    def selector(
+        self,
+        video: FormatRecord,
+        audio: Optional[FormatRecord] = None,
+        container: Optional[str] = None
+    ) -> str:
+        """
+        生成精确的格式选择字符串
+        
+        Args:
+            video: 视频格式
+            audio: 配对的音频格式，纯视频流未指定时自动配对
+            container: 目标容器，自动配对时优先选择可直接封装的音频
+        """
+        if video.has_audio:
+            return video.format_id
+        if audio is None:
+            audio = self._pair_audio(video, container)
+        return f"{video.format_id}+{audio.format_id}" if audio else video.format_id
+    
+    def _pair_audio(self, video: FormatRecord, container: Optional[str] = None) -> Optional[FormatRecord]:
+        """为纯视频流选择容器兼容的音频；未指定容器时按视频流的扩展名配对"""
+        if container is None or not self.audio:
+            return self.best_audio(prefer_ext='m4a' if video.ext == 'mp4' else video.ext)
+        # 同等契合程度下保持比特率顺序
+        return max(self.audio, key=lambda r: self._fit(r, container))
@@ -0,0 +1,192 @@
+"""
+任务日志 - 持久化记录未完成的下载任务，程序重启后继续下载
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+
+class JobJournal:
+    """基于SQLite的下载任务日志
+    
+    每个提交到调度器的任务写入一行：URL、请求的格式及其画质描述、实际选中的格式ID、
+    输出模板、已下载字节数和状态。任务完成、失败或被用户取消时删除该行；
+    程序退出或崩溃时留下的行即为需要恢复的任务。
+    """
+    
+    # 任务状态
+    QUEUED = 'queued'
+    DOWNLOADING = 'downloading'
+    INTERRUPTED = 'interrupted'
+    
+    def __init__(self, db_path: Optional[str] = None, progress_interval: float = 2.0):
+        """
+        初始化任务日志
+        
+        Args:
+            db_path: 数据库文件路径，默认为 data/jobs.db
+            progress_interval: 同一任务两次写入下载进度的最小间隔(秒)
+        """
+        if db_path is None:
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            db_path = os.path.join(base_path, 'data', 'jobs.db')
+        
+        self.db_path = db_path
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_progress: Dict[int, float] = {}
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """首次使用时才打开数据库（需持有锁）"""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    format_id TEXT NOT NULL,
+                    resolved_format TEXT,
+                    output_path TEXT,
+                    filename TEXT,
+                    outtmpl TEXT,
+                    tmpfilename TEXT,
+                    options TEXT,
+                    state TEXT NOT NULL,
+                    downloaded_bytes INTEGER DEFAULT 0,
+                    total_bytes INTEGER DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    quality TEXT
+                );
+            ''')
+            # 旧版数据库没有 quality 列
+            columns = {row[1] for row in db.execute('PRAGMA table_info(jobs)')}
+            if 'quality' not in columns:
+                db.execute('ALTER TABLE jobs ADD COLUMN quality TEXT')
+                db.commit()
+            self._db = db
+        return self._db
+    
+    def _execute(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Cursor]:
+        """执行一条写入语句并提交"""
+        with self._lock:
+            try:
+                cursor = self._conn.execute(sql, params)
+                self._conn.commit()
+                return cursor
+            except sqlite3.Error as e:
+                print(f"写入任务日志失败: {e}")
+                return None
+    
+    def begin(
+        self,
+        url: str,
+        format_id: str,
+        output_path: Optional[str] = None,
+        filename: Optional[str] = None,
+        outtmpl: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        quality: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        记录一个新任务
+        
+        Args:
+            url: 视频URL
+            format_id: 请求的格式ID
+            output_path: 输出目录
+            filename: 自定义文件名
+            outtmpl: 输出模板
+            options: 下载器选项（输出格式、字幕等），恢复时原样应用
+            quality: 用户选择的画质描述（如 "720p"），恢复时写入历史记录
+        
+        Returns:
+            任务日志ID，写入失败返回None
+        """
+        now = time.time()
+        cursor = self._execute(
+            'INSERT INTO jobs (url, format_id, output_path, filename, outtmpl, options, '
+            'state, created, updated, quality) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (url, format_id, output_path, filename, outtmpl,
+             json.dumps(options or {}, ensure_ascii=False), self.QUEUED, now, now, quality)
+        )
+        return cursor.lastrowid if cursor else None
+    
+    def update_progress(self, job_id: int, progress: Dict[str, Any], force: bool = False):
+        """
+        记录下载进度（按间隔限流）
+        
+        Args:
+            job_id: 任务日志ID
+            progress: 下载器的进度信息
+            force: 忽略限流立即写入
+        """
+        now = time.monotonic()
+        if not force and now - self._last_progress.get(job_id, 0) < self.progress_interval:
+            return
+        self._last_progress[job_id] = now
+        self._execute(
+            'UPDATE jobs SET state = ?, resolved_format = COALESCE(?, resolved_format), '
+            'tmpfilename = COALESCE(?, tmpfilename), downloaded_bytes = ?, total_bytes = ?, '
+            'updated = ? WHERE id = ?',
+            (self.DOWNLOADING, progress.get('format_id'), progress.get('tmpfilename'),
+             progress.get('downloaded_bytes') or 0, progress.get('total_bytes') or 0,
+             time.time(), job_id)
+        )
+    
+    def mark_interrupted(self, job_id: int):
+        """标记任务被中断（程序退出），下次启动时恢复"""
+        self._last_progress.pop(job_id, None)
+        self._execute(
+            'UPDATE jobs SET state = ?, updated = ? WHERE id = ?',
+            (self.INTERRUPTED, time.time(), job_id)
+        )
+    
+    def finish(self, job_id: int):
+        """任务已结束，不再需要恢复"""
+        self._last_progress.pop(job_id, None)
+        self._execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+    
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """
+        获取需要恢复的任务
+        
+        Returns:
+            任务列表（按提交顺序），options 已解析为字典
+        """
+        with self._lock:
+            try:
+                rows = self._conn.execute('SELECT * FROM jobs ORDER BY id').fetchall()
+            except sqlite3.Error as e:
+                print(f"读取任务日志失败: {e}")
+                return []
+        
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job['options'] = json.loads(job['options'] or '{}')
+            jobs.append(job)
+        return jobs
+    
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# 全局实例
+job_journal = JobJournal()
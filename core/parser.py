@@ -1,9 +1,25 @@
 """
 URL解析器 - 解析视频信息
 """
-import yt_dlp
-from typing import Optional, Dict, Any, List
-from utils.helpers import detect_platform
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Callable, Tuple, AsyncIterator
+from utils.helpers import detect_platform, host_key, is_playlist_url
+from .cache import metadata_cache
+from .formats import FormatTable
+from .session import ydl_pool
+
+
+# 展开播放列表时使用的选项：只取条目链接，不解析每个视频
+EXPAND_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+}
+
+# 频道 -> 标签页 -> 视频 等嵌套列表的最大展开层数
+MAX_EXPAND_DEPTH = 3
 
 
 class VideoParser:
@@ -15,6 +31,8 @@ class VideoParser:
             'no_warnings': True,
             'extract_flat': False,
         }
+        self.use_cache = True  # 是否使用元数据缓存
+        self.output_format = 'mp4'  # 整理格式时优先选择可直接封装进该容器的编码
     
     def get_video_info(self, url: str) -> Optional[Dict[str, Any]]:
         """
@@ -22,81 +40,250 @@ class VideoParser:
         
         Args:
             url: 视频URL
-            
+        
         Returns:
             视频信息字典，包含标题、时长、格式等
         """
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if info is None:
-                    return None
-                
-                # 整理格式列表
-                formats = self._parse_formats(info.get('formats', []))
-                
-                return {
-                    'title': info.get('title', '未知标题'),
-                    'duration': info.get('duration'),
-                    'thumbnail': info.get('thumbnail'),
-                    'description': info.get('description', ''),
-                    'uploader': info.get('uploader', '未知上传者'),
-                    'upload_date': info.get('upload_date'),
-                    'view_count': info.get('view_count'),
-                    'like_count': info.get('like_count'),
-                    'platform': detect_platform(url),
-                    'webpage_url': info.get('webpage_url', url),
-                    'formats': formats,
-                    'raw_formats': info.get('formats', []),
-                }
+            return self._resolve(url)
         except Exception as e:
             print(f"解析视频信息失败: {e}")
             return None
     
-    def _parse_formats(self, formats: List[Dict]) -> List[Dict[str, Any]]:
+    async def get_video_info_many(
+        self,
+        urls: Iterable[str],
+        concurrency: int = 8,
+        host_limits: Optional[Dict[str, int]] = None,
+        retries: int = 2,
+        backoff: float = 0.5,
+        skip: Optional[Callable[[str], bool]] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        并发解析一批视频，按完成顺序逐个返回
+        
+        yt-dlp 的解析是阻塞调用，在专用线程池中执行；事件循环负责并发控制：
+        总并发不超过 concurrency，同一主机不超过 host_limits 中的上限，
+        网络错误等可重试的失败按指数退避重试，退避期间不占用并发名额。
+        
+        Args:
+            urls: 视频URL列表
+            concurrency: 同时解析的最大数量
+            host_limits: 按主机的并发上限，未列出的主机只受总并发限制
+            retries: 失败后的最大重试次数
+            backoff: 第一次重试前的等待秒数，之后每次翻倍
+            skip: 轮到某个URL解析时调用，返回True则不再解析（如任务已取消）
+        
+        Yields:
+            (url, 视频信息) 元组，与 get_video_info 的返回值相同，失败为None；
+            被 skip 跳过的URL不返回
+        """
+        loop = asyncio.get_running_loop()
+        host_limits = host_limits or {}
+        semaphore = asyncio.Semaphore(concurrency)
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='parse-many')
+        
+        def host_slot(url: str) -> asyncio.Semaphore:
+            host = host_key(url)
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.Semaphore(host_limits.get(host, concurrency))
+            return host_semaphores[host]
+        
+        async def resolve(url: str):
+            error = None
+            for attempt in range(retries + 1):
+                if attempt:
+                    await asyncio.sleep(backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5))
+                # 先占主机名额再占总名额，等待主机名额时不占用总并发
+                async with host_slot(url), semaphore:
+                    if skip is not None and skip(url):
+                        return url, None, True
+                    try:
+                        return url, await loop.run_in_executor(executor, self._resolve, url), False
+                    except Exception as e:
+                        error = e
+                if not _is_retryable(error):
+                    break
+            print(f"解析视频信息失败: {error}")
+            return url, None, False
+        
+        # 批量解析期间会话池保留足够的空闲实例，每个解析不必重新构造 YoutubeDL；
+        # 结束后恢复会话池的上限
+        with ydl_pool.reserve(concurrency):
+            tasks = [asyncio.ensure_future(resolve(url)) for url in urls]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    url, info, skipped = await next_done
+                    if not skipped:
+                        yield url, info
+            finally:
+                for task in tasks:
+                    task.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def resolve_many(
+        self,
+        urls: Iterable[str],
+        callback: Callable[[str, Optional[Dict[str, Any]]], None],
+        **kwargs
+    ):
+        """
+        在当前线程中运行 get_video_info_many，每解析完一个调用一次回调
+        
+        Args:
+            urls: 视频URL列表
+            callback: 回调，参数为 (url, 视频信息)，在本线程中调用
+            **kwargs: 传递给 get_video_info_many 的参数
+        """
+        async def consume():
+            async for url, info in self.get_video_info_many(urls, **kwargs):
+                callback(url, info)
+        
+        asyncio.run(consume())
+    
+    def _resolve(self, url: str) -> Optional[Dict[str, Any]]:
+        """解析并整理视频信息，出错时抛出异常"""
+        info = self.get_raw_info(url)
+        
+        if info is None:
+            return None
+        
+        # 原始格式不常驻内存，需要时通过格式表按ID读取
+        format_table = FormatTable.from_formats(
+            info.get('formats', []),
+            loader=lambda: (self.get_raw_info(url) or {}).get('formats', [])
+        )
+        
+        # 整理格式列表
+        formats = self._parse_formats(format_table)
+        
+        return {
+            'title': info.get('title', '未知标题'),
+            'duration': info.get('duration'),
+            'thumbnail': info.get('thumbnail'),
+            'description': info.get('description', ''),
+            'uploader': info.get('uploader', '未知上传者'),
+            'upload_date': info.get('upload_date'),
+            'view_count': info.get('view_count'),
+            'like_count': info.get('like_count'),
+            'platform': detect_platform(url),
+            'webpage_url': info.get('webpage_url', url),
+            'formats': formats,
+            'format_table': format_table,
+        }
+    
+    def expand(self, url: str) -> Iterator[str]:
+        """
+        展开播放列表或频道，逐个返回其中视频的链接
+        
+        使用平面解析，只请求列表页而不解析每个视频；条目按页获取，
+        取到一页就返回一页，内存占用与列表长度无关。
+        普通视频链接原样返回一次，其解析结果写入元数据缓存，之后解析不再重复请求。
+        
+        Args:
+            url: 播放列表、频道或视频URL
+        
+        Yields:
+            视频URL
+        """
+        with ydl_pool.session(EXPAND_OPTS) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            if info is None:
+                return
+            yield from self._iter_entries(ydl, info, url, 0)
+    
+    def _iter_entries(self, ydl, info: Dict[str, Any], url: str, depth: int) -> Iterator[str]:
+        """逐个返回平面解析结果中的视频链接，嵌套的列表递归展开"""
+        result_type = info.get('_type', 'video')
+        
+        if result_type in ('playlist', 'multi_video'):
+            entries = info.get('entries') or []
+            if hasattr(entries, '_getslice'):
+                # yt-dlp 的 PagedList：按页请求，不缓存已返回的页
+                entries._use_cache = False
+                entries = entries._getslice(0, None)
+            for entry in entries:
+                if entry:
+                    entry_url = entry.get('url') or entry.get('webpage_url') or ''
+                    yield from self._iter_entries(ydl, entry, entry_url, depth + 1)
+        
+        elif result_type in ('url', 'url_transparent'):
+            entry_url = info.get('url') or url
+            if depth < MAX_EXPAND_DEPTH and is_playlist_url(entry_url):
+                # 频道首页的各个标签页等
+                nested = ydl.extract_info(
+                    entry_url, download=False, process=False, ie_key=info.get('ie_key')
+                )
+                if nested:
+                    yield from self._iter_entries(ydl, nested, entry_url, depth + 1)
+            elif '://' in entry_url:
+                yield entry_url
+        
+        else:
+            # 直接得到了视频：已解析过，处理后写入缓存供下载前的解析使用
+            if depth == 0 and self.use_cache:
+                processed = ydl.process_ie_result(info, download=False)
+                if processed:
+                    metadata_cache.put(url, ydl.sanitize_info(processed, remove_private_keys=True))
+            yield info.get('webpage_url') or url
+    
+    def get_raw_info(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        获取yt-dlp原始info字典，优先读取元数据缓存
+        
+        Args:
+            url: 视频URL
+        
+        Returns:
+            经过 sanitize_info 处理、可序列化的info字典；与 yt-dlp 的 --load-info-json
+            一样去掉了 requested_formats 等格式选择结果，下载时按当时的格式重新选择
+        """
+        if self.use_cache:
+            info = metadata_cache.get(url)
+            if info is not None:
+                return info
+        
+        with ydl_pool.session(self.ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                return None
+            info = ydl.sanitize_info(info, remove_private_keys=True)
+        
+        if self.use_cache:
+            metadata_cache.put(url, info)
+        return info
+    
+    def _parse_formats(self, formats) -> List[Dict[str, Any]]:
         """
         解析并整理格式列表
         
         Args:
-            formats: yt-dlp返回的原始格式列表
-            
+            formats: yt-dlp返回的原始格式列表，或已构建的 FormatTable
+        
         Returns:
-            整理后的格式列表
+            整理后的格式列表，format_id 为可直接下载的精确格式选择
         """
+        if not isinstance(formats, FormatTable):
+            formats = FormatTable.from_formats(formats)
+        index = formats.index
+        
         parsed = []
-        seen = set()
-        
-        for fmt in formats:
-            # 跳过纯音频格式（除非是音频下载）
-            vcodec = fmt.get('vcodec', 'none')
-            acodec = fmt.get('acodec', 'none')
-            
-            # 获取分辨率
-            height = fmt.get('height')
-            width = fmt.get('width')
-            
-            if height and vcodec != 'none':
-                resolution = f"{height}p"
-                
-                # 避免重复的分辨率
-                if resolution not in seen:
-                    seen.add(resolution)
-                    parsed.append({
-                        'format_id': fmt.get('format_id'),
-                        'resolution': resolution,
-                        'height': height,
-                        'width': width,
-                        'ext': fmt.get('ext', 'mp4'),
-                        'filesize': fmt.get('filesize') or fmt.get('filesize_approx'),
-                        'vcodec': vcodec,
-                        'acodec': acodec,
-                        'fps': fmt.get('fps'),
-                        'tbr': fmt.get('tbr'),  # 总比特率
-                    })
-        
-        # 按分辨率排序（从高到低）
-        parsed.sort(key=lambda x: x.get('height', 0), reverse=True)
+        for height in index.heights():  # 从高到低
+            # 每个分辨率取 (帧率, 编码) 分组中最好的一个
+            video = index.best_video(max_height=height, container=self.output_format)
+            parsed.append({
+                'format_id': index.selector(video, container=self.output_format),
+                'resolution': f"{height}p",
+                'height': height,
+                'width': video.width,
+                'ext': video.ext,
+                'filesize': video.filesize,
+                'vcodec': video.vcodec,
+                'acodec': video.acodec,
+                'fps': video.fps,
+                'tbr': video.tbr,  # 总比特率
+            })
         
         # 添加"最佳质量"选项
         if parsed:
@@ -123,7 +310,7 @@ class VideoParser:
         
         Args:
             url: 视频URL
-            
+        
         Returns:
             质量选项列表
         """
@@ -131,3 +318,15 @@ class VideoParser:
         if info and info.get('formats'):
             return [f['resolution'] for f in info['formats']]
         return ['最佳质量', '1080p', '720p', '480p', '360p', '仅音频']
+
+
+def _is_retryable(error: Exception) -> bool:
+    """解析失败是否值得重试
+    
+    yt-dlp 把不支持的链接、视频不存在等确定性错误标记为 expected，
+    重试也不会成功；网络错误、服务器 5xx 等其它错误可以重试。
+    """
+    cause = getattr(error, 'exc_info', None)
+    if cause:
+        error = cause[1] or error
+    return not getattr(error, 'expected', False)
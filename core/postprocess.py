@@ -0,0 +1,82 @@
+"""
+后处理线程池 - 合并、转码、提取音频等 ffmpeg 任务与下载分开执行
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Callable, Any
+
+
+def default_workers() -> int:
+    """默认线程数：CPU 核数"""
+    return os.cpu_count() or 2
+
+
+class PostprocessPool:
+    """后处理线程池
+    
+    下载完成后的 ffmpeg 处理是CPU密集的，在下载线程中执行会占住下载名额，
+    多个任务同时转码又会超出CPU核数。所有下载器共享这个线程池：
+    下载线程把后处理提交到队列后立即返回，同时运行的 ffmpeg 不超过 workers 个。
+    """
+    
+    def __init__(self, workers: Optional[int] = None):
+        """
+        初始化线程池
+        
+        Args:
+            workers: 同时执行的后处理数，默认为CPU核数
+        """
+        self.workers = workers or default_workers()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._active = 0
+    
+    def set_workers(self, workers: Optional[int]):
+        """修改线程数，已提交的任务在原线程池中执行完"""
+        with self._lock:
+            self.workers = workers or default_workers()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+    
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        提交后处理任务
+        
+        Returns:
+            Future，结果为 func 的返回值
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='postprocess'
+                )
+            self._pending += 1
+            executor = self._executor
+        return executor.submit(self._run, func, *args, **kwargs)
+    
+    def _run(self, func: Callable[..., Any], *args, **kwargs):
+        with self._lock:
+            self._pending -= 1
+            self._active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+    
+    def pending(self) -> int:
+        """排队中的任务数"""
+        with self._lock:
+            return self._pending
+    
+    def active(self) -> int:
+        """执行中的任务数"""
+        with self._lock:
+            return self._active
+
+
+# 全局实例
+postprocess_pool = PostprocessPool()
@@ -0,0 +1,94 @@
+"""
+进度汇总 - 下载线程写入最新进度，界面定时批量读取
+"""
+import threading
+from typing import Optional, Dict, Any, Hashable, List, Tuple
+
+
+class ProgressSlot:
+    """单个任务的进度槽
+    
+    下载线程每次回调只覆盖这几个字段，不分配新对象；
+    version 在写入完成后递增，读取方据此判断是否有新进度。
+    """
+    
+    __slots__ = (
+        'status', 'downloaded_bytes', 'total_bytes', 'speed', 'eta',
+        'percent', 'version', 'released',
+    )
+    
+    def __init__(self):
+        self.status = 'queued'
+        self.downloaded_bytes = 0
+        self.total_bytes = 0
+        self.speed = 0.0
+        self.eta: Optional[float] = None
+        self.percent = 0.0
+        self.version = 0
+        self.released = False
+    
+    def update(self, d: Dict[str, Any]):
+        """用 yt-dlp 进度钩子的参数更新"""
+        status = d['status']
+        if status == 'downloading':
+            downloaded = d.get('downloaded_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            self.downloaded_bytes = downloaded
+            self.total_bytes = total
+            self.speed = d.get('speed') or 0.0
+            self.eta = d.get('eta')
+            self.percent = downloaded / total * 100 if total > 0 else 0.0
+        elif status == 'finished':
+            self.percent = 100.0
+        self.status = status
+        self.version += 1
+
+
+class ProgressAggregator:
+    """进度汇总器
+    
+    每个任务注册一个 ProgressSlot，下载线程直接写入槽位；
+    界面线程用一个定时器调用 changed()，一次取出所有有更新的任务。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[Hashable, ProgressSlot] = {}
+        self._seen: Dict[Hashable, int] = {}
+    
+    def register(self, key: Hashable) -> ProgressSlot:
+        """为任务分配进度槽"""
+        slot = ProgressSlot()
+        with self._lock:
+            self._slots[key] = slot
+            self._seen[key] = 0
+        return slot
+    
+    def release(self, key: Hashable):
+        """任务结束，最后一次进度被取出后移除槽位"""
+        with self._lock:
+            slot = self._slots.get(key)
+        if slot is not None:
+            slot.released = True
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def changed(self) -> List[Tuple[Hashable, ProgressSlot]]:
+        """
+        取出自上次调用以来有更新的任务
+        
+        Returns:
+            (任务键, 进度槽) 列表
+        """
+        updates = []
+        with self._lock:
+            for key, slot in list(self._slots.items()):
+                version = slot.version
+                if version != self._seen[key]:
+                    self._seen[key] = version
+                    updates.append((key, slot))
+                if slot.released:
+                    del self._slots[key]
+                    del self._seen[key]
+        return updates
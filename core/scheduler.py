@@ -0,0 +1,581 @@
+"""
+下载调度器 - 有界并发的解析/下载任务队列
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Callable, Dict, Any, List
+
+from utils.helpers import host_key
+from .cancel import CancelToken
+from .parser import VideoParser
+from .downloader import VideoDownloader
+from .journal import JobJournal
+from .postprocess import postprocess_pool
+
+
+class DownloadJob:
+    """调度器中的单个下载任务"""
+    
+    # 任务状态
+    QUEUED = 'queued'
+    PARSING = 'parsing'
+    WAITING = 'waiting'
+    DOWNLOADING = 'downloading'
+    POSTPROCESSING = 'postprocessing'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    SKIPPED = 'skipped'
+    
+    def __init__(
+        self,
+        url: str,
+        format_id: str = 'best',
+        filename: Optional[str] = None,
+        priority: int = 0,
+        info: Optional[Dict[str, Any]] = None,
+        downloader: Optional[VideoDownloader] = None,
+        on_parsed: Optional[Callable[['DownloadJob'], None]] = None,
+        on_finished: Optional[Callable[['DownloadJob'], None]] = None,
+        journal_id: Optional[int] = None,
+        resolved_format: Optional[str] = None,
+        quality: Optional[str] = None
+    ):
+        """
+        初始化任务
+        
+        Args:
+            url: 视频URL
+            format_id: 格式ID
+            filename: 自定义文件名
+            priority: 优先级，数值越大越先执行
+            info: 已解析的视频信息，提供时跳过解析阶段
+            downloader: 执行下载的下载器，默认由调度器创建
+            on_parsed: 解析完成回调（在工作线程中调用）
+            on_finished: 任务结束回调（完成/失败/取消，在工作线程中调用）
+            journal_id: 恢复任务时对应的任务日志ID
+            resolved_format: 恢复任务时上次实际选中的格式ID
+            quality: 用户选择的画质描述，写入任务日志
+        """
+        self.url = url
+        self.format_id = format_id
+        self.filename = filename
+        self.priority = priority
+        self.info = info
+        self.downloader = downloader
+        self.on_parsed = on_parsed
+        self.on_finished = on_finished
+        self.journal_id = journal_id
+        self.resolved_format = resolved_format
+        self.quality = quality
+        # 由 submit 设置，为True时跳过重复检查
+        self.force = False
+        
+        self.host = host_key(url)
+        # 在下载开始之前就存在，下载开始前的取消也不会丢失
+        self.cancel_token = CancelToken()
+        self.state = self.QUEUED
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+        # 调度器内部的结束回调，先于 on_finished 调用
+        self._done_callbacks: List[Callable[['DownloadJob'], None]] = []
+    
+    @property
+    def is_finished(self) -> bool:
+        """任务是否已结束"""
+        return self._done.is_set()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        """任务是否已取消"""
+        return self.state == self.CANCELLED
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待任务结束"""
+        return self._done.wait(timeout)
+    
+    def _finish(self, state: str, error: Optional[str] = None):
+        """标记任务结束并触发回调"""
+        if self._done.is_set():
+            return
+        self.state = state
+        if error:
+            self.error = error
+        self._done.set()
+        for callback in self._done_callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"任务回调出错: {e}")
+        if self.on_finished:
+            try:
+                self.on_finished(self)
+            except Exception as e:
+                print(f"任务回调出错: {e}")
+
+
+class _Stage:
+    """调度阶段：优先级队列 + 固定数量的工作线程 + 按主机限流"""
+    
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        host_limits: Dict[str, int],
+        handler: Callable[[DownloadJob], None]
+    ):
+        self.name = name
+        self.workers = max(1, workers)
+        self.host_limits = host_limits
+        self.handler = handler
+        
+        self._cond = threading.Condition()
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._active_hosts: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+    
+    def put(self, job: DownloadJob):
+        """加入队列"""
+        with self._cond:
+            if self._closed:
+                return
+            heapq.heappush(self._heap, (-job.priority, next(self._seq), job))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.name}-{len(self._threads) + 1}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+    
+    def pending(self) -> int:
+        """排队中的任务数"""
+        with self._cond:
+            return len(self._heap)
+    
+    def active(self) -> int:
+        """执行中的任务数"""
+        with self._cond:
+            return sum(self._active_hosts.values())
+    
+    def close(self):
+        """停止工作线程，丢弃排队任务"""
+        with self._cond:
+            self._closed = True
+            dropped = [item[2] for item in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+        return dropped
+    
+    def _host_available(self, host: str) -> bool:
+        limit = self.host_limits.get(host)
+        return limit is None or self._active_hosts.get(host, 0) < limit
+    
+    def _next_job(self) -> Optional[DownloadJob]:
+        """取出优先级最高且主机未满的任务（需持有锁）"""
+        deferred = []
+        job = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if item[2].is_finished:
+                continue
+            if self._host_available(item[2].host):
+                job = item[2]
+                break
+            deferred.append(item)
+        for item in deferred:
+            heapq.heappush(self._heap, item)
+        return job
+    
+    def _worker(self):
+        while True:
+            with self._cond:
+                # 先检查是否已关闭再取任务：关闭后排队的任务由 close 返回给调用方处理，
+                # 已经取出的任务则照常执行，不会被丢弃
+                job = None
+                while not self._closed:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                self._active_hosts[job.host] = self._active_hosts.get(job.host, 0) + 1
+            
+            try:
+                self.handler(job)
+            except Exception as e:
+                job._finish(DownloadJob.FAILED, str(e))
+            finally:
+                with self._cond:
+                    self._active_hosts[job.host] -= 1
+                    if not self._active_hosts[job.host]:
+                        del self._active_hosts[job.host]
+                    self._cond.notify_all()
+
+
+class DownloadScheduler:
+    """有界并发的下载调度器
+    
+    解析和下载分为两个阶段，各自有独立的工作线程数量上限，
+    并且每个阶段内同一主机的并发数不超过 host_limits 中的配置。
+    下载完成后需要 ffmpeg 处理的任务交给共享的后处理线程池，下载名额立即释放。
+    提供 journal 时每个任务都会记录到任务日志，shutdown 时未完成的任务
+    标记为中断，可在下次启动时通过 journal.unfinished() 恢复。
+    """
+    
+    # 默认的按主机并发上限
+    DEFAULT_HOST_LIMITS = {
+        'bilibili.com': 2,
+        'youtube.com': 4,
+    }
+    
+    def __init__(
+        self,
+        parse_workers: int = 4,
+        download_workers: int = 3,
+        host_limits: Optional[Dict[str, int]] = None,
+        parser: Optional[VideoParser] = None,
+        output_path: Optional[str] = None,
+        is_duplicate: Optional[Callable[[str], Optional[str]]] = None,
+        journal: Optional[JobJournal] = None,
+        batch_parse_concurrency: int = 8
+    ):
+        """
+        初始化调度器
+        
+        Args:
+            parse_workers: 同时解析的最大任务数
+            download_workers: 同时下载的最大任务数
+            host_limits: 按主机的并发上限，默认为 DEFAULT_HOST_LIMITS
+            parser: 解析器实例
+            output_path: 调度器自行创建下载器时使用的输出目录
+            is_duplicate: 重复检查函数，返回已下载文件的路径或 None，
+                          如 history_manager.is_downloaded
+            journal: 任务日志，用于中断后恢复下载
+            batch_parse_concurrency: resolve_batch 同时解析的最大任务数
+        """
+        self.parser = parser or VideoParser()
+        self.output_path = output_path
+        self.is_duplicate = is_duplicate
+        self.journal = journal
+        self.batch_parse_concurrency = batch_parse_concurrency
+        self.host_limits = dict(
+            self.DEFAULT_HOST_LIMITS if host_limits is None else host_limits
+        )
+        
+        self._lock = threading.Lock()
+        self._jobs: List[DownloadJob] = []
+        self._shutting_down = False
+        
+        self._parse_stage = _Stage('parse', parse_workers, self.host_limits, self._run_parse)
+        self._download_stage = _Stage('download', download_workers, self.host_limits, self._run_download)
+    
+    def submit(self, url: str, force: bool = False, parse: bool = True, **kwargs) -> DownloadJob:
+        """
+        提交下载任务
+        
+        Args:
+            url: 视频URL
+            force: 为True时跳过重复检查
+            parse: 为False时不进入解析阶段，之后由 resolve_batch 统一解析
+            **kwargs: 传递给 DownloadJob 的参数
+        
+        Returns:
+            任务对象，已下载过的链接直接以 SKIPPED 状态结束，
+            result 为已有文件的路径
+        """
+        job = DownloadJob(url, **kwargs)
+        job.force = force
+        
+        # 在解析之前检查，重复的链接不发起任何网络请求
+        if not force and self.is_duplicate:
+            existing = self.is_duplicate(url)
+            if existing:
+                job.result = existing
+                job._finish(DownloadJob.SKIPPED)
+                return job
+        
+        if self.journal:
+            self._journal_begin(job)
+        
+        with self._lock:
+            self._jobs = [j for j in self._jobs if not j.is_finished]
+            self._jobs.append(job)
+        
+        if job.info is None:
+            if parse:
+                self._parse_stage.put(job)
+        else:
+            job.state = DownloadJob.WAITING
+            self._download_stage.put(job)
+        return job
+    
+    def resolve_batch(self, jobs: List[DownloadJob]) -> threading.Thread:
+        """
+        并发解析一批以 parse=False 提交的任务
+        
+        在后台线程中用 VideoParser.get_video_info_many 解析，
+        每解析完一个任务立即进入下载阶段，不必等整批解析结束。
+        
+        Args:
+            jobs: submit(parse=False) 返回的任务，已结束的任务会被忽略
+        
+        Returns:
+            执行解析的线程
+        """
+        pending: Dict[str, List[DownloadJob]] = {}
+        for job in jobs:
+            if not job.is_finished and job.info is None:
+                pending.setdefault(job.url, []).append(job)
+        
+        def on_result(url: str, info: Optional[Dict[str, Any]]):
+            for job in pending[url]:
+                try:
+                    self._parsed(job, info)
+                except Exception as e:
+                    job._finish(DownloadJob.FAILED, str(e))
+        
+        def run():
+            try:
+                self.parser.resolve_many(
+                    list(pending),
+                    on_result,
+                    concurrency=self.batch_parse_concurrency,
+                    host_limits=self.host_limits,
+                    # 整组任务都已取消时不再解析
+                    skip=lambda url: all(job.is_finished for job in pending[url]),
+                )
+            finally:
+                for group in pending.values():
+                    for job in group:
+                        if job.info is None:
+                            job._finish(DownloadJob.FAILED, "无法解析该视频链接")
+        
+        for group in pending.values():
+            for job in group:
+                job.state = DownloadJob.PARSING
+        thread = threading.Thread(target=run, name='parse-batch', daemon=True)
+        thread.start()
+        return thread
+    
+    def submit_playlist(
+        self,
+        url: str,
+        submit: Optional[Callable[[str], Any]] = None,
+        max_pending: Optional[int] = None,
+        on_done: Optional[Callable[[int], None]] = None,
+        **kwargs
+    ) -> threading.Thread:
+        """
+        展开播放列表或频道，边展开边提交其中的视频
+        
+        后台线程用 VideoParser.expand 按页取得条目链接，逐个提交；
+        未结束的任务达到 max_pending 时暂停展开，等有任务结束再继续，
+        因此再长的列表同时存在的任务数也是有限的，第一个视频无需等待整个列表展开。
+        
+        Args:
+            url: 播放列表或频道URL
+            submit: 提交单个条目的函数，默认为 self.submit(entry_url, **kwargs)
+            max_pending: 未结束任务数上限，默认为解析与下载线程数之和的两倍
+            on_done: 展开结束回调，参数为提交的条目数（在后台线程中调用）
+            **kwargs: 默认 submit 传递给 submit() 的参数
+        
+        Returns:
+            执行展开的线程
+        """
+        if submit is None:
+            submit = lambda entry_url: self.submit(entry_url, **kwargs)
+        if max_pending is None:
+            max_pending = (self._parse_stage.workers + self._download_stage.workers) * 2
+        
+        def run():
+            count = 0
+            try:
+                for entry_url in self.parser.expand(url):
+                    if not self._wait_capacity(max_pending):
+                        break
+                    submit(entry_url)
+                    count += 1
+            except Exception as e:
+                print(f"展开播放列表失败: {e}")
+            if on_done:
+                on_done(count)
+        
+        thread = threading.Thread(target=run, name='expand', daemon=True)
+        thread.start()
+        return thread
+    
+    def _wait_capacity(self, max_pending: int) -> bool:
+        """等待未结束的任务数低于上限，调度器关闭时返回False"""
+        while not self._shutting_down:
+            with self._lock:
+                self._jobs = [j for j in self._jobs if not j.is_finished]
+                if len(self._jobs) < max_pending:
+                    return True
+            time.sleep(0.2)
+        return False
+    
+    def cancel(self, job: DownloadJob):
+        """取消任务"""
+        if job.is_finished:
+            return
+        # 程序退出时保留 .part 文件，下次启动从断点续传
+        cleanup = not self._shutting_down
+        job.cancel_token.cancel(cleanup)
+        if job.downloader:
+            job.downloader.cancel(cleanup=cleanup)
+        job._finish(DownloadJob.CANCELLED)
+    
+    def cancel_all(self):
+        """取消所有未结束的任务"""
+        with self._lock:
+            jobs = list(self._jobs)
+        for job in jobs:
+            self.cancel(job)
+    
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有已提交的任务结束
+        
+        Args:
+            timeout: 整个等待过程的超时(秒)，None 表示一直等待
+        
+        Returns:
+            是否在超时前全部结束
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            jobs = list(self._jobs)
+        for job in jobs:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.wait(remaining):
+                return False
+        return True
+    
+    def stats(self) -> Dict[str, int]:
+        """获取队列统计"""
+        return {
+            'parse_pending': self._parse_stage.pending(),
+            'parse_active': self._parse_stage.active(),
+            'download_pending': self._download_stage.pending(),
+            'download_active': self._download_stage.active(),
+            'postprocess_pending': postprocess_pool.pending(),
+            'postprocess_active': postprocess_pool.active(),
+        }
+    
+    def shutdown(self):
+        """取消所有任务并停止工作线程，任务日志中保留未完成的任务"""
+        self._shutting_down = True
+        self.cancel_all()
+        for stage in (self._parse_stage, self._download_stage):
+            for job in stage.close():
+                job._finish(DownloadJob.CANCELLED)
+    
+    def _run_parse(self, job: DownloadJob):
+        """解析阶段"""
+        if job.is_finished:
+            return
+        job.state = DownloadJob.PARSING
+        self._parsed(job, self.parser.get_video_info(job.url))
+    
+    def _parsed(self, job: DownloadJob, info: Optional[Dict[str, Any]]):
+        """解析结束：成功则进入下载阶段，失败则结束任务"""
+        if job.is_finished:
+            return
+        if not info:
+            job._finish(DownloadJob.FAILED, "无法解析该视频链接")
+            return
+        
+        job.info = info
+        # 短链接等写法在解析前无法与已下载的视频对应，按解析得到的页面链接再检查一次
+        webpage_url = info.get('webpage_url')
+        if not job.force and self.is_duplicate and webpage_url and webpage_url != job.url:
+            existing = self.is_duplicate(webpage_url)
+            if existing:
+                job.result = existing
+                job._finish(DownloadJob.SKIPPED)
+                return
+        
+        if job.on_parsed:
+            job.on_parsed(job)
+        job.state = DownloadJob.WAITING
+        self._download_stage.put(job)
+    
+    def _run_download(self, job: DownloadJob):
+        """下载阶段"""
+        if job.is_finished:
+            return
+        if job.downloader is None:
+            job.downloader = VideoDownloader(self.output_path)
+        if self.journal and job.journal_id is not None:
+            job.downloader.add_progress_listener(
+                lambda info: self.journal.update_progress(
+                    job.journal_id, info, force=info['status'] == 'resolved'
+                )
+            )
+        job.state = DownloadJob.DOWNLOADING
+        job.result = job.downloader.download(
+            job.url, job.format_id, job.filename,
+            resolved_format=job.resolved_format,
+            defer_postprocess=True,
+            cancel_token=job.cancel_token
+        )
+        
+        if job.result and not job.downloader.is_cancelled and job.downloader.has_pending_postprocess:
+            # 后处理在线程池中排队执行，本线程去下载下一个任务
+            job.state = DownloadJob.POSTPROCESSING
+            future = postprocess_pool.submit(job.downloader.postprocess)
+            future.add_done_callback(lambda f: self._postprocessed(job, f))
+        else:
+            self._download_finished(job)
+    
+    def _postprocessed(self, job: DownloadJob, future: Future):
+        """后处理结束"""
+        try:
+            job.result = future.result()
+        except Exception as e:
+            job.result = None
+            job.error = str(e)
+        self._download_finished(job)
+    
+    def _download_finished(self, job: DownloadJob):
+        """按下载结果结束任务"""
+        if job.downloader.is_cancelled:
+            job._finish(DownloadJob.CANCELLED)
+        elif job.result:
+            job._finish(DownloadJob.COMPLETED)
+        else:
+            job._finish(DownloadJob.FAILED, job.error or "下载失败")
+
+    def _journal_begin(self, job: DownloadJob):
+        """将任务写入任务日志"""
+        if job.journal_id is None:
+            downloader = job.downloader or VideoDownloader(self.output_path)
+            job.journal_id = self.journal.begin(
+                job.url,
+                job.format_id,
+                output_path=downloader.output_path,
+                filename=job.filename,
+                outtmpl=downloader.build_output_template(job.filename),
+                options=downloader.get_options(),
+                quality=job.quality,
+            )
+        if job.journal_id is not None:
+            job._done_callbacks.append(self._journal_finish)
+    
+    def _journal_finish(self, job: DownloadJob):
+        """任务结束时更新任务日志"""
+        if self._shutting_down and job.state == DownloadJob.CANCELLED:
+            # 程序退出导致的取消，下次启动时恢复
+            self.journal.mark_interrupted(job.journal_id)
+        else:
+            self.journal.finish(job.journal_id)
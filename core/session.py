@@ -0,0 +1,298 @@
+"""
+YoutubeDL会话池 - 复用已初始化的YoutubeDL实例
+"""
+import json
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Iterator, Optional, Callable, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import yt_dlp
+    from .bandwidth import BandwidthShare
+    from .cancel import CancelToken
+
+
+# 每次调用单独设置的 yt-dlp 选项，不参与会话分组
+PER_CALL_OPTIONS = ('outtmpl', 'format', 'progress_hooks', 'postprocessor_hooks')
+
+# 池中实例依赖的 yt-dlp 接口，缺少时说明 yt-dlp 版本不兼容
+_REQUIRED_ATTRIBUTES = (
+    'urlopen', 'post_process', 'add_progress_hook', 'add_postprocessor_hook',
+    'add_post_processor', 'build_format_selector', '_parse_outtmpl',
+)
+
+
+class CallOptions:
+    """单次借出期间生效的应用层设置（不是 yt-dlp 的选项）"""
+    
+    def __init__(
+        self,
+        pre_download_hooks: Sequence[Callable[[Dict[str, Any]], None]] = (),
+        cancel_token: Optional['CancelToken'] = None,
+        bandwidth: Optional['BandwidthShare'] = None,
+        defer_postprocess: Optional[List[tuple]] = None
+    ):
+        """
+        Args:
+            pre_download_hooks: 格式选定后、开始下载前以 info 字典调用
+            cancel_token: 本次调用打开的HTTP响应都登记到该取消令牌
+            bandwidth: 从响应读取的字节数计入该带宽份额
+            defer_postprocess: 需要 ffmpeg 的后处理不在下载时执行，参数追加到该列表
+        """
+        self.pre_download_hooks = list(pre_download_hooks)
+        self.cancel_token = cancel_token
+        self.bandwidth = bandwidth
+        self.defer_postprocess = defer_postprocess
+
+
+def _base_options(opts: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉单次调用选项后的基础配置"""
+    return {k: v for k, v in opts.items() if k not in PER_CALL_OPTIONS}
+
+
+def _options_key(opts: Dict[str, Any]) -> str:
+    """根据基础配置生成会话分组键"""
+    return json.dumps(_base_options(opts), sort_keys=True, default=repr)
+
+
+class YoutubeDLPool:
+    """YoutubeDL实例池
+    
+    构造 YoutubeDL 需要加载全部提取器、创建HTTP会话，代价较高。
+    池按基础配置分组缓存空闲实例，工作线程借出使用后归还，
+    Cookie 和连接池因此可以在多次调用之间保留。
+    outtmpl / format 在借出时直接设置到实例上，无需重建；progress_hooks、
+    postprocessor_hooks 和 CallOptions 由实例构造时注册一次的分发器转发给本次调用。
+    """
+    
+    def __init__(self, max_idle_per_key: int = 4):
+        """
+        初始化会话池
+        
+        Args:
+            max_idle_per_key: 每组配置最多保留的空闲实例数
+        """
+        self.max_idle_per_key = max_idle_per_key
+        self.created = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List['yt_dlp.YoutubeDL']] = {}
+        # reserve() 临时提高的空闲实例上限
+        self._reservations: List[int] = []
+    
+    @contextmanager
+    def session(
+        self,
+        opts: Dict[str, Any],
+        call: Optional[CallOptions] = None
+    ) -> Iterator['yt_dlp.YoutubeDL']:
+        """
+        借出一个配置好的YoutubeDL实例
+        
+        Args:
+            opts: yt-dlp选项，与直接构造 YoutubeDL 时相同
+            call: 本次借出期间生效的应用层设置
+        
+        Yields:
+            YoutubeDL实例，退出上下文时自动归还
+        """
+        key = _options_key(opts)
+        ydl = self._acquire(key, opts)
+        try:
+            self._apply_call_options(ydl, opts, call or CallOptions())
+            yield ydl
+        finally:
+            self._release(key, ydl)
+    
+    @contextmanager
+    def reserve(self, count: int) -> Iterator[None]:
+        """
+        在 with 块内把每组配置的空闲实例上限提高到 count
+        
+        批量解析期间归还的实例都保留下来供下一个解析复用；退出时恢复上限，
+        超出的空闲实例立即关闭，不会在之后一直占用内存。
+        
+        Args:
+            count: 期间最多保留的空闲实例数
+        """
+        with self._lock:
+            self._reservations.append(count)
+        try:
+            yield
+        finally:
+            surplus = []
+            with self._lock:
+                self._reservations.remove(count)
+                limit = self._idle_limit()
+                for instances in self._idle.values():
+                    while len(instances) > limit:
+                        surplus.append(instances.pop(0))
+            for ydl in surplus:
+                ydl.close()
+    
+    def _idle_limit(self) -> int:
+        """当前每组配置最多保留的空闲实例数（需持有锁）"""
+        return max([self.max_idle_per_key, *self._reservations])
+    
+    def close_all(self):
+        """关闭所有空闲实例"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for instances in idle.values():
+            for ydl in instances:
+                ydl.close()
+    
+    def _acquire(self, key: str, opts: Dict[str, Any]) -> 'yt_dlp.YoutubeDL':
+        with self._lock:
+            instances = self._idle.get(key)
+            if instances:
+                self.reused += 1
+                return instances.pop()
+            self.created += 1
+        return _pooled_class()(_base_options(opts))
+    
+    def _release(self, key: str, ydl: 'yt_dlp.YoutubeDL'):
+        # 清除单次调用的钩子和设置，避免持有调用方引用
+        ydl.reset_call()
+        with self._lock:
+            instances = self._idle.setdefault(key, [])
+            if len(instances) < self._idle_limit():
+                instances.append(ydl)
+                return
+        ydl.close()
+    
+    @staticmethod
+    def _apply_call_options(ydl: 'yt_dlp.YoutubeDL', opts: Dict[str, Any], call: CallOptions):
+        """在不重建实例的情况下应用单次调用选项"""
+        format_spec = opts.get('format')
+        if format_spec != ydl.params.get('format'):
+            if format_spec is None:
+                ydl.params.pop('format', None)
+                ydl.format_selector = None
+            else:
+                ydl.params['format'] = format_spec
+                ydl.format_selector = ydl.build_format_selector(format_spec)
+        
+        outtmpl = opts.get('outtmpl')
+        ydl.params['outtmpl'] = outtmpl if isinstance(outtmpl, dict) else (
+            {'default': outtmpl} if outtmpl else {}
+        )
+        ydl._parse_outtmpl()
+        
+        ydl.progress_hooks = list(opts.get('progress_hooks', []))
+        ydl.postprocessor_hooks = list(opts.get('postprocessor_hooks', []))
+        ydl.call = call
+
+
+_POOLED_CLASS = None
+
+
+def _pooled_class() -> type:
+    """
+    池中实例的类型，首次使用时创建（yt-dlp 导入较慢，推迟到第一次真正解析/下载时）
+
+    YoutubeDL 的子类，通过公开的 add_progress_hook / add_postprocessor_hook /
+    add_post_processor 各注册一次分发器，并重写 urlopen 和 post_process，
+    单次调用的设置只保存在子类自己的属性上。yt-dlp 缺少所需接口时抛出 RuntimeError，
+    而不是在借出的实例上静默失效。
+    """
+    global _POOLED_CLASS
+    if _POOLED_CLASS is not None:
+        return _POOLED_CLASS
+
+    import yt_dlp
+    from yt_dlp.postprocessor.common import PostProcessor
+    
+    missing = [name for name in _REQUIRED_ATTRIBUTES if not hasattr(yt_dlp.YoutubeDL, name)]
+    if missing:
+        raise RuntimeError(
+            f"不支持的 yt-dlp 版本 {yt_dlp.version.__version__}：缺少 {', '.join(missing)}"
+        )
+    
+    class PreDownloadDispatcher(PostProcessor):
+        """格式选定后、开始下载前调用本次借出的 pre_download_hooks"""
+        
+        def run(self, info):
+            for hook in self._downloader.call.pre_download_hooks:
+                hook(info)
+            return [], info
+    
+    class PooledYoutubeDL(yt_dlp.YoutubeDL):
+        def __init__(self, params):
+            super().__init__(params)
+            self.reset_call()
+            self.add_progress_hook(self._dispatch_progress)
+            self.add_postprocessor_hook(self._dispatch_postprocessor)
+            self.add_post_processor(PreDownloadDispatcher(self), when='before_dl')
+        
+        def reset_call(self):
+            """归还时清除单次调用的钩子和设置"""
+            self.progress_hooks: List[Callable] = []
+            self.postprocessor_hooks: List[Callable] = []
+            self.call = CallOptions()
+        
+        def _dispatch_progress(self, d):
+            for hook in self.progress_hooks:
+                hook(d)
+        
+        def _dispatch_postprocessor(self, d):
+            for hook in self.postprocessor_hooks:
+                hook(d)
+        
+        def urlopen(self, req):
+            """
+            发起请求，响应登记到取消令牌并计入带宽份额
+            
+            yt-dlp 的下载器、分片下载线程和提取器都通过 urlopen 发起请求。
+            打开前检查是否已取消，打开后把响应登记到取消令牌，
+            取消时关闭这些响应的连接，阻塞中的 read() 立即返回；
+            设置了带宽份额时，每次 read() 得到的字节数计入份额，超出上限时休眠；
+            限速生效时单次读取的大小不超过 max_read，调用方会继续读取剩余部分。
+            """
+            token, bandwidth = self.call.cancel_token, self.call.bandwidth
+            if token is not None:
+                token.raise_if_cancelled()
+            response = super().urlopen(req)
+            if token is not None:
+                token.track_response(response)
+            if bandwidth is not None:
+                read = response.read
+                
+                def throttled_read(amt=None):
+                    max_read = bandwidth.max_read
+                    if max_read and amt is not None and amt > max_read:
+                        amt = max_read
+                    data = read(amt)
+                    if data:
+                        bandwidth.consume(len(data))
+                    return data
+                
+                response.read = throttled_read
+            return response
+        
+        def post_process(self, filename, info, files_to_move=None):
+            """
+            执行或推迟后处理
+            
+            yt-dlp 下载完一个视频后调用 post_process 执行合并、修复和后处理器。
+            设置了 defer_postprocess 且有需要 ffmpeg 的后处理时，只记录
+            (filename, info, files_to_move)，由调用方之后用另一个实例的 post_process
+            执行；否则照常执行（只是移动文件）。
+            """
+            deferred = self.call.defer_postprocess
+            postprocessors = [
+                pp for pp in self.params.get('postprocessors') or []
+                if pp.get('when', 'post_process') == 'post_process'
+            ]
+            if deferred is None or (not info.get('__postprocessors') and not postprocessors):
+                return super().post_process(filename, info, files_to_move)
+            info['filepath'] = filename
+            deferred.append((filename, info, files_to_move))
+            return info
+    
+    _POOLED_CLASS = PooledYoutubeDL
+    return _POOLED_CLASS
+
+
+# 全局实例
+ydl_pool = YoutubeDLPool()
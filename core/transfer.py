@@ -0,0 +1,289 @@
+"""
+分段下载 - 用多个 HTTP Range 连接并行下载单个大文件
+"""
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from typing import Optional, Callable, Dict, Any, List, Tuple
+
+
+# 打开URL的函数：(url, headers) -> 可 read() 的响应对象
+Opener = Callable[[str, Dict[str, str]], Any]
+
+
+def urllib_opener(url: str, headers: Dict[str, str]):
+    """默认的打开函数，使用 urllib"""
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30)
+
+
+def _header(response, name: str) -> Optional[str]:
+    """兼容 urllib 和 yt-dlp 两种响应对象读取响应头"""
+    headers = getattr(response, 'headers', None)
+    if headers is None:
+        return None
+    return headers.get(name)
+
+
+class RangedFetcher:
+    """多连接分段下载器
+    
+    先用 Range: bytes=0-0 探测服务器是否支持分段及文件总大小，
+    再把文件平均分成若干段，每段一个连接并行写入临时文件的对应位置。
+    服务器不支持 Range 时返回 False，由调用方退回普通下载。
+    
+    各段已下载的字节数保存在临时文件旁的 .json 中，中断（出错、取消、退出）后
+    临时文件保留，下次 fetch 同一文件时每段从断点继续；不再分段下载时可用
+    salvage 把开头连续完成的部分转为 yt-dlp 的 .part 文件续传。
+    """
+    
+    def __init__(
+        self,
+        opener: Optional[Opener] = None,
+        connections: int = 4,
+        min_size: int = 32 * 1024 * 1024,
+        chunk_size: int = 256 * 1024
+    ):
+        """
+        初始化分段下载器
+        
+        Args:
+            opener: 打开URL的函数，默认使用 urllib；下载器中传入 YoutubeDL.urlopen
+                    以沿用 Cookie、代理等网络设置
+            connections: 并行连接数
+            min_size: 小于该大小的文件不分段
+            chunk_size: 每次读取的字节数
+        """
+        self.opener = opener or urllib_opener
+        self.connections = max(1, connections)
+        self.min_size = min_size
+        self.chunk_size = chunk_size
+    
+    def probe(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[int]:
+        """
+        探测文件大小
+        
+        Returns:
+            支持 Range 时返回文件总大小，否则返回None
+        """
+        request_headers = dict(headers or {})
+        request_headers['Range'] = 'bytes=0-0'
+        try:
+            response = self.opener(url, request_headers)
+            try:
+                content_range = _header(response, 'Content-Range') or ''
+                response.read()
+            finally:
+                response.close()
+        except Exception:
+            return None
+        match = re.match(r'bytes\s+0-0/(\d+)', content_range)
+        return int(match.group(1)) if match else None
+    
+    def split(self, total: int) -> List[Tuple[int, int]]:
+        """把文件分为 connections 段，返回 (起始, 结束) 闭区间列表"""
+        size = -(-total // self.connections)
+        return [
+            (start, min(start + size, total) - 1)
+            for start in range(0, total, size)
+        ]
+    
+    @staticmethod
+    def _state_path(tmpfile: str) -> str:
+        return tmpfile + '.json'
+    
+    def _load_state(self, tmpfile: str, total: Optional[int] = None) -> Optional[List[List[int]]]:
+        """
+        读取上次中断时各段的进度
+        
+        Returns:
+            [起始, 结束, 已下载字节数] 列表；没有记录、记录损坏或文件大小不符时返回None
+        """
+        try:
+            with open(self._state_path(tmpfile), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            size = os.path.getsize(tmpfile)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(saved, dict) or saved.get('total') != size:
+            return None
+        if total is not None and total != size:
+            return None
+        segments = saved.get('segments')
+        try:
+            if all(0 <= done <= end - start + 1 for start, end, done in segments):
+                return [[start, end, done] for start, end, done in segments]
+        except (TypeError, ValueError):
+            pass
+        return None
+    
+    def _save_state(self, tmpfile: str, total: int, segments: List[List[int]]):
+        path = self._state_path(tmpfile)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'total': total, 'segments': segments}, f)
+        os.replace(path + '.tmp', path)
+    
+    def fetch(
+        self,
+        url: str,
+        filepath: str,
+        headers: Optional[Dict[str, str]] = None,
+        total: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> bool:
+        """
+        分段下载文件
+        
+        Args:
+            url: 文件URL
+            filepath: 保存路径，下载过程中写入 filepath + '.ranged'，
+                      各段进度记录在 filepath + '.ranged.json'
+            headers: 请求头
+            total: 已知的文件大小，为None时自动探测
+            progress: 进度回调，参数格式与 yt-dlp 进度钩子相同；
+                      回调抛出异常会中止全部连接
+        
+        Returns:
+            是否已完成下载；不满足分段条件时返回 False 且不产生任何文件
+        
+        Raises:
+            任一分段出错或进度回调抛出的异常；临时文件和进度记录保留，可再次 fetch 续传
+        """
+        if total is None or total >= self.min_size:
+            total = self.probe(url, headers)
+        if not total or total < self.min_size:
+            return False
+        
+        tmpfile = filepath + '.ranged'
+        segments = self._load_state(tmpfile, total)
+        if segments is None:
+            with open(tmpfile, 'wb') as f:
+                f.truncate(total)
+            segments = [[start, end, 0] for start, end in self.split(total)]
+            self._save_state(tmpfile, total, segments)
+        resumed = sum(done for _start, _end, done in segments)
+        
+        state = {'downloaded': resumed, 'error': None, 'saved_at': time.monotonic()}
+        lock = threading.Lock()
+        stop = threading.Event()
+        start_time = time.monotonic()
+        
+        def report(index: int, n: int):
+            now = time.monotonic()
+            with lock:
+                segments[index][2] += n
+                state['downloaded'] += n
+                downloaded = state['downloaded']
+                # 每秒记录一次各段进度，进程被强制结束时最多重新下载一秒的数据
+                if now - state['saved_at'] >= 1.0:
+                    state['saved_at'] = now
+                    self._save_state(tmpfile, total, segments)
+            if progress is None:
+                return
+            elapsed = now - start_time
+            speed = (downloaded - resumed) / elapsed if elapsed > 0 else None
+            progress({
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total,
+                'speed': speed,
+                'eta': (total - downloaded) / speed if speed else None,
+                'filename': filepath,
+                'tmpfilename': tmpfile,
+            })
+        
+        def worker(index: int):
+            start, end, done = segments[index]
+            position = start + done
+            if position > end:
+                return
+            request_headers = dict(headers or {})
+            request_headers['Range'] = f'bytes={position}-{end}'
+            try:
+                response = self.opener(url, request_headers)
+                try:
+                    content_range = _header(response, 'Content-Range') or ''
+                    if not re.match(rf'bytes\s+{position}-', content_range):
+                        raise IOError(f"服务器没有按分段 {position}-{end} 返回数据")
+                    with open(tmpfile, 'r+b') as f:
+                        f.seek(position)
+                        remaining = end - position + 1
+                        while remaining > 0 and not stop.is_set():
+                            data = response.read(min(self.chunk_size, remaining))
+                            if not data:
+                                raise IOError(f"分段 {position}-{end} 提前结束")
+                            f.write(data)
+                            remaining -= len(data)
+                            report(index, len(data))
+                finally:
+                    response.close()
+            except BaseException as e:
+                with lock:
+                    if state['error'] is None:
+                        state['error'] = e
+                stop.set()
+        
+        threads = [
+            threading.Thread(target=worker, args=(index,), daemon=True)
+            for index in range(len(segments))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if state['error'] is not None or state['downloaded'] != total:
+            # 保留临时文件，记录各段进度以便续传
+            self._save_state(tmpfile, total, segments)
+            raise state['error'] or IOError("分段下载未完成")
+        
+        os.replace(tmpfile, filepath)
+        try:
+            os.remove(self._state_path(tmpfile))
+        except OSError:
+            pass
+        if progress:
+            progress({
+                'status': 'finished',
+                'downloaded_bytes': total,
+                'total_bytes': total,
+                'filename': filepath,
+            })
+        return True
+    
+    def salvage(self, filepath: str) -> int:
+        """
+        把中断的分段下载转为 yt-dlp 的 .part 文件
+        
+        从文件开头起连续下载完成的部分保留为 filepath + '.part'，yt-dlp 从该位置
+        按 Range 续传；之后各段已下载的数据丢弃。
+        
+        Returns:
+            保留的字节数
+        """
+        tmpfile = filepath + '.ranged'
+        segments = self._load_state(tmpfile)
+        kept = 0
+        if segments:
+            for start, end, done in sorted(segments):
+                if start != kept:
+                    break
+                kept = start + done
+                if done < end - start + 1:
+                    break
+        try:
+            if kept:
+                with open(tmpfile, 'r+b') as f:
+                    f.truncate(kept)
+                os.replace(tmpfile, filepath + '.part')
+            else:
+                os.remove(tmpfile)
+        except OSError:
+            kept = 0
+        try:
+            os.remove(self._state_path(tmpfile))
+        except OSError:
+            pass
+        return kept
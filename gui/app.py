@@ -4,19 +4,25 @@
 import customtkinter as ctk
 import threading
 import os
-import io
-import urllib.request
 from tkinter import filedialog, messagebox
 from typing import Optional, Dict, List
-from PIL import Image
 
 from core.parser import VideoParser
+from core.bandwidth import bandwidth_manager
 from core.downloader import VideoDownloader
-from gui.components import DownloadCard, VideoInfoCard
+from core.scheduler import DownloadScheduler, DownloadJob
+from core.journal import job_journal
+from core.progress import ProgressAggregator
+from gui.components import DownloadCard, VideoInfoCard, VirtualList, HistoryRow
+from gui.download_list import DownloadListModel, DownloadItem
+from gui.thumbnails import thumbnail_service
 from utils.helpers import (
     get_default_download_path,
     is_valid_url,
+    is_playlist_url,
     detect_platform,
+    normalize_url,
+    host_key,
     format_size
 )
 from utils.ffmpeg_manager import ffmpeg_manager
@@ -31,6 +37,9 @@ ctk.set_default_color_theme("blue")
 class VideoDownloaderApp(ctk.CTk):
     """视频下载器主应用"""
     
+    # 下载进度刷新间隔(毫秒)
+    PROGRESS_INTERVAL_MS = 100
+    
     def __init__(self):
         super().__init__()
         
@@ -39,16 +48,27 @@ class VideoDownloaderApp(ctk.CTk):
         self.geometry("1000x750")
         self.minsize(900, 650)
         
-        # 检查并设置FFmpeg
-        self._check_ffmpeg()
+        # 窗口显示后再在后台检查FFmpeg
+        self.after_idle(self._check_ffmpeg)
         
         # 核心组件
         self.parser = VideoParser()
         self.downloader = VideoDownloader()
+        # 已下载过的链接在提交时直接跳过；任务日志用于重启后继续下载
+        self.scheduler = DownloadScheduler(
+            parser=self.parser,
+            is_duplicate=history_manager.is_downloaded,
+            journal=job_journal
+        )
+        
+        # 下载线程只写入进度槽，界面定时批量刷新
+        self.progress = ProgressAggregator()
         
         # 状态变量
         self.current_video_info: Optional[Dict] = None
-        self.download_cards: List[DownloadCard] = []
+        self._thumbnail_url: Optional[str] = None
+        # 下载列表的状态，界面只为可见的项创建卡片
+        self.download_list = DownloadListModel()
         self.download_path = get_default_download_path()
         self.batch_urls: List[str] = []  # 批量下载URL列表
         
@@ -56,18 +76,66 @@ class VideoDownloaderApp(ctk.CTk):
         self.download_subtitles = ctk.BooleanVar(value=False)
         self.embed_subtitles = ctk.BooleanVar(value=False)
         self.output_format = ctk.StringVar(value="mp4")
+        self.fast_transfer = ctk.BooleanVar(value=True)
         
         # 创建UI
         self._create_ui()
         
         # 绑定关闭事件
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
+        
+        # 恢复上次未完成的下载
+        self.after_idle(self._resume_unfinished)
+        
+        self.after(self.PROGRESS_INTERVAL_MS, self._poll_progress)
+    
+    def _poll_progress(self):
+        """一次刷新所有有新进度的下载项，再重绘可见的卡片"""
+        for item, slot in self.progress.changed():
+            if item.state != DownloadItem.ACTIVE:
+                # 已完成、失败或取消的项不再显示排队中的进度，释放槽位
+                self.progress.release(item)
+                continue
+            if slot.status == 'downloading':
+                item.update_progress(
+                    percent=slot.percent,
+                    speed=slot.speed,
+                    status="下载中..."
+                )
+            elif slot.status == 'finished':
+                # 分开下载的音视频各有一次 finished，任务完成以下载器的完成回调为准
+                item.update_progress(percent=100, status="处理中...")
+        
+        if self.download_list.collapse():
+            self._update_list_summary()
+        if self.download_list.dirty:
+            self.download_list.dirty = False
+            self.download_list_view.refresh(len(self.download_list))
+        self.after(self.PROGRESS_INTERVAL_MS, self._poll_progress)
+    
+    def _resume_unfinished(self):
+        """重新提交任务日志中未完成的下载，已有的 .part 文件会续传"""
+        def load_thread():
+            jobs = job_journal.unfinished()
+            if jobs:
+                self.after(0, lambda: [self._submit_download(
+                    entry['url'],
+                    format_id=entry['format_id'],
+                    # 旧版任务日志没有画质描述
+                    quality=entry['quality'] or entry['format_id'],
+                    resume=entry
+                ) for entry in jobs])
+        
+        threading.Thread(target=load_thread, daemon=True).start()
     
     def _check_ffmpeg(self):
         """检查FFmpeg是否可用"""
-        if not ffmpeg_manager.setup_environment():
-            # FFmpeg不可用，稍后提示用户
-            self.after(1000, self._prompt_ffmpeg_download)
+        def check_thread():
+            if not ffmpeg_manager.setup_environment():
+                # FFmpeg不可用，稍后提示用户
+                self.after(1000, self._prompt_ffmpeg_download)
+        
+        threading.Thread(target=check_thread, daemon=True).start()
     
     def _create_ui(self):
         """创建用户界面"""
@@ -300,6 +368,14 @@ class VideoDownloaderApp(ctk.CTk):
         )
         embed_check.pack(side="left", padx=(20, 0))
         
+        fast_check = ctk.CTkCheckBox(
+            row2,
+            text="快速传输",
+            variable=self.fast_transfer,
+            font=ctk.CTkFont(size=12)
+        )
+        fast_check.pack(side="left", padx=(20, 0))
+        
         # 第三行：按钮
         row3 = ctk.CTkFrame(options_frame, fg_color="transparent")
         row3.pack(fill="x", padx=15, pady=(0, 15))
@@ -367,21 +443,34 @@ class VideoDownloaderApp(ctk.CTk):
         )
         clear_btn.pack(side="right")
         
-        # 下载列表滚动区域
-        self.download_list_frame = ctk.CTkScrollableFrame(
+        # 已收起的完成项摘要，有收起项时才显示
+        self.list_summary_label = ctk.CTkLabel(
             right_panel,
-            fg_color="transparent"
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="#888888",
+            anchor="w"
         )
-        self.download_list_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
         
-        # 空列表提示
-        self.empty_label = ctk.CTkLabel(
-            self.download_list_frame,
-            text="暂无下载任务\n\n输入视频链接开始下载",
-            text_color="#666666",
-            font=ctk.CTkFont(size=12)
+        # 下载列表：卡片数量只取决于可见区域高度，滚动时复用
+        self.download_list_view = VirtualList(
+            right_panel,
+            row_height=160,
+            create_row=lambda master: DownloadCard(master, on_cancel=self._cancel_download),
+            fetch=self.download_list.slice,
+            empty_text="暂无下载任务\n\n输入视频链接开始下载"
         )
-        self.empty_label.pack(pady=50)
+        self.download_list_view.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+    
+    def _update_list_summary(self):
+        """更新已收起项的摘要"""
+        summary = self.download_list.summary()
+        if summary:
+            self.list_summary_label.configure(text=summary + "（详见下载历史）")
+            if not self.list_summary_label.winfo_manager():
+                self.list_summary_label.pack(fill="x", padx=15, pady=(0, 5), before=self.download_list_view)
+        else:
+            self.list_summary_label.pack_forget()
     
     def _parse_url(self):
         """解析视频URL"""
@@ -395,11 +484,18 @@ class VideoDownloaderApp(ctk.CTk):
             messagebox.showwarning("提示", "请输入有效的URL")
             return
         
+        if is_playlist_url(url):
+            if messagebox.askyesno("播放列表", "这是播放列表或频道链接，是否下载其中的全部视频？"):
+                self._download_playlist(url)
+            return
+        
         # 更新UI状态
         self.parse_btn.configure(state="disabled", text="解析中...")
         self.download_btn.configure(state="disabled")
         
-        # 在新线程中解析
+        # 在新线程中解析，画质选项按当前输出格式配对编码
+        self.parser.output_format = self.output_format.get()
+        
         def parse_thread():
             try:
                 info = self.parser.get_video_info(url)
@@ -483,23 +579,6 @@ class VideoDownloaderApp(ctk.CTk):
         
         url = self.url_entry.get().strip()
         quality = self.quality_var.get()
-        title = self.current_video_info.get('title', '视频')
-        platform = self.current_video_info.get('platform', '未知')
-        thumbnail = self.current_video_info.get('thumbnail')
-        duration = self.current_video_info.get('duration')
-        
-        # 隐藏空列表提示
-        self.empty_label.pack_forget()
-        
-        # 创建下载卡片
-        card = DownloadCard(
-            self.download_list_frame,
-            title=title,
-            platform=platform,
-            on_cancel=lambda: self._cancel_download(card)
-        )
-        card.pack(fill="x", pady=(0, 10))
-        self.download_cards.append(card)
         
         # 获取格式ID
         format_id = 'best'
@@ -509,70 +588,144 @@ class VideoDownloaderApp(ctk.CTk):
             format_id = 'best'
         elif 'p' in quality:
             format_id = quality
+            # 使用格式索引选出的精确格式ID
+            for fmt in self.current_video_info.get('formats', []):
+                if fmt.get('resolution') == quality:
+                    format_id = fmt['format_id']
+                    break
+        
+        # 当前解析的视频优先于批量任务；用户主动选择的下载不做重复检查
+        self._submit_download(
+            url,
+            format_id=format_id,
+            quality=quality,
+            info=self.current_video_info,
+            priority=10,
+            force=True
+        )
+    
+    def _submit_download(
+        self,
+        url: str,
+        format_id: str = 'best',
+        quality: str = "最佳质量",
+        info: Optional[Dict] = None,
+        priority: int = 0,
+        force: bool = False,
+        resume: Optional[Dict] = None,
+        parse: bool = True
+    ) -> DownloadItem:
+        """
+        在下载列表中添加一项并将任务提交到调度器
+        
+        Args:
+            url: 视频URL
+            format_id: 格式ID
+            quality: 画质描述（写入历史记录）
+            info: 已解析的视频信息，为None时由调度器先解析
+            priority: 任务优先级
+            force: 为True时即使已下载过也重新下载
+            resume: 任务日志中的记录，恢复中断的下载时提供
+            parse: 为False时不进入调度器的解析阶段，由调用方通过 resolve_batch 批量解析
+        """
+        # 添加下载项，卡片在下一次刷新时显示
+        item = self.download_list.add(
+            url,
+            title=info.get('title', '视频') if info else url,
+            platform=info.get('platform', '未知') if info else detect_platform(url),
+            status="排队中..." if info else "等待解析..."
+        )
         
         # 创建新的下载器实例并配置选项
-        downloader = VideoDownloader(self.download_path)
-        downloader.download_subtitles = self.download_subtitles.get()
-        downloader.embed_subtitles = self.embed_subtitles.get()
-        downloader.output_format = self.output_format.get()
+        if resume:
+            # 沿用中断前的输出目录和选项，保证文件名与 .part 文件一致
+            downloader = VideoDownloader(resume['output_path'] or self.download_path)
+            downloader.apply_options(resume['options'])
+        else:
+            downloader = VideoDownloader(self.download_path)
+            downloader.download_subtitles = self.download_subtitles.get()
+            downloader.embed_subtitles = self.embed_subtitles.get()
+            downloader.output_format = self.output_format.get()
+            downloader.fast_transfer = self.fast_transfer.get()
         
-        # 设置回调
-        def progress_callback(info):
-            if info['status'] == 'downloading':
-                self.after(0, lambda: card.update_progress(
-                    percent=info.get('percent', 0),
-                    speed=info.get('speed', 0),
-                    status="下载中..."
-                ))
-            elif info['status'] == 'finished':
-                self.after(0, lambda: card.set_complete())
+        # 进度写入进度槽，由 _poll_progress 定时刷新
+        downloader.progress_slot = self.progress.register(item)
         
+        # 设置回调
         def complete_callback(filepath):
-            self.after(0, lambda: card.set_complete())
+            self.after(0, lambda: item.set_complete())
             # 保存到历史记录
+            video_info = item.job.info or {}
             history_manager.add_record(
                 url=url,
-                title=title,
-                platform=platform,
+                title=video_info.get('title', '视频'),
+                platform=video_info.get('platform', '未知'),
                 filepath=filepath,
-                thumbnail=thumbnail,
-                duration=duration,
+                thumbnail=video_info.get('thumbnail'),
+                duration=video_info.get('duration'),
                 quality=quality,
-                status='completed'
+                status='completed',
+                webpage_url=video_info.get('webpage_url')
             )
         
         def error_callback(error):
-            self.after(0, lambda: card.set_error(error[:30]))
+            self.after(0, lambda: item.set_error(error[:30]))
+        
+        def parsed_callback(job):
+            title = job.info.get('title', '视频')
+            self.after(0, lambda: item.set_title(title))
+            self.after(0, lambda: item.set_status("排队中..."))
+        
+        def finished_callback(job):
+            self.progress.release(item)
+            # 解析阶段失败时下载器不会触发错误回调
+            if job.state == DownloadJob.FAILED and job.info is None:
+                self.after(0, lambda: item.set_error(job.error or "解析失败"))
+            elif job.state == DownloadJob.SKIPPED:
+                self.after(0, lambda: item.set_skipped())
         
         downloader.set_callbacks(
-            progress=progress_callback,
             complete=complete_callback,
             error=error_callback
         )
         
         # 保存下载器引用
-        card.downloader = downloader
-        
-        # 开始异步下载
-        downloader.download_async(url, format_id)
+        item.downloader = downloader
+        
+        # 提交到调度器
+        item.job = self.scheduler.submit(
+            url,
+            format_id=format_id,
+            filename=resume['filename'] if resume else None,
+            info=info,
+            downloader=downloader,
+            priority=priority,
+            force=force or resume is not None,
+            parse=parse,
+            on_parsed=parsed_callback,
+            on_finished=finished_callback,
+            journal_id=resume['id'] if resume else None,
+            resolved_format=resume['resolved_format'] if resume else None,
+            quality=quality
+        )
+        return item
     
-    def _cancel_download(self, card: DownloadCard):
+    def _cancel_download(self, item: DownloadItem):
         """取消下载"""
-        if hasattr(card, 'downloader'):
-            card.downloader.cancel()
-        card.set_error("已取消")
+        if item.job is not None:
+            self.scheduler.cancel(item.job)
+        elif item.downloader is not None:
+            item.downloader.cancel()
+        item.set_error("已取消")
     
     def _clear_download_list(self):
         """清空下载列表"""
-        for card in self.download_cards:
-            if hasattr(card, 'downloader'):
-                card.downloader.cancel()
-            card.destroy()
+        for item in self.download_list.unfinished():
+            if item.job is not None:
+                self.scheduler.cancel(item.job)
         
-        self.download_cards.clear()
-        
-        # 显示空列表提示
-        self.empty_label.pack(pady=50)
+        self.download_list.clear()
+        self._update_list_summary()
     
     def _open_download_folder(self):
         """打开下载目录"""
@@ -585,7 +738,7 @@ class VideoDownloaderApp(ctk.CTk):
         """打开设置窗口"""
         settings_window = ctk.CTkToplevel(self)
         settings_window.title("设置")
-        settings_window.geometry("500x300")
+        settings_window.geometry("500x560")
         settings_window.transient(self)
         settings_window.grab_set()
         
@@ -627,16 +780,71 @@ class VideoDownloaderApp(ctk.CTk):
         )
         browse_btn.pack(side="right")
         
+        # 限速设置，保存后对进行中的下载立即生效
+        rate_label = ctk.CTkLabel(
+            content,
+            text="限速 (MB/s，0 表示不限速):",
+            font=ctk.CTkFont(size=14)
+        )
+        rate_label.pack(anchor="w", pady=(0, 10))
+        
+        rate_frame = ctk.CTkFrame(content, fg_color="transparent")
+        rate_frame.pack(fill="x", pady=(0, 10))
+        
+        ctk.CTkLabel(rate_frame, text="全局", font=ctk.CTkFont(size=12)).pack(side="left")
+        global_rate_entry = ctk.CTkEntry(rate_frame, width=80, height=32)
+        global_rate_entry.pack(side="left", padx=(10, 0))
+        global_rate_entry.insert(0, self._format_rate(bandwidth_manager.global_limit))
+        
+        ctk.CTkLabel(rate_frame, text="单任务", font=ctk.CTkFont(size=12)).pack(side="left", padx=(20, 0))
+        job_rate_entry = ctk.CTkEntry(rate_frame, width=80, height=32)
+        job_rate_entry.pack(side="left", padx=(10, 0))
+        job_rate_entry.insert(0, self._format_rate(bandwidth_manager.job_limit))
+        
+        host_label = ctk.CTkLabel(
+            content,
+            text="站点限速 (每行一个，如 youtube.com 2):",
+            font=ctk.CTkFont(size=12)
+        )
+        host_label.pack(anchor="w", pady=(0, 5))
+        
+        host_box = ctk.CTkTextbox(content, height=80)
+        host_box.pack(fill="x", pady=(0, 10))
+        host_box.insert("1.0", "\n".join(
+            f"{host} {self._format_rate(rate)}"
+            for host, rate in bandwidth_manager.host_limits().items()
+        ))
+        
         # 保存按钮
         def save_settings():
             new_path = path_entry.get().strip()
-            if new_path and os.path.isdir(new_path):
-                self.download_path = new_path
-                self.downloader.set_output_path(new_path)
-                settings_window.destroy()
-                messagebox.showinfo("成功", "设置已保存")
-            else:
+            if not new_path or not os.path.isdir(new_path):
                 messagebox.showwarning("警告", "请选择有效的目录")
+                return
+            try:
+                global_rate = self._parse_rate(global_rate_entry.get())
+                job_rate = self._parse_rate(job_rate_entry.get())
+                host_rates = {}
+                for line in host_box.get("1.0", "end").splitlines():
+                    if not line.strip():
+                        continue
+                    host, rate = line.split()
+                    host_rates[host_key('https://' + host)] = self._parse_rate(rate)
+            except ValueError:
+                messagebox.showwarning("警告", "限速格式错误，请填写非负数字，站点限速每行为 域名 速度")
+                return
+            
+            self.download_path = new_path
+            self.downloader.set_output_path(new_path)
+            bandwidth_manager.set_global_limit(global_rate)
+            bandwidth_manager.set_job_limit(job_rate)
+            for host in bandwidth_manager.host_limits():
+                if host not in host_rates:
+                    bandwidth_manager.set_host_limit(host, 0)
+            for host, rate in host_rates.items():
+                bandwidth_manager.set_host_limit(host, rate)
+            settings_window.destroy()
+            messagebox.showinfo("成功", "设置已保存")
         
         save_btn = ctk.CTkButton(
             content,
@@ -648,30 +856,45 @@ class VideoDownloaderApp(ctk.CTk):
         )
         save_btn.pack(pady=20)
     
+    @staticmethod
+    def _format_rate(rate: float) -> str:
+        """字节/秒转为设置窗口显示的 MB/s"""
+        return f"{rate / (1024 * 1024):g}"
+    
+    @staticmethod
+    def _parse_rate(text: str) -> float:
+        """设置窗口填写的 MB/s 转为字节/秒，留空表示不限速"""
+        text = text.strip()
+        if not text:
+            return 0
+        rate = float(text)
+        if rate < 0:
+            raise ValueError(text)
+        return rate * 1024 * 1024
+    
     def _on_closing(self):
         """窗口关闭事件"""
-        # 取消所有下载
-        for card in self.download_cards:
-            if hasattr(card, 'downloader'):
-                card.downloader.cancel()
+        # 取消所有下载并停止调度器
+        self.scheduler.shutdown()
+        
+        # 写入尚未落盘的历史记录，关闭任务日志
+        history_manager.close()
+        job_journal.close()
+        thumbnail_service.shutdown()
         
         self.destroy()
     
     def _load_thumbnail(self, url: str):
         """加载视频缩略图"""
-        def load_thread():
-            try:
-                with urllib.request.urlopen(url, timeout=5) as response:
-                    data = response.read()
-                    image = Image.open(io.BytesIO(data))
-                    image = image.resize((200, 112), Image.Resampling.LANCZOS)
-                    photo = ctk.CTkImage(light_image=image, dark_image=image, size=(200, 112))
-                    self.after(0, lambda: self.thumbnail_label.configure(image=photo, text=""))
-                    self.thumbnail_label.image = photo  # 保持引用
-            except Exception as e:
-                print(f"加载缩略图失败: {e}")
+        self._thumbnail_url = url
         
-        threading.Thread(target=load_thread, daemon=True).start()
+        def show(photo):
+            # 图片加载期间可能已经解析了另一个视频
+            if photo is not None and self._thumbnail_url == url:
+                self.thumbnail_label.configure(image=photo, text="")
+                self.thumbnail_label.image = photo  # 保持引用
+        
+        thumbnail_service.request(url, lambda photo: self.after(0, lambda: show(photo)))
     
     def _open_batch_download(self):
         """打开批量下载窗口"""
@@ -708,11 +931,21 @@ class VideoDownloaderApp(ctk.CTk):
             
             batch_window.destroy()
             
-            # 批量添加到下载队列
+            # 批量提交到调度器，由调度器跳过已下载的链接；
+            # 同一批次中同一视频的不同写法只提交一次
+            seen = set()
+            jobs = []
             for url in urls:
-                self.url_entry.delete(0, "end")
-                self.url_entry.insert(0, url)
-                self._parse_and_download_direct(url)
+                key = normalize_url(url)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if is_playlist_url(url):
+                    self._download_playlist(url)
+                else:
+                    jobs.append(self._parse_and_download_direct(url))
+            # 整批并发解析，每解析完一个立即开始下载
+            self.scheduler.resolve_batch(jobs)
         
         ctk.CTkButton(
             btn_frame,
@@ -732,63 +965,30 @@ class VideoDownloaderApp(ctk.CTk):
             text_color="#888888"
         ).pack(side="left")
     
-    def _parse_and_download_direct(self, url: str):
-        """直接解析并下载（用于批量下载）"""
-        def batch_thread():
-            try:
-                info = self.parser.get_video_info(url)
-                if info:
-                    self.after(0, lambda: self._batch_download_item(url, info))
-            except Exception as e:
-                print(f"批量下载解析失败: {e}")
-        
-        threading.Thread(target=batch_thread, daemon=True).start()
+    def _parse_and_download_direct(self, url: str) -> DownloadJob:
+        """提交批量下载中的一个链接，解析由 resolve_batch 统一进行"""
+        return self._submit_download(url, parse=False).job
     
-    def _batch_download_item(self, url: str, info: Dict):
-        """批量下载单个项目"""
-        title = info.get('title', '视频')
-        platform = info.get('platform', '未知')
-        
-        self.empty_label.pack_forget()
-        
-        card = DownloadCard(
-            self.download_list_frame,
-            title=title,
-            platform=platform,
-            on_cancel=lambda: self._cancel_download(card)
-        )
-        card.pack(fill="x", pady=(0, 10))
-        self.download_cards.append(card)
-        
-        downloader = VideoDownloader(self.download_path)
-        downloader.download_subtitles = self.download_subtitles.get()
-        downloader.embed_subtitles = self.embed_subtitles.get()
-        downloader.output_format = self.output_format.get()
-        
-        def progress_callback(prog_info):
-            if prog_info['status'] == 'downloading':
-                self.after(0, lambda: card.update_progress(
-                    percent=prog_info.get('percent', 0),
-                    speed=prog_info.get('speed', 0),
-                    status="下载中..."
-                ))
-            elif prog_info['status'] == 'finished':
-                self.after(0, lambda: card.set_complete())
-        
-        def complete_callback(filepath):
-            self.after(0, lambda: card.set_complete())
-            history_manager.add_record(
-                url=url, title=title, platform=platform,
-                filepath=filepath, thumbnail=info.get('thumbnail'),
-                duration=info.get('duration'), quality="最佳质量"
-            )
+    def _download_playlist(self, url: str):
+        """展开播放列表或频道，其中的视频边展开边加入下载列表"""
+        def submit_entry(entry_url: str):
+            # 卡片只能在主线程创建；等创建完再取下一个条目，调度器的背压才能生效
+            created = threading.Event()
+            
+            def create():
+                try:
+                    self._submit_download(entry_url)
+                finally:
+                    created.set()
+            
+            self.after(0, create)
+            created.wait()
         
-        def error_callback(error):
-            self.after(0, lambda: card.set_error(error[:30]))
+        def expand_done(count: int):
+            if not count:
+                self.after(0, lambda: messagebox.showwarning("提示", "没有从该链接中找到视频"))
         
-        downloader.set_callbacks(progress=progress_callback, complete=complete_callback, error=error_callback)
-        card.downloader = downloader
-        downloader.download_async(url, 'best')
+        self.scheduler.submit_playlist(url, submit=submit_entry, on_done=expand_done)
     
     def _open_history(self):
         """打开历史记录窗口"""
@@ -810,11 +1010,19 @@ class VideoDownloaderApp(ctk.CTk):
             font=ctk.CTkFont(size=18, weight="bold")
         ).pack(side="left")
         
+        # 历史列表：只创建可见的行，滚动时按页查询
+        list_view = VirtualList(
+            content,
+            row_height=73,
+            create_row=HistoryRow,
+            fetch=lambda offset, limit: history_manager.get_history(limit=limit, offset=offset),
+            empty_text="暂无下载历史"
+        )
+        
         def clear_history():
             if messagebox.askyesno("确认", "确定要清空所有历史记录吗？"):
                 history_manager.clear_history()
-                history_window.destroy()
-                self._open_history()
+                list_view.reset(0)
         
         ctk.CTkButton(
             header,
@@ -826,45 +1034,50 @@ class VideoDownloaderApp(ctk.CTk):
             command=clear_history
         ).pack(side="right")
         
-        # 历史列表
-        list_frame = ctk.CTkScrollableFrame(content, fg_color="transparent")
-        list_frame.pack(fill="both", expand=True)
+        # 搜索框，停止输入后才查询
+        search_var = ctk.StringVar()
+        ctk.CTkEntry(
+            content,
+            textvariable=search_var,
+            placeholder_text="🔍 搜索标题或平台...",
+            height=32
+        ).pack(fill="x", pady=(0, 10))
+        list_view.pack(fill="both", expand=True)
+        
+        search_job = None
+        
+        def refresh():
+            nonlocal search_job
+            search_job = None
+            keyword = search_var.get().strip()
+            if keyword:
+                list_view.fetch = lambda offset, limit: history_manager.search_history(
+                    keyword, limit=limit, offset=offset
+                )
+            else:
+                list_view.fetch = lambda offset, limit: history_manager.get_history(
+                    limit=limit, offset=offset
+                )
+            list_view.reset(history_manager.count(keyword))
         
-        history = history_manager.get_history(limit=50)
+        def on_search(*_args):
+            nonlocal search_job
+            if search_job is not None:
+                history_window.after_cancel(search_job)
+            search_job = history_window.after(250, refresh)
         
-        if not history:
-            ctk.CTkLabel(
-                list_frame,
-                text="暂无下载历史",
-                font=ctk.CTkFont(size=14),
-                text_color="#666666"
-            ).pack(pady=50)
-        else:
-            for record in history:
-                item = ctk.CTkFrame(list_frame, fg_color="#2b2b2b", corner_radius=8)
-                item.pack(fill="x", pady=(0, 8))
-                
-                inner = ctk.CTkFrame(item, fg_color="transparent")
-                inner.pack(fill="x", padx=12, pady=10)
-                
-                # 标题
-                title_text = record.get('title', '未知')[:40]
-                ctk.CTkLabel(
-                    inner,
-                    text=title_text,
-                    font=ctk.CTkFont(size=13, weight="bold"),
-                    anchor="w"
-                ).pack(fill="x")
-                
-                # 信息行
-                info_text = f"📺 {record.get('platform', '未知')}  |  🕐 {record.get('download_time', '')[:10]}"
-                ctk.CTkLabel(
-                    inner,
-                    text=info_text,
-                    font=ctk.CTkFont(size=11),
-                    text_color="#888888",
-                    anchor="w"
-                ).pack(fill="x")
+        search_var.trace_add("write", on_search)
+        
+        # 历史记录在后台加载，加载完成前先显示空窗口
+        def show_loaded():
+            if history_window.winfo_exists():
+                refresh()
+        
+        def wait_loaded():
+            history_manager.wait_loaded()
+            self.after(0, show_loaded)
+        
+        threading.Thread(target=wait_loaded, daemon=True).start()
     
     def _prompt_ffmpeg_download(self):
         """提示用户下载FFmpeg"""
@@ -1,30 +1,42 @@
 """
 UI组件 - 可复用的界面组件
 """
+import sys
+from collections import OrderedDict
+from typing import Optional, Callable, Dict, List
+
 import customtkinter as ctk
-from typing import Optional, Callable
-from utils.helpers import format_size, format_duration
+from gui.thumbnails import thumbnail_service
+from utils.helpers import format_duration
 
 
 class DownloadCard(ctk.CTkFrame):
-    """下载项卡片组件"""
+    """下载项卡片组件
+    
+    卡片本身不保存任务状态，由 VirtualList 复用来显示不同的 DownloadItem。
+    """
     
     def __init__(
         self,
         master,
-        title: str,
-        platform: str,
+        title: str = "",
+        platform: str = "",
         thumbnail_url: Optional[str] = None,
         on_cancel: Optional[Callable] = None,
+        height: int = 150,
         **kwargs
     ):
-        super().__init__(master, **kwargs)
+        super().__init__(master, height=height, **kwargs)
         
         self.title = title
         self.platform = platform
         self.on_cancel = on_cancel
+        self.item = None
+        self._version = -1
         
         self.configure(fg_color="#2b2b2b", corner_radius=10)
+        # 高度固定，VirtualList 按固定行高摆放
+        self.pack_propagate(False)
         
         self._create_widgets()
     
@@ -100,35 +112,333 @@ class DownloadCard(ctk.CTkFrame):
                 font=ctk.CTkFont(size=11),
                 fg_color="#ff4444",
                 hover_color="#cc3333",
-                command=self.on_cancel
+                command=self._cancel
             )
             self.cancel_btn.pack(side="right", padx=(0, 10))
     
-    def update_progress(self, percent: float, speed: float = 0, status: str = "下载中..."):
-        """更新进度"""
-        self.progress_bar.set(percent / 100)
-        self.percent_label.configure(text=f"{percent:.1f}%")
-        self.status_label.configure(text=status)
-        
-        if speed > 0:
-            speed_text = format_size(speed) + "/s"
-            self.speed_label.configure(text=speed_text)
+    def _cancel(self):
+        if self.item is not None:
+            self.on_cancel(self.item)
     
-    def set_complete(self):
-        """设置为完成状态"""
-        self.progress_bar.set(1)
-        self.percent_label.configure(text="100%")
-        self.status_label.configure(text="✓ 完成", text_color="#4CAF50")
-        self.speed_label.configure(text="")
-        
-        # 隐藏取消按钮
+    def show(self, item):
+        """
+        显示一个下载项，项没有变化时不重绘
+        
+        Args:
+            item: DownloadItem
+        """
+        if item is self.item and item.version == self._version:
+            return
+        self.item = item
+        self._version = item.version
+        
+        if item.title != self.title:
+            self.title = item.title
+            self.title_label.configure(text=item.title[:50] + "..." if len(item.title) > 50 else item.title)
+        if item.platform != self.platform:
+            self.platform = item.platform
+            self.platform_label.configure(text=item.platform)
+        
+        self.status_label.configure(text=item.status_text, text_color=item.status_color)
+        self.progress_bar.set(item.percent / 100)
+        self.percent_label.configure(text=item.percent_text)
+        self.speed_label.configure(text=item.speed_text)
+        
+        # 只有进行中的任务显示取消按钮
         if hasattr(self, 'cancel_btn'):
-            self.cancel_btn.pack_forget()
+            if item.cancellable and not self.cancel_btn.winfo_manager():
+                self.cancel_btn.pack(side="right", padx=(0, 10))
+            elif not item.cancellable:
+                self.cancel_btn.pack_forget()
+
+
+class VirtualList(ctk.CTkFrame):
+    """虚拟列表
+    
+    只为可见区域创建行组件，滚动时复用已有的行显示新的记录，
+    组件数量与记录总数无关。记录按页通过 fetch(offset, limit) 读取，
+    最近访问的若干页缓存在内存中。
+    
+    create_row(master) 返回的行组件需要提供 show(record) 方法。
+    """
+    
+    def __init__(
+        self,
+        master,
+        row_height: int,
+        create_row: Callable[[ctk.CTkFrame], ctk.CTkFrame],
+        fetch: Callable[[int, int], List],
+        page_size: int = 100,
+        max_pages: int = 20,
+        empty_text: str = "",
+        **kwargs
+    ):
+        """
+        初始化虚拟列表
+        
+        Args:
+            row_height: 行高（含行间距）
+            create_row: 创建行组件的函数
+            fetch: 读取记录的函数，参数为偏移和数量
+            page_size: 每页记录数
+            max_pages: 内存中最多缓存的页数
+            empty_text: 没有记录时显示的文本
+        """
+        super().__init__(master, fg_color="transparent", **kwargs)
+        
+        self.row_height = row_height
+        self.create_row = create_row
+        self.fetch = fetch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.total = 0
+        
+        # 视口顶部在整个列表中的像素位置
+        self._top = 0
+        self._pages: 'OrderedDict[int, List]' = OrderedDict()
+        self._rows: List[ctk.CTkFrame] = []
+        
+        self._viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self._viewport.pack(side="left", fill="both", expand=True)
+        self._viewport.bind("<Configure>", lambda event: self._render())
+        
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.pack(side="right", fill="y")
+        
+        self._empty_label = ctk.CTkLabel(
+            self._viewport,
+            text=empty_text,
+            font=ctk.CTkFont(size=14),
+            text_color="#666666"
+        )
+        
+        # 滚轮事件落在行内的子组件上：视口和每一行的子组件都加上本列表专用的绑定标签，
+        # 列表销毁时解除绑定，不留下全局处理函数
+        self._wheel_tag = f"VirtualListWheel{id(self)}"
+        if sys.platform.startswith('linux'):
+            sequences = ("<Button-4>", "<Button-5>")
+        else:
+            sequences = ("<MouseWheel>",)
+        self._wheel_bindings = [
+            (sequence, self.bind_class(self._wheel_tag, sequence, self._on_mouse_wheel))
+            for sequence in sequences
+        ]
+        self._add_wheel_tag(self._viewport)
+    
+    def _add_wheel_tag(self, widget):
+        """给组件及其所有子组件加上滚轮绑定标签"""
+        tags = widget.bindtags()
+        if self._wheel_tag not in tags:
+            widget.bindtags((self._wheel_tag,) + tags)
+        for child in widget.winfo_children():
+            self._add_wheel_tag(child)
+    
+    def destroy(self):
+        for sequence, funcid in self._wheel_bindings:
+            self.unbind_class(self._wheel_tag, sequence)
+            self.deletecommand(funcid)
+        self._wheel_bindings = []
+        super().destroy()
+    
+    @property
+    def _scaled_row_height(self) -> int:
+        return max(1, round(self._apply_widget_scaling(self.row_height)))
+    
+    def reset(self, total: int):
+        """
+        重新加载列表（数据源变化后调用），回到顶部
+        
+        Args:
+            total: 新的记录总数
+        """
+        self.total = total
+        self._top = 0
+        self._pages.clear()
+        self._render()
+    
+    def refresh(self, total: int):
+        """
+        数据有增删或修改时重绘，保持当前滚动位置
+        
+        Args:
+            total: 新的记录总数
+        """
+        self.total = total
+        self._pages.clear()
+        self._render()
+    
+    def scroll(self, pixels: int):
+        """滚动指定像素，正数向下"""
+        self._top += pixels
+        self._render()
+    
+    def _record(self, index: int):
+        """按序号取记录，所在页不在缓存中时读取整页"""
+        page_index = index // self.page_size
+        page = self._pages.get(page_index)
+        if page is None:
+            try:
+                page = self.fetch(page_index * self.page_size, self.page_size)
+            except Exception as e:
+                print(f"读取列表数据失败: {e}")
+                page = []
+            self._pages[page_index] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_index)
+        offset = index - page_index * self.page_size
+        return page[offset] if offset < len(page) else None
+    
+    def _render(self):
+        """按当前滚动位置摆放可见的行"""
+        height = self._viewport.winfo_height()
+        row_height = self._scaled_row_height
+        content_height = self.total * row_height
+        self._top = max(0, min(self._top, content_height - height))
+        
+        # 可见行数加一行，滚动时上下各露出半行
+        needed = height // row_height + 2 if self.total else 0
+        while len(self._rows) < needed:
+            row = self.create_row(self._viewport)
+            self._add_wheel_tag(row)
+            self._rows.append(row)
+        
+        first = self._top // row_height
+        shift = first * row_height - self._top
+        for i, row in enumerate(self._rows):
+            index = first + i
+            record = self._record(index) if i < needed and index < self.total else None
+            if record is None:
+                row.place_forget()
+                continue
+            row.show(record)
+            row.place(x=0, y=shift + i * row_height, relwidth=1)
+        
+        if self.total:
+            self._empty_label.place_forget()
+        else:
+            self._empty_label.place(relx=0.5, y=50, anchor="n")
+        
+        if content_height > height:
+            self._scrollbar.set(self._top / content_height, (self._top + height) / content_height)
+        else:
+            self._scrollbar.set(0, 1)
+    
+    def _on_scrollbar(self, action: str, value, unit: Optional[str] = None):
+        """滚动条拖动或点击"""
+        if action == 'moveto':
+            self._top = int(float(value) * self.total * self._scaled_row_height)
+            self._render()
+        elif action == 'scroll':
+            step = self._viewport.winfo_height() if unit == 'pages' else self._scaled_row_height
+            self.scroll(int(value) * step)
+    
+    def _on_mouse_wheel(self, event):
+        """鼠标滚轮"""
+        if event.num == 4:
+            rows = -1
+        elif event.num == 5:
+            rows = 1
+        elif sys.platform == 'darwin':
+            rows = -event.delta
+        else:
+            rows = -round(event.delta / 120)
+        self.scroll(rows * self._scaled_row_height)
+
+
+class HistoryRow(ctk.CTkFrame):
+    """历史记录行，由 VirtualList 复用"""
+    
+    THUMBNAIL_SIZE = (80, 45)
+    
+    def __init__(self, master, height: int = 65, **kwargs):
+        super().__init__(master, height=height, **kwargs)
+        
+        self.configure(fg_color="#2b2b2b", corner_radius=8)
+        # 行高固定，不随内容变化
+        self.pack_propagate(False)
+        
+        self.record: Optional[Dict] = None
+        self._thumbnail_job = None
+        
+        self._create_widgets()
+    
+    def _create_widgets(self):
+        """创建行内的组件"""
+        # 缩略图
+        self.thumb_label = ctk.CTkLabel(
+            self,
+            text="🎬",
+            width=self.THUMBNAIL_SIZE[0],
+            height=self.THUMBNAIL_SIZE[1],
+            fg_color="#1a1a1a",
+            corner_radius=6
+        )
+        self.thumb_label.pack(side="left", padx=(12, 0), pady=10)
+        
+        inner = ctk.CTkFrame(self, fg_color="transparent")
+        inner.pack(side="left", fill="x", expand=True, padx=12, pady=10)
+        
+        # 标题
+        self.title_label = ctk.CTkLabel(
+            inner,
+            text="",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            anchor="w"
+        )
+        self.title_label.pack(fill="x")
+        
+        # 信息行
+        self.info_label = ctk.CTkLabel(
+            inner,
+            text="",
+            font=ctk.CTkFont(size=11),
+            text_color="#888888",
+            anchor="w"
+        )
+        self.info_label.pack(fill="x")
+    
+    def show(self, record: Dict):
+        """显示一条记录"""
+        if record is self.record:
+            return
+        self.record = record
+        
+        self.title_label.configure(text=(record.get('title') or '未知')[:40])
+        self.info_label.configure(
+            text=f"📺 {record.get('platform') or '未知'}  |  🕐 {(record.get('download_time') or '')[:10]}"
+        )
+        
+        # 复用的行可能还显示着上一条记录的缩略图
+        url = record.get('thumbnail')
+        image = thumbnail_service.get_cached(url, self.THUMBNAIL_SIZE) if url else None
+        if image is not None:
+            self.thumb_label.configure(image=image, text="")
+        else:
+            self.thumb_label.configure(image=thumbnail_service.placeholder(self.THUMBNAIL_SIZE), text="🎬")
+        
+        # 滚动停下后才加载缩略图，快速滚动时不会为掠过的行发起请求
+        if self._thumbnail_job is not None:
+            self.after_cancel(self._thumbnail_job)
+            self._thumbnail_job = None
+        if url and image is None:
+            self._thumbnail_job = self.after(150, self._load_thumbnail)
     
-    def set_error(self, message: str = "下载失败"):
-        """设置为错误状态"""
-        self.status_label.configure(text="✗ " + message[:20], text_color="#ff4444")
-        self.speed_label.configure(text="")
+    def _load_thumbnail(self):
+        self._thumbnail_job = None
+        record = self.record
+        
+        def show(photo):
+            # 图片到达时行可能已被复用于其它记录
+            if photo is not None and self.record is record and self.winfo_exists():
+                self.thumb_label.configure(image=photo, text="")
+        
+        thumbnail_service.request(
+            record['thumbnail'],
+            lambda photo: self.after(0, lambda: show(photo)),
+            size=self.THUMBNAIL_SIZE
+        )
 
 
 class SettingsPanel(ctk.CTkFrame):
@@ -0,0 +1,209 @@
+"""
+下载列表模型 - 保存每个下载任务的显示状态，与界面组件分离
+"""
+import time
+from collections import deque
+from typing import Optional, Deque, Dict, List
+
+from utils.helpers import format_size
+
+
+class DownloadItem:
+    """下载列表中的一项
+    
+    只保存显示所需的状态，由 VirtualList 中复用的 DownloadCard 负责显示；
+    每次修改递增 version，卡片据此判断是否需要重绘。
+    所有方法都在界面线程中调用。
+    """
+    
+    # 显示状态
+    ACTIVE = 'active'
+    COMPLETED = 'completed'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+    
+    def __init__(self, model: 'DownloadListModel', url: str, title: str, platform: str, status: str):
+        # 从列表中移除后为None
+        self.model: Optional['DownloadListModel'] = model
+        self.url = url
+        self.title = title
+        self.platform = platform
+        self.state = self.ACTIVE
+        self.status_text = status
+        self.status_color = "#4CAF50"
+        self.percent = 0.0
+        self.percent_text = "0%"
+        self.speed_text = ""
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        
+        # 由 _submit_download 设置
+        self.job = None
+        self.downloader = None
+    
+    @property
+    def cancellable(self) -> bool:
+        return self.state == self.ACTIVE
+    
+    def _changed(self):
+        self.version += 1
+        if self.model is not None:
+            self.model.mark_dirty()
+    
+    def _finish(self, state: str):
+        # 已从列表中移除的项只更新自身状态
+        if self.state == self.ACTIVE and self.model is not None:
+            self.finished_at = time.monotonic()
+            if state == self.FAILED:
+                self.model._failed.append(self)
+            else:
+                self.model._finished.append(self)
+        self.state = state
+    
+    def set_title(self, title: str):
+        """更新标题"""
+        self.title = title
+        self._changed()
+    
+    def set_status(self, status: str):
+        """更新状态文本"""
+        self.status_text = status
+        self._changed()
+    
+    def update_progress(self, percent: float, speed: float = 0, status: str = "下载中..."):
+        """更新进度，已结束的项忽略迟到的进度"""
+        if self.state != self.ACTIVE:
+            return
+        self.percent = percent
+        self.percent_text = f"{percent:.1f}%"
+        self.status_text = status
+        if speed > 0:
+            self.speed_text = format_size(speed) + "/s"
+        self._changed()
+    
+    def set_complete(self):
+        """设置为完成状态"""
+        self.percent = 100.0
+        self.percent_text = "100%"
+        self.status_text = "✓ 完成"
+        self.status_color = "#4CAF50"
+        self.speed_text = ""
+        self._finish(self.COMPLETED)
+        self._changed()
+    
+    def set_skipped(self, message: str = "已下载过"):
+        """设置为跳过状态（重复下载）"""
+        self.percent = 100.0
+        self.percent_text = ""
+        self.status_text = "↷ " + message
+        self.status_color = "#888888"
+        self.speed_text = ""
+        self._finish(self.SKIPPED)
+        self._changed()
+    
+    def set_error(self, message: str = "下载失败"):
+        """设置为错误状态"""
+        self.status_text = "✗ " + message[:20]
+        self.status_color = "#ff4444"
+        self.speed_text = ""
+        self._finish(self.FAILED)
+        self._changed()
+
+
+class DownloadListModel:
+    """下载列表模型
+    
+    按提交顺序保存列表中显示的项。完成和跳过的项显示一段时间后
+    收起为摘要中的计数并释放（已记入历史记录），失败的项保留在列表中，
+    超过上限时最早的失败项同样收起。长时间运行时列表大小只取决于
+    进行中的任务数。
+    """
+    
+    def __init__(self, collapse_delay: float = 3.0, max_failed: int = 100):
+        """
+        初始化模型
+        
+        Args:
+            collapse_delay: 完成或跳过后在列表中保留的秒数
+            max_failed: 列表中最多保留的失败项数
+        """
+        self.collapse_delay = collapse_delay
+        self.max_failed = max_failed
+        self.items: List[DownloadItem] = []
+        self.collapsed: Dict[str, int] = {
+            DownloadItem.COMPLETED: 0,
+            DownloadItem.SKIPPED: 0,
+            DownloadItem.FAILED: 0,
+        }
+        self.dirty = False
+        # 按结束顺序排列的完成/跳过项和失败项，用于收起
+        self._finished: Deque[DownloadItem] = deque()
+        self._failed: Deque[DownloadItem] = deque()
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    def add(self, url: str, title: str, platform: str, status: str) -> DownloadItem:
+        """添加一项"""
+        item = DownloadItem(self, url, title, platform, status)
+        self.items.append(item)
+        self.mark_dirty()
+        return item
+    
+    def mark_dirty(self):
+        self.dirty = True
+    
+    def slice(self, offset: int, limit: int) -> List[DownloadItem]:
+        """供 VirtualList 读取"""
+        return self.items[offset:offset + limit]
+    
+    def collapse(self, now: Optional[float] = None) -> bool:
+        """
+        收起已到期的完成项和超出上限的失败项
+        
+        Returns:
+            是否有项被收起
+        """
+        now = time.monotonic() if now is None else now
+        removed = set()
+        while self._finished and now - self._finished[0].finished_at >= self.collapse_delay:
+            item = self._finished.popleft()
+            removed.add(item)
+            self.collapsed[item.state] += 1
+        while len(self._failed) > self.max_failed:
+            removed.add(self._failed.popleft())
+            self.collapsed[DownloadItem.FAILED] += 1
+        
+        if not removed:
+            return False
+        for item in removed:
+            item.model = None
+        self.items = [item for item in self.items if item not in removed]
+        self.mark_dirty()
+        return True
+    
+    def summary(self) -> str:
+        """收起项的摘要文本，没有收起项时为空"""
+        parts = []
+        if self.collapsed[DownloadItem.COMPLETED]:
+            parts.append(f"✓ 已完成 {self.collapsed[DownloadItem.COMPLETED]}")
+        if self.collapsed[DownloadItem.SKIPPED]:
+            parts.append(f"↷ 已跳过 {self.collapsed[DownloadItem.SKIPPED]}")
+        if self.collapsed[DownloadItem.FAILED]:
+            parts.append(f"✗ 失败 {self.collapsed[DownloadItem.FAILED]}")
+        return "  ".join(parts)
+    
+    def unfinished(self) -> List[DownloadItem]:
+        """进行中的项"""
+        return [item for item in self.items if item.state == DownloadItem.ACTIVE]
+    
+    def clear(self):
+        """清空列表和摘要"""
+        for item in self.items:
+            item.model = None
+        self.items.clear()
+        self._finished.clear()
+        self._failed.clear()
+        for state in self.collapsed:
+            self.collapsed[state] = 0
+        self.mark_dirty()
@@ -0,0 +1,310 @@
+"""
+缩略图服务 - 内存和磁盘两级缓存，少量工作线程复用HTTP连接下载
+"""
+import hashlib
+import http.client
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit, urljoin
+
+import customtkinter as ctk
+
+
+Size = Tuple[int, int]
+
+# 主窗口预览图尺寸
+PREVIEW_SIZE = (200, 112)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+class ThumbnailService:
+    """缩略图服务
+    
+    缩小后的图片以 URL+尺寸 的哈希为文件名保存为JPEG，
+    最近使用的图片另以 CTkImage 形式保存在内存LRU中。
+    未命中时由工作线程下载：每个线程为每个主机保持一个长连接，
+    解码时先用 Image.draft 让JPEG解码器按比例缩小，再用 reduce 整数倍缩小，
+    最后一步才用 LANCZOS 缩放到目标尺寸。
+    同一图片的并发请求只下载一次。
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        memory_items: int = 128,
+        max_disk_bytes: int = 32 * 1024 * 1024,
+        workers: int = 3,
+        timeout: float = 5
+    ):
+        """
+        初始化缩略图服务
+        
+        Args:
+            cache_dir: 磁盘缓存目录，默认为 data/thumbnails
+            memory_items: 内存中最多保留的图片数
+            max_disk_bytes: 磁盘缓存总大小上限，超出时删除最久未使用的文件
+            workers: 下载线程数
+            timeout: 网络超时(秒)
+        """
+        if cache_dir is None:
+            if getattr(sys, 'frozen', False):
+                base_path = os.path.dirname(sys.executable)
+            else:
+                base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_dir = os.path.join(base_path, 'data', 'thumbnails')
+        
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.workers = workers
+        self.timeout = timeout
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, ctk.CTkImage]' = OrderedDict()
+        self._placeholders: Dict[Size, ctk.CTkImage] = {}
+        # 缓存键 -> 等待结果的回调列表
+        self._pending: Dict[str, List[Callable]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._writes = 0
+    
+    @staticmethod
+    def _key(url: str, size: Size) -> str:
+        return hashlib.sha1(f'{url}|{size[0]}x{size[1]}'.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.jpg')
+    
+    def get_cached(self, url: str, size: Size = PREVIEW_SIZE) -> Optional[ctk.CTkImage]:
+        """只查内存缓存，不访问磁盘和网络"""
+        key = self._key(url, size)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            return image
+    
+    def placeholder(self, size: Size = PREVIEW_SIZE) -> ctk.CTkImage:
+        """与缩略图同尺寸的空白图片，复用的标签用它替换旧图片"""
+        image = self._placeholders.get(size)
+        if image is None:
+            from PIL import Image
+            
+            blank = Image.new('RGB', size, '#1a1a1a')
+            image = self._placeholders[size] = ctk.CTkImage(light_image=blank, dark_image=blank, size=size)
+        return image
+    
+    def request(
+        self,
+        url: str,
+        callback: Callable[[Optional[ctk.CTkImage]], None],
+        size: Size = PREVIEW_SIZE
+    ):
+        """
+        获取缩略图
+        
+        内存命中时立即在调用线程回调，否则在工作线程中回调，
+        调用方需要自行用 after() 切换到界面线程。
+        
+        Args:
+            url: 图片URL
+            callback: 接收 CTkImage 的回调，失败时参数为None
+            size: 目标尺寸(宽, 高)
+        """
+        image = self.get_cached(url, size)
+        if image is not None:
+            self.hits += 1
+            callback(image)
+            return
+        
+        key = self._key(url, size)
+        with self._lock:
+            waiters = self._pending.get(key)
+            if waiters is not None:
+                waiters.append(callback)
+                return
+            self._pending[key] = [callback]
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='thumbnail'
+                )
+            executor = self._executor
+        executor.submit(self._load, url, size, key)
+    
+    def _load(self, url: str, size: Size, key: str):
+        """工作线程：读磁盘缓存，未命中则下载并缩小"""
+        image = None
+        try:
+            pil_image = self._read_disk(key)
+            if pil_image is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                pil_image = self._shrink(self._fetch(url), size)
+                self._write_disk(key, pil_image)
+            image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=size)
+            with self._lock:
+                self._memory[key] = image
+                while len(self._memory) > self.memory_items:
+                    self._memory.popitem(last=False)
+        except Exception as e:
+            print(f"加载缩略图失败: {e}")
+        finally:
+            with self._lock:
+                callbacks = self._pending.pop(key, [])
+            for callback in callbacks:
+                try:
+                    callback(image)
+                except Exception as e:
+                    print(f"缩略图回调失败: {e}")
+    
+    def _read_disk(self, key: str):
+        from PIL import Image
+        
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                image = Image.open(io.BytesIO(f.read()))
+                image.load()
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # 文件损坏，删除后重新下载
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            # 更新访问时间，淘汰时按最近使用排序
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+    
+    def _write_disk(self, key: str, image):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            image.save(tmp_path, 'JPEG', quality=85)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"保存缩略图缓存失败: {e}")
+            return
+        
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 32 == 1
+        if prune:
+            self.prune()
+    
+    def prune(self):
+        """磁盘缓存超过上限时删除最久未使用的文件"""
+        files = []
+        total = 0
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        
+        files.sort()
+        for _mtime, file_size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= file_size
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _shrink(data: bytes, size: Size):
+        """解码并缩小到目标尺寸"""
+        from PIL import Image
+        
+        image = Image.open(io.BytesIO(data))
+        # JPEG 在解码时直接按 1/2、1/4、1/8 缩小，不必解出全尺寸图像
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        # reducing_gap 先用 reduce() 整数倍缩小，再用 LANCZOS 处理剩余比例
+        return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    
+    def _connection(self, scheme: str, netloc: str, fresh: bool = False) -> http.client.HTTPConnection:
+        """当前线程到该主机的长连接"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        conn = connections.get(key)
+        if conn is not None and fresh:
+            conn.close()
+            conn = None
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = connections[key] = cls(netloc, timeout=self.timeout)
+        return conn
+    
+    def _fetch(self, url: str, redirects: int = 3) -> bytes:
+        """下载图片内容，复用当前线程的连接"""
+        for _ in range(redirects + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                raise ValueError(f"不支持的缩略图地址: {url}")
+            target = parts.path or '/'
+            if parts.query:
+                target += '?' + parts.query
+            
+            # 服务器可能已关闭空闲连接，失败时换新连接重试一次
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+                try:
+                    conn.request('GET', target, headers={'User-Agent': USER_AGENT})
+                    response = conn.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    if attempt:
+                        raise
+            
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader('Location')
+                if not location:
+                    break
+                url = urljoin(url, location)
+                continue
+            if response.status != 200:
+                raise OSError(f"HTTP {response.status}")
+            return data
+        
+        raise OSError("重定向次数过多")
+    
+    def shutdown(self):
+        """停止工作线程"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局实例
+thumbnail_service = ThumbnailService()
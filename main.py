@@ -5,6 +5,8 @@
 使用方法:
 1. 直接运行: python main.py
 2. 或运行打包后的exe文件
+3. 无界面模式: python main.py --headless URL [URL ...]
+4. 启动耗时分析: python main.py --profile-startup[=json]
 """
 
 import sys
@@ -20,20 +22,51 @@ else:
 
 sys.path.insert(0, application_path)
 
-# 导入并启动应用
-from gui.app import VideoDownloaderApp
-
 
 def main():
     """主函数"""
+    # 无界面模式不导入任何GUI模块
+    if '--headless' in sys.argv[1:]:
+        from core.cli import main as cli_main
+        argv = [arg for arg in sys.argv[1:] if arg != '--headless']
+        sys.exit(cli_main(argv))
+    
+    # 启动耗时分析：显示第一个窗口后输出统计并退出
+    profile_arg = next(
+        (arg for arg in sys.argv[1:] if arg.split('=')[0] == '--profile-startup'),
+        None
+    )
+    profiler = None
+    if profile_arg:
+        from utils.startup_profiler import StartupProfiler
+        profiler = StartupProfiler()
+        profiler.install()
+    
     try:
+        # 导入并启动应用
+        from gui.app import VideoDownloaderApp
+        if profiler:
+            profiler.mark('import gui.app')
+        
         app = VideoDownloaderApp()
+        if profiler:
+            profiler.mark('create window')
+            app.update()
+            profiler.mark('first window')
+            profiler.uninstall()
+            profiler.report(as_json=profile_arg == '--profile-startup=json')
+            app.destroy()
+            return
+        
         app.mainloop()
     except Exception as e:
         import traceback
         print(f"程序启动失败: {e}")
         traceback.print_exc()
-        input("按回车键退出...")
+        # 双击运行时暂停以便看到错误；没有交互式终端（CI、重定向）时直接退出
+        if sys.stdin is not None and sys.stdin.isatty():
+            input("按回车键退出...")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
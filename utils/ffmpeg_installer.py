@@ -0,0 +1,515 @@
+"""
+FFmpeg 安装器 - 流式下载便携版，可续传、校验，只解压 ffmpeg/ffprobe
+"""
+import hashlib
+import http.client
+import json
+import os
+import platform
+import shutil
+import struct
+import sys
+import tarfile
+import time
+import urllib.error
+import urllib.request
+import zlib
+from typing import Optional, Callable, Dict, List
+
+
+# 需要解压的可执行文件（位于压缩包的 bin 目录或根目录）
+WANTED_BINARIES = ('ffmpeg', 'ffprobe', 'ffmpeg.exe', 'ffprobe.exe')
+
+_BTBN = 'https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/'
+_EVERMEET = 'https://evermeet.cx/ffmpeg/getrelease/'
+
+
+class FFmpegBuild:
+    """一个平台的 FFmpeg 便携版"""
+    
+    def __init__(self, archives: List[str], checksum_url: Optional[str] = None):
+        """
+        Args:
+            archives: 压缩包地址（zip 或 tar.xz/tar.gz），多个压缩包的内容合并安装
+            checksum_url: sha256sum 格式的校验文件（每行 "<sha256>  <文件名>"），
+                          文件名与压缩包地址的最后一段对应；为None时只校验 zip 成员的 CRC
+        """
+        self.archives = archives
+        self.checksum_url = checksum_url
+
+
+# (系统, CPU架构) -> 便携版
+FFMPEG_BUILDS: Dict[tuple, FFmpegBuild] = {
+    ('win32', 'x86_64'): FFmpegBuild(
+        [_BTBN + 'ffmpeg-master-latest-win64-gpl.zip'], _BTBN + 'checksums.sha256'
+    ),
+    ('win32', 'arm64'): FFmpegBuild(
+        [_BTBN + 'ffmpeg-master-latest-winarm64-gpl.zip'], _BTBN + 'checksums.sha256'
+    ),
+    ('linux', 'x86_64'): FFmpegBuild(
+        [_BTBN + 'ffmpeg-master-latest-linux64-gpl.tar.xz'], _BTBN + 'checksums.sha256'
+    ),
+    ('linux', 'arm64'): FFmpegBuild(
+        [_BTBN + 'ffmpeg-master-latest-linuxarm64-gpl.tar.xz'], _BTBN + 'checksums.sha256'
+    ),
+    # evermeet.cx 的 macOS 版 ffmpeg 与 ffprobe 分开打包，未提供 sha256 校验文件
+    ('darwin', 'x86_64'): FFmpegBuild([_EVERMEET + 'ffmpeg/zip', _EVERMEET + 'ffprobe/zip']),
+}
+
+_MACHINE_ALIASES = {'amd64': 'x86_64', 'x64': 'x86_64', 'aarch64': 'arm64'}
+
+
+def default_build() -> Optional[FFmpegBuild]:
+    """当前平台的便携版，不支持的平台返回None"""
+    system = 'linux' if sys.platform.startswith('linux') else sys.platform
+    machine = platform.machine().lower()
+    machine = _MACHINE_ALIASES.get(machine, machine)
+    build = FFMPEG_BUILDS.get((system, machine))
+    if build is None and system == 'darwin':
+        # Apple Silicon 通过 Rosetta 运行 x86_64 版本
+        build = FFMPEG_BUILDS[('darwin', 'x86_64')]
+    return build
+
+
+def fetch_checksums(url: str, timeout: float = 30) -> Dict[str, str]:
+    """下载并解析 sha256sum 格式的校验文件：文件名 -> sha256"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        text = response.read().decode('utf-8', errors='replace')
+    checksums = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and len(parts[0]) == 64:
+            checksums[parts[1].lstrip('*')] = parts[0].lower()
+    return checksums
+
+
+class ResumableDownload:
+    """可续传的下载流
+    
+    read() 先返回 .part 文件中已下载的部分，再从网络继续读取并追加到 .part 文件，
+    读到的全部字节计入 SHA-256，解压和校验只需要一遍。
+    连接中断时从当前偏移用 Range 请求重新连接；服务器不支持 Range 时跳过已读部分。
+    .part 文件旁的 .json 记录地址和 ETag/Last-Modified，服务器上的文件变化后从头下载。
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        part_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        retries: int = 5,
+        timeout: float = 30,
+        chunk_size: int = 256 * 1024
+    ):
+        """
+        Args:
+            url: 下载地址
+            part_path: 未完成文件的保存路径
+            progress_callback: 进度回调，参数为 (已读取字节数, 总字节数)
+            retries: 连接中断后最多重连的次数
+            timeout: 网络超时(秒)
+            chunk_size: 每次从网络读取的字节数
+        """
+        self.url = url
+        self.part_path = part_path
+        self.meta_path = part_path + '.json'
+        self.progress_callback = progress_callback
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        
+        self.position = 0  # 已读取（并计入哈希）的字节数
+        self.total = 0
+        self.resumed_bytes = 0  # 从 .part 文件读取的字节数
+        self.network_bytes = 0  # 本次从网络读取的字节数
+        self.sha256 = hashlib.sha256()
+        self._local = None
+        self._local_size = 0
+        self._part = None
+        self._response = None
+        self._complete = False  # .part 已是完整文件，不需要再读网络
+        self._validator: Optional[str] = None
+        self._pushback = b''
+    
+    def open(self) -> 'ResumableDownload':
+        """打开下载：检查 .part 文件能否续传，建立连接"""
+        os.makedirs(os.path.dirname(self.part_path) or '.', exist_ok=True)
+        offset = 0
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('url') == self.url and os.path.exists(self.part_path):
+                offset = os.path.getsize(self.part_path)
+                self._validator = meta.get('validator')
+        except (OSError, ValueError):
+            pass
+        
+        self._local_size = offset
+        if offset:
+            if not self._connect(offset):
+                # 服务器上的文件已变化或不支持 Range，从头下载
+                self._local_size = 0
+        else:
+            self._connect(0)
+        
+        self._part = open(self.part_path, 'r+b' if self._local_size else 'wb')
+        self._part.truncate(self._local_size)
+        self._part.seek(self._local_size)
+        if self._local_size:
+            self._local = open(self.part_path, 'rb')
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': self.url, 'validator': self._validator}, f)
+        return self
+    
+    def _connect(self, offset: int) -> bool:
+        """
+        从 offset 开始请求
+        
+        Returns:
+            服务器是否从 offset 续传（206，或 .part 已是完整文件）；
+            为False时响应从文件开头开始
+        """
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if self._validator:
+                headers['If-Range'] = self._validator
+        try:
+            response = urllib.request.urlopen(
+                urllib.request.Request(self.url, headers=headers), timeout=self.timeout
+            )
+        except urllib.error.HTTPError as e:
+            if e.code != 416 or not offset:
+                raise
+            # 请求范围超出文件大小：.part 已经完整，由校验判断内容是否正确
+            content_range = e.headers.get('Content-Range', '')
+            self.total = int(content_range.rsplit('/', 1)[-1]) if content_range[-1:].isdigit() else offset
+            self._complete = True
+            return True
+        
+        self._response = response
+        length = int(response.headers.get('Content-Length') or 0)
+        self._validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        if response.status == 206:
+            content_range = response.headers.get('Content-Range', '')
+            self.total = int(content_range.rsplit('/', 1)[-1]) if content_range[-1:].isdigit() else offset + length
+            return True
+        self.total = length
+        return False
+    
+    def _reconnect(self):
+        """从当前偏移重新连接"""
+        if not self._connect(self.position):
+            # 响应从文件开头开始，丢弃已读取的部分
+            skip = self.position
+            while skip > 0:
+                data = self._response.read(min(skip, self.chunk_size))
+                if not data:
+                    raise OSError("重连后的响应比已下载的部分短")
+                skip -= len(data)
+    
+    def _read_network(self, size: int) -> bytes:
+        """从网络读取，中断时重连"""
+        for attempt in range(self.retries + 1):
+            try:
+                if self._complete:
+                    return b''
+                if self._response is None:
+                    self._reconnect()
+                    if self._complete:
+                        return b''
+                data = self._response.read(size)
+                if data or self.position + len(data) >= self.total:
+                    return data
+                # 连接提前关闭
+                raise http.client.IncompleteRead(data, self.total - self.position)
+            except (OSError, http.client.HTTPException):
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(0.25 * 2 ** attempt, 5))
+        return b''
+    
+    def read(self, size: int = -1) -> bytes:
+        """读取最多 size 个字节，读完后返回空字节串"""
+        if size is None or size < 0:
+            size = self.chunk_size
+        if size == 0:
+            return b''
+        if self._pushback:
+            data, self._pushback = self._pushback[:size], self._pushback[size:]
+            # 退回的字节不够时接着读取，调用方按首次读取的长度识别格式
+            if len(data) < size:
+                data += self._read_source(size - len(data))
+            return data
+        return self._read_source(size)
+    
+    def _read_source(self, size: int) -> bytes:
+        """从 .part 文件或网络读取，计入哈希和进度"""
+        data = b''
+        if self._local is not None:
+            data = self._local.read(min(size, self._local_size - self.position))
+            if data:
+                self.resumed_bytes += len(data)
+            else:
+                self._local.close()
+                self._local = None
+        if self._local is None:
+            data = self._read_network(min(size, self.chunk_size))
+            if data:
+                self._part.write(data)
+                self.network_bytes += len(data)
+        
+        if data:
+            self.position += len(data)
+            self.sha256.update(data)
+            if self.progress_callback:
+                self.progress_callback(self.position, self.total)
+        return data
+    
+    def unread(self, data: bytes):
+        """退回多读的字节，下次 read() 先返回（不重复计入哈希）"""
+        self._pushback = data + self._pushback
+    
+    def drain(self):
+        """读完剩余内容，保证哈希覆盖整个文件"""
+        self._pushback = b''
+        while self.read(self.chunk_size):
+            pass
+    
+    def close(self):
+        for f in (self._local, self._part, self._response):
+            if f is not None:
+                f.close()
+        self._local = self._part = self._response = None
+    
+    def discard(self):
+        """删除 .part 文件（校验失败时调用）"""
+        self.close()
+        for path in (self.part_path, self.meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _wanted(name: str) -> Optional[str]:
+    """压缩包成员是否需要解压：bin 目录或根目录下的 ffmpeg/ffprobe，返回文件名"""
+    parts = [p for p in name.replace('\\', '/').split('/') if p]
+    if not parts or parts[-1].lower() not in WANTED_BINARIES:
+        return None
+    if len(parts) > 1 and parts[-2].lower() != 'bin':
+        return None
+    return parts[-1]
+
+
+def _read_upto(stream: ResumableDownload, size: int) -> bytes:
+    """读取 size 个字节，到达结尾时可能更少"""
+    chunks = []
+    while size > 0:
+        data = stream.read(size)
+        if not data:
+            break
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+def _read_exact(stream: ResumableDownload, size: int) -> bytes:
+    data = _read_upto(stream, size)
+    if len(data) < size:
+        raise ValueError("压缩包不完整")
+    return data
+
+
+def extract_zip_stream(stream: ResumableDownload, dest_dir: str) -> List[str]:
+    """
+    按本地文件头顺序读取 zip，只解压需要的成员，不需要中央目录
+    
+    Returns:
+        解压出的文件名
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    extracted = []
+    while True:
+        if _read_upto(stream, 4) != b'PK\x03\x04':
+            # 中央目录或结尾，成员已全部读完
+            break
+        
+        (_version, flags, method, _time, _date, crc, comp_size, size,
+         name_len, extra_len) = struct.unpack('<HHHHHIIIHH', _read_exact(stream, 26))
+        name = _read_exact(stream, name_len).decode('utf-8' if flags & 0x800 else 'cp437')
+        extra = _read_exact(stream, extra_len)
+        if flags & 0x1:
+            raise ValueError(f"不支持加密的压缩包成员: {name}")
+        
+        # ZIP64：大小字段为 0xFFFFFFFF 时真实值在扩展字段 0x0001 中
+        zip64 = False
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, data_len = struct.unpack('<HH', extra[pos:pos + 4])
+            if header_id == 0x0001:
+                zip64 = True
+                values = extra[pos + 4:pos + 4 + data_len]
+                if size == 0xFFFFFFFF and len(values) >= 8:
+                    size, values = struct.unpack('<Q', values[:8])[0], values[8:]
+                if comp_size == 0xFFFFFFFF and len(values) >= 8:
+                    comp_size = struct.unpack('<Q', values[:8])[0]
+            pos += 4 + data_len
+        
+        target = _wanted(name)
+        has_descriptor = bool(flags & 0x8)
+        if method not in (0, 8) and (target or has_descriptor):
+            raise ValueError(f"不支持的压缩方式 {method}: {name}")
+        if method == 0 and has_descriptor:
+            raise ValueError(f"无法流式读取的压缩包成员: {name}")
+        
+        out = open(os.path.join(dest_dir, target), 'wb') if target else None
+        actual_crc = 0
+        try:
+            if method == 8:
+                decompressor = zlib.decompressobj(-15)
+                remaining = None if has_descriptor else comp_size
+                while not decompressor.eof:
+                    if remaining == 0:
+                        raise ValueError(f"压缩数据损坏: {name}")
+                    data = stream.read(stream.chunk_size if remaining is None else min(remaining, stream.chunk_size))
+                    if not data:
+                        raise ValueError("压缩包不完整")
+                    if remaining is not None:
+                        remaining -= len(data)
+                    chunk = decompressor.decompress(data)
+                    if out is not None:
+                        out.write(chunk)
+                        actual_crc = zlib.crc32(chunk, actual_crc)
+                # 读过头的部分属于后面的内容
+                if decompressor.unused_data:
+                    stream.unread(decompressor.unused_data)
+            else:
+                remaining = comp_size
+                while remaining > 0:
+                    data = stream.read(min(remaining, stream.chunk_size))
+                    if not data:
+                        raise ValueError("压缩包不完整")
+                    remaining -= len(data)
+                    if out is not None:
+                        out.write(data)
+                        actual_crc = zlib.crc32(data, actual_crc)
+        finally:
+            if out is not None:
+                out.close()
+        
+        if has_descriptor:
+            descriptor = _read_exact(stream, 4)
+            if descriptor == b'PK\x07\x08':
+                descriptor = _read_exact(stream, 4)
+            crc = struct.unpack('<I', descriptor)[0]
+            _read_exact(stream, 16 if zip64 else 8)
+        
+        if target:
+            if actual_crc != crc:
+                raise ValueError(f"CRC 校验失败: {name}")
+            os.chmod(os.path.join(dest_dir, target), 0o755)
+            extracted.append(target)
+    return extracted
+
+
+def extract_tar_stream(stream: ResumableDownload, dest_dir: str) -> List[str]:
+    """
+    流式读取 tar（xz/gz/bz2 压缩），只解压需要的成员
+    
+    Returns:
+        解压出的文件名
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    extracted = []
+    with tarfile.open(fileobj=stream, mode='r|*') as tar:
+        for member in tar:
+            target = _wanted(member.name)
+            if not target or not member.isfile():
+                continue
+            source = tar.extractfile(member)
+            with open(os.path.join(dest_dir, target), 'wb') as out:
+                shutil.copyfileobj(source, out, stream.chunk_size)
+            os.chmod(os.path.join(dest_dir, target), 0o755)
+            extracted.append(target)
+    return extracted
+
+
+def part_path(work_dir: str, url: str) -> str:
+    """压缩包对应的未完成文件路径"""
+    return os.path.join(work_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.part')
+
+
+def install(
+    build: FFmpegBuild,
+    dest_dir: str,
+    work_dir: str,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> List[str]:
+    """
+    下载并安装便携版
+    
+    每个压缩包边下载边解压，下载内容同时写入 work_dir 中的 .part 文件，
+    中断后再次调用从已下载的位置继续。全部校验通过后才用新文件替换 dest_dir。
+    
+    Args:
+        build: 要安装的便携版
+        dest_dir: 安装目录，完成后可执行文件位于 dest_dir/bin
+        work_dir: 未完成下载的保存目录，成功后删除
+        progress_callback: 进度回调，参数为 (已下载字节数, 总字节数)
+    
+    Returns:
+        安装的可执行文件名
+    
+    Raises:
+        ValueError: 校验失败、压缩包格式错误或缺少 ffmpeg
+        OSError: 网络或文件错误（已下载的部分保留，可以续传）
+    """
+    checksums = fetch_checksums(build.checksum_url) if build.checksum_url else None
+    staging = dest_dir + '.new'
+    shutil.rmtree(staging, ignore_errors=True)
+    staging_bin = os.path.join(staging, 'bin')
+    
+    extracted = []
+    for url in build.archives:
+        archive_name = url.rstrip('/').rsplit('/', 1)[-1].split('?')[0]
+        expected = None
+        if checksums is not None:
+            expected = checksums.get(archive_name)
+            if expected is None:
+                raise ValueError(f"校验文件中没有 {archive_name}")
+        
+        stream = ResumableDownload(url, part_path(work_dir, url), progress_callback).open()
+        try:
+            head = stream.read(4)
+            stream.unread(head)
+            if head == b'PK\x03\x04':
+                names = extract_zip_stream(stream, staging_bin)
+            else:
+                names = extract_tar_stream(stream, staging_bin)
+            stream.drain()
+        except ValueError:
+            # 内容损坏，续传也无法修复
+            stream.discard()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        finally:
+            stream.close()
+        
+        if expected is not None and stream.sha256.hexdigest() != expected:
+            stream.discard()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise ValueError(f"SHA-256 校验失败: {archive_name}")
+        extracted.extend(names)
+    
+    if not any(name.startswith('ffmpeg') for name in extracted):
+        shutil.rmtree(staging, ignore_errors=True)
+        raise ValueError("压缩包中没有 ffmpeg")
+    
+    shutil.rmtree(dest_dir, ignore_errors=True)
+    os.replace(staging, dest_dir)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return extracted
@@ -1,19 +1,182 @@
 """
 FFmpeg 管理器 - 自动下载和配置FFmpeg
 """
+import json
 import os
 import sys
-import zipfile
+import subprocess
+import threading
+import time
 import shutil
-import urllib.request
-from typing import Optional
+from typing import Optional, Dict, Any, List, Tuple
+
+
+# 探测命令不弹出控制台窗口（Windows）
+_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+def _run(args: List[str], timeout: float = 10) -> str:
+    """运行命令并返回标准输出，失败时返回空字符串"""
+    try:
+        result = subprocess.run(
+            args, capture_output=True, timeout=timeout, creationflags=_NO_WINDOW
+        )
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def _parse_codec_list(output: str) -> List[str]:
+    """解析 -encoders / -decoders 的输出，返回编解码器名称"""
+    names = []
+    started = False
+    for line in output.splitlines():
+        if not started:
+            started = line.strip().startswith('---')
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            names.append(parts[1])
+    return names
+
+
+class FFmpegCapabilities:
+    """FFmpeg 能力探测结果
+    
+    解析出的 ffmpeg/ffprobe 路径、版本、编解码器和硬件加速方式，
+    与二进制文件的修改时间、大小一起保存到磁盘，文件变化时重新探测。
+    """
+    
+    def __init__(
+        self,
+        ffmpeg: str,
+        ffprobe: Optional[str],
+        mtime: int,
+        size: int,
+        version: str = '',
+        encoders: Tuple[str, ...] = (),
+        decoders: Tuple[str, ...] = (),
+        hwaccels: Tuple[str, ...] = ()
+    ):
+        self.ffmpeg = ffmpeg
+        self.ffprobe = ffprobe
+        self.mtime = mtime
+        self.size = size
+        self.version = version
+        self.encoders = frozenset(encoders)
+        self.decoders = frozenset(decoders)
+        self.hwaccels = tuple(hwaccels)
+    
+    @property
+    def location(self) -> str:
+        """ffmpeg 所在目录（yt-dlp 的 ffmpeg_location）"""
+        return os.path.dirname(self.ffmpeg)
+    
+    def matches(self, stat: os.stat_result) -> bool:
+        """二进制文件是否与探测时相同"""
+        return stat.st_mtime_ns == self.mtime and stat.st_size == self.size
+    
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+    
+    def has_decoder(self, name: str) -> bool:
+        return name in self.decoders
+    
+    @classmethod
+    def probe(cls, ffmpeg: str, stat: os.stat_result) -> 'FFmpegCapabilities':
+        """
+        运行 ffmpeg 探测能力
+        
+        Args:
+            ffmpeg: ffmpeg 可执行文件路径
+            stat: 该文件的 os.stat 结果
+        """
+        name = 'ffprobe.exe' if ffmpeg.lower().endswith('.exe') else 'ffprobe'
+        ffprobe = os.path.join(os.path.dirname(ffmpeg), name)
+        if not os.path.exists(ffprobe):
+            ffprobe = shutil.which('ffprobe')
+        
+        version_line = _run([ffmpeg, '-hide_banner', '-version']).split('\n', 1)[0]
+        # ffmpeg version 7.0.2-static https://...
+        parts = version_line.split()
+        version = parts[2] if len(parts) > 2 and parts[1] == 'version' else ''
+        hwaccels = [
+            line.strip() for line in _run([ffmpeg, '-hide_banner', '-hwaccels']).splitlines()[1:]
+            if line.strip()
+        ]
+        return cls(
+            ffmpeg=ffmpeg,
+            ffprobe=ffprobe,
+            mtime=stat.st_mtime_ns,
+            size=stat.st_size,
+            version=version,
+            encoders=_parse_codec_list(_run([ffmpeg, '-hide_banner', '-encoders'])),
+            decoders=_parse_codec_list(_run([ffmpeg, '-hide_banner', '-decoders'])),
+            hwaccels=hwaccels,
+        )
+    
+    def stream_codecs(self, path: str) -> Optional[Tuple[str, str]]:
+        """
+        用 ffprobe 读取文件的编码
+        
+        Returns:
+            (视频编码, 音频编码)，例如 ('h264', 'aac')，没有该流时为 'none'；
+            没有 ffprobe 或读取失败时返回None
+        """
+        if not self.ffprobe or not path or not os.path.exists(path):
+            return None
+        output = _run([
+            self.ffprobe, '-v', 'error', '-of', 'json',
+            '-show_entries', 'stream=codec_type,codec_name:stream_disposition=attached_pic',
+            path,
+        ])
+        try:
+            streams = json.loads(output)['streams']
+        except (ValueError, KeyError):
+            return None
+        
+        vcodec = acodec = 'none'
+        for stream in streams:
+            if stream.get('codec_type') == 'video' and vcodec == 'none':
+                # 封面图片不算视频流
+                if not (stream.get('disposition') or {}).get('attached_pic'):
+                    vcodec = stream.get('codec_name') or 'none'
+            elif stream.get('codec_type') == 'audio' and acodec == 'none':
+                acodec = stream.get('codec_name') or 'none'
+        return vcodec, acodec
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'ffmpeg': self.ffmpeg,
+            'ffprobe': self.ffprobe,
+            'mtime': self.mtime,
+            'size': self.size,
+            'version': self.version,
+            'encoders': sorted(self.encoders),
+            'decoders': sorted(self.decoders),
+            'hwaccels': list(self.hwaccels),
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FFmpegCapabilities':
+        """读取 to_dict 的结果，缺少字段的旧版缓存抛出 KeyError，视为过期"""
+        return cls(
+            ffmpeg=data['ffmpeg'],
+            ffprobe=data['ffprobe'],
+            mtime=data['mtime'],
+            size=data['size'],
+            version=data['version'],
+            encoders=data['encoders'],
+            decoders=data['decoders'],
+            hwaccels=data['hwaccels'],
+        )
 
 
 class FFmpegManager:
     """FFmpeg便携版管理器"""
     
-    # FFmpeg便携版下载地址 (使用GitHub release)
-    FFMPEG_URL = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip"
+    # 找不到 ffmpeg 的结果保留的秒数，之后重新查找（程序运行期间可能装到了 PATH 中）
+    negative_ttl = 30.0
     
     def __init__(self):
         # 获取程序目录
@@ -23,27 +186,104 @@ class FFmpegManager:
             self.base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
         self.ffmpeg_dir = os.path.join(self.base_path, 'ffmpeg')
-        self.ffmpeg_exe = os.path.join(self.ffmpeg_dir, 'bin', 'ffmpeg.exe')
+        self.ffmpeg_exe = os.path.join(
+            self.ffmpeg_dir, 'bin', 'ffmpeg.exe' if sys.platform == 'win32' else 'ffmpeg'
+        )
+        # 未完成的下载，中断后再次下载时从这里续传
+        self.download_dir = os.path.join(self.base_path, 'ffmpeg_download')
+        self.probe_cache_path = os.path.join(self.base_path, 'data', 'ffmpeg_probe.json')
+        
+        self._lock = threading.Lock()
+        self._capabilities: Optional[FFmpegCapabilities] = None
+        self._probed = False
+        self._probed_at = 0.0
     
-    def is_available(self) -> bool:
-        """检查FFmpeg是否可用"""
-        # 检查本地便携版
+    def _find_ffmpeg(self) -> Optional[str]:
+        """本地便携版优先，其次系统PATH"""
         if os.path.exists(self.ffmpeg_exe):
-            return True
+            return self.ffmpeg_exe
+        return shutil.which('ffmpeg')
+    
+    def probe(self) -> Optional[FFmpegCapabilities]:
+        """
+        获取FFmpeg能力
+        
+        首次调用时查找 ffmpeg，磁盘上有同一二进制文件（路径、修改时间、大小相同）的
+        探测结果时直接读取，否则运行 ffmpeg 探测并保存。之后的调用只检查
+        二进制文件是否变化，不再查找 PATH 或启动进程。
+        找不到 ffmpeg 时，negative_ttl 秒内直接返回None，之后重新查找。
         
-        # 检查系统PATH
-        return shutil.which('ffmpeg') is not None
+        Returns:
+            FFmpegCapabilities，找不到 ffmpeg 时返回None
+        """
+        capabilities = self._capabilities
+        if capabilities is not None:
+            try:
+                if capabilities.matches(os.stat(capabilities.ffmpeg)):
+                    return capabilities
+            except OSError:
+                pass
+        elif self._probed and time.monotonic() - self._probed_at < self.negative_ttl:
+            return None
+        
+        with self._lock:
+            # 等锁期间其他线程可能已经探测完
+            if self._capabilities is not capabilities or (
+                capabilities is None and self._probed
+                and time.monotonic() - self._probed_at < self.negative_ttl
+            ):
+                return self._capabilities
+            self._capabilities = self._load_capabilities()
+            self._probed = True
+            self._probed_at = time.monotonic()
+            return self._capabilities
     
-    def get_ffmpeg_path(self) -> Optional[str]:
-        """获取FFmpeg路径"""
-        if os.path.exists(self.ffmpeg_exe):
-            return os.path.join(self.ffmpeg_dir, 'bin')
+    def invalidate(self):
+        """丢弃缓存的探测结果，下次 probe() 重新查找（安装或更新 FFmpeg 后调用）"""
+        with self._lock:
+            self._capabilities = None
+            self._probed = False
+    
+    def _load_capabilities(self) -> Optional[FFmpegCapabilities]:
+        ffmpeg = self._find_ffmpeg()
+        if ffmpeg is None:
+            return None
+        ffmpeg = os.path.abspath(ffmpeg)
+        try:
+            stat = os.stat(ffmpeg)
+        except OSError:
+            return None
         
-        system_ffmpeg = shutil.which('ffmpeg')
-        if system_ffmpeg:
-            return os.path.dirname(system_ffmpeg)
+        try:
+            with open(self.probe_cache_path, 'r', encoding='utf-8') as f:
+                cached = FFmpegCapabilities.from_dict(json.load(f))
+            if cached.ffmpeg == ffmpeg and cached.matches(stat):
+                return cached
+        except (FileNotFoundError, KeyError):
+            # 没有缓存，或旧版缓存缺少字段：重新探测
+            pass
+        except Exception as e:
+            print(f"读取FFmpeg探测缓存失败: {e}")
         
-        return None
+        capabilities = FFmpegCapabilities.probe(ffmpeg, stat)
+        try:
+            os.makedirs(os.path.dirname(self.probe_cache_path), exist_ok=True)
+            tmp_path = self.probe_cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(capabilities.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.probe_cache_path)
+        except Exception as e:
+            print(f"保存FFmpeg探测缓存失败: {e}")
+        return capabilities
+    
+    def is_available(self) -> bool:
+        """检查FFmpeg是否可用"""
+        return self.probe() is not None
+    
+    def get_ffmpeg_path(self) -> Optional[str]:
+        """获取FFmpeg路径"""
+        capabilities = self.probe()
+        return capabilities.location if capabilities is not None else None
     
     def setup_environment(self):
         """设置FFmpeg环境变量"""
@@ -56,51 +296,34 @@ class FFmpegManager:
             return True
         return False
     
-    def download_ffmpeg(self, progress_callback=None) -> bool:
+    def download_ffmpeg(self, progress_callback=None, build=None) -> bool:
         """
         下载FFmpeg便携版
         
+        边下载边解压，只保留 ffmpeg/ffprobe，压缩包按发布方的 SHA-256 校验；
+        下载中断后再次调用从已下载的位置继续。
+        
         Args:
             progress_callback: 进度回调函数，参数为(downloaded, total)
-            
+            build: 要安装的便携版（FFmpegBuild），默认按当前系统和CPU架构选择
+        
         Returns:
             是否下载成功
         """
+        from .ffmpeg_installer import default_build, install
+        
+        build = build or default_build()
+        if build is None:
+            print(f"当前平台没有可下载的FFmpeg便携版: {sys.platform}")
+            return False
+        
         try:
-            zip_path = os.path.join(self.base_path, 'ffmpeg_temp.zip')
-            
-            # 下载
-            def report_progress(block_num, block_size, total_size):
-                if progress_callback:
-                    downloaded = block_num * block_size
-                    progress_callback(downloaded, total_size)
-            
             print("正在下载 FFmpeg...")
-            urllib.request.urlretrieve(
-                self.FFMPEG_URL,
-                zip_path,
-                reporthook=report_progress
-            )
-            
-            # 解压
-            print("正在解压 FFmpeg...")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # 获取压缩包内的根目录名
-                root_dir = zip_ref.namelist()[0].split('/')[0]
-                zip_ref.extractall(self.base_path)
-            
-            # 重命名目录
-            extracted_dir = os.path.join(self.base_path, root_dir)
-            if os.path.exists(self.ffmpeg_dir):
-                shutil.rmtree(self.ffmpeg_dir)
-            os.rename(extracted_dir, self.ffmpeg_dir)
-            
-            # 清理临时文件
-            os.remove(zip_path)
-            
+            install(build, self.ffmpeg_dir, self.download_dir, progress_callback)
+            self.invalidate()
             print("FFmpeg 安装完成！")
             return True
-            
+        
         except Exception as e:
             print(f"下载FFmpeg失败: {e}")
             return False
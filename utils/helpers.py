@@ -4,6 +4,7 @@
 import os
 import re
 from datetime import timedelta
+from urllib.parse import urlsplit, parse_qsl, urlencode
 
 
 def format_size(bytes_size: int) -> str:
@@ -76,6 +77,123 @@ def detect_platform(url: str) -> str:
         return '其他平台'
 
 
+# 不影响视频内容的跟踪/分享参数
+_TRACKING_PARAMS = {
+    'feature', 'si', 'pp', 'ab_channel', 'spm_id_from', 'vd_source',
+    'share_source', 'share_medium', 'share_plat', 'share_session_id',
+    'share_tag', 'share_from', 'bbid', 'ts', 'from_spmid', 'unique_k',
+    'fbclid', 'gclid', 'igshid',
+}
+
+_YOUTUBE_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_YOUTUBE_PATH = re.compile(r'^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})')
+_BILIBILI_PATH = re.compile(r'/video/(BV[0-9A-Za-z]{10}|av\d+)', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """
+    将视频链接归一化为规范ID，用于判断是否重复下载
+    
+    同一视频的不同写法（短链接、移动版、附带分享参数等）得到相同的结果，
+    例如 youtu.be/ID、m.youtube.com/watch?v=ID 都归一化为 youtube:ID。
+    不发起任何网络请求，b23.tv 短链接按短码归一化；短链接与 BV 号链接
+    的对应关系要解析后才知道，由历史记录同时索引解析得到的 webpage_url 解决。
+    
+    Args:
+        url: 视频链接
+    
+    Returns:
+        规范ID字符串，无法识别的平台返回去除跟踪参数后的URL
+    """
+    url = url.strip()
+    parts = urlsplit(url if '://' in url else 'https://' + url)
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = dict(query)
+    
+    if host == 'youtu.be':
+        video_id = parts.path.strip('/').split('/')[0]
+        if _YOUTUBE_ID.match(video_id):
+            return f'youtube:{video_id}'
+    elif host.endswith('youtube.com') or host == 'youtube-nocookie.com':
+        video_id = params.get('v', '')
+        if _YOUTUBE_ID.match(video_id):
+            return f'youtube:{video_id}'
+        match = _YOUTUBE_PATH.match(parts.path)
+        if match:
+            return f'youtube:{match.group(1)}'
+    elif host.endswith('bilibili.com'):
+        match = _BILIBILI_PATH.search(parts.path)
+        if match:
+            video_id = match.group(1)
+            # BV号区分大小写，av号统一为小写
+            video_id = 'BV' + video_id[2:] if video_id[:2].upper() == 'BV' else video_id.lower()
+            page = params.get('p', '1')
+            if page.isdigit() and int(page) > 1:
+                return f'bilibili:{video_id}?p={int(page)}'
+            return f'bilibili:{video_id}'
+    elif host == 'b23.tv':
+        code = parts.path.strip('/').split('/')[0]
+        if code:
+            return f'b23:{code}'
+    
+    # 其它平台：小写主机名，去掉片段和跟踪参数，参数排序
+    query = sorted(
+        (k, v) for k, v in query
+        if k not in _TRACKING_PARAMS and not k.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    normalized = f'{host}{path}'
+    if query:
+        normalized += '?' + urlencode(query)
+    return normalized
+
+
+# 同一站点的不同域名共用并发配额和限速
+HOST_ALIASES = {
+    'youtu.be': 'youtube.com',
+    'b23.tv': 'bilibili.com',
+}
+
+
+def host_key(url: str) -> str:
+    """获取URL用于并发限制和站点限速的主机键"""
+    host = (urlsplit(url).hostname or '').lower()
+    for alias, canonical in HOST_ALIASES.items():
+        if host == alias or host.endswith('.' + alias):
+            return canonical
+    for canonical in set(HOST_ALIASES.values()):
+        if host == canonical or host.endswith('.' + canonical):
+            return canonical
+    return host
+
+
+_YOUTUBE_LIST_PATH = re.compile(r'^/(?:playlist|channel/|c/|user/|@)')
+_BILIBILI_LIST_PATH = re.compile(r'/(?:medialist|list|favlist)/')
+
+
+def is_playlist_url(url: str) -> bool:
+    """
+    根据链接格式判断是否为播放列表或频道，不发起网络请求
+    
+    同时带有视频ID的链接（如 watch?v=ID&list=...）视为单个视频。
+    """
+    parts = urlsplit(url if '://' in url else 'https://' + url)
+    host = (parts.hostname or '').lower()
+    params = dict(parse_qsl(parts.query))
+    
+    if host.endswith('youtube.com'):
+        if 'v' in params:
+            return False
+        return bool(_YOUTUBE_LIST_PATH.match(parts.path)) or 'list' in params
+    if host.endswith('bilibili.com'):
+        return host == 'space.bilibili.com' or bool(_BILIBILI_LIST_PATH.search(parts.path))
+    return False
+
+
 def is_valid_url(url: str) -> bool:
     """验证URL格式"""
     url_pattern = re.compile(
@@ -3,15 +3,55 @@
 """
 import json
 import os
+import queue
+import sqlite3
 import sys
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from .helpers import normalize_url
+
+
+# 历史记录字段（旧版 JSON 文件中的字段，加上解析得到的规范链接 webpage_url）
+FIELDS = (
+    'id', 'url', 'title', 'platform', 'filepath', 'thumbnail',
+    'duration', 'quality', 'status', 'download_time', 'webpage_url',
+)
+
 
 class HistoryManager:
-    """下载历史管理器"""
+    """下载历史管理器
+    
+    历史记录保存在 SQLite 数据库（WAL 模式）中，url / platform / download_time
+    建有索引，标题使用 FTS5 trigram 全文索引，支持任意子串搜索。
+    旧版的 download_history.json 会在首次加载时自动迁移。
+    
+    add_record 只把记录放入队列，由单独的写入线程合并成批量事务写入，
+    下载线程不会阻塞在磁盘IO上；退出前需调用 close() 保证全部写入。
     
-    def __init__(self):
+    已完成的下载按 normalize_url 的规范ID建立内存索引，is_downloaded
+    可以在不访问网络和数据库的情况下判断链接是否已下载过。提交的链接
+    和解析得到的 webpage_url 都会加入索引，短链接与完整链接可以互相去重。
+    """
+    
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_records: Optional[int] = 500,
+        batch_size: int = 50,
+        flush_interval: float = 0.2
+    ):
+        """
+        初始化历史管理器
+        
+        Args:
+            db_path: 数据库文件路径，默认为 data/download_history.db
+            max_records: 最多保留的记录数，None 表示不限制
+            batch_size: 累积多少条记录后立即写入
+            flush_interval: 第一条待写记录最多等待的秒数
+        """
         # 获取数据目录
         if getattr(sys, 'frozen', False):
             base_path = os.path.dirname(sys.executable)
@@ -19,32 +59,162 @@ class HistoryManager:
             base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
         self.data_dir = os.path.join(base_path, 'data')
-        self.history_file = os.path.join(self.data_dir, 'download_history.json')
+        self.db_path = db_path or os.path.join(self.data_dir, 'download_history.db')
+        # 旧版JSON历史文件，与数据库位于同一目录
+        self.history_file = os.path.join(os.path.dirname(self.db_path), 'download_history.json')
+        self.max_records = max_records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
         
         # 确保数据目录存在
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._fts = False
+        self._count = 0
+        # 规范ID -> 最近一次下载的文件路径；修改时持有 _index_lock，
+        # 需要同时持有 _lock 时先取 _lock
+        self._downloaded: Dict[str, str] = {}
+        self._index_lock = threading.Lock()
         
-        # 加载历史记录
-        self.history: List[Dict] = self._load_history()
+        # 写入队列，元素为待插入的记录元组、用于 flush 的 Event 或表示关闭的 None
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        # 已加入但还未写入数据库的记录数，包括写入线程已取出、正在等待凑批的记录
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        
+        # 在后台线程打开数据库（含旧数据迁移），避免阻塞程序启动
+        self._loaded = threading.Event()
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
     
-    def _load_history(self) -> List[Dict]:
-        """加载历史记录"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
-    
-    def _save_history(self):
-        """保存历史记录"""
+    def _load_in_background(self):
+        """后台打开数据库"""
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            self._open()
         except Exception as e:
-            print(f"保存历史记录失败: {e}")
+            print(f"加载历史记录失败: {e}")
+        finally:
+            self._loaded.set()
+    
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """等待历史记录加载完成"""
+        return self._loaded.wait(timeout)
+    
+    def _open(self):
+        """打开数据库、建表并迁移旧版JSON"""
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript('''
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                title TEXT,
+                platform TEXT,
+                filepath TEXT,
+                thumbnail TEXT,
+                duration REAL,
+                quality TEXT,
+                status TEXT,
+                download_time TEXT NOT NULL,
+                webpage_url TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_url ON history(url);
+            CREATE INDEX IF NOT EXISTS idx_history_platform ON history(platform);
+            CREATE INDEX IF NOT EXISTS idx_history_time ON history(download_time);
+        ''')
+        # 旧版数据库没有 webpage_url 列
+        columns = {row[1] for row in db.execute('PRAGMA table_info(history)')}
+        if 'webpage_url' not in columns:
+            db.execute('ALTER TABLE history ADD COLUMN webpage_url TEXT')
+            db.commit()
+        
+        # 标题全文索引，trigram 分词支持中文等任意子串匹配
+        try:
+            db.executescript('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+                    title, content='history', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                    INSERT INTO history_fts(rowid, title) VALUES (new.id, new.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, title) VALUES ('delete', old.id, old.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_au AFTER UPDATE OF title ON history BEGIN
+                    INSERT INTO history_fts(history_fts, rowid, title) VALUES ('delete', old.id, old.title);
+                    INSERT INTO history_fts(rowid, title) VALUES (new.id, new.title);
+                END;
+            ''')
+            self._fts = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或版本过旧时退回 LIKE 搜索
+            self._fts = False
+        
+        with self._lock:
+            self._db = db
+            self._migrate_json()
+            self._count = db.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+            self._build_index()
+    
+    def _build_index(self):
+        """根据已完成的记录建立去重索引（需持有锁）"""
+        index = {}
+        for url, webpage_url, filepath in self._db.execute(
+            "SELECT url, webpage_url, filepath FROM history WHERE status = 'completed' ORDER BY id"
+        ):
+            for key in self._keys(url, webpage_url):
+                index[key] = filepath or ''
+        # 保留加载期间 add_record 加入的条目
+        with self._index_lock:
+            index.update(self._downloaded)
+            self._downloaded = index
+    
+    @staticmethod
+    def _keys(url: str, webpage_url: Optional[str] = None) -> set:
+        """记录在去重索引中的规范ID：提交的链接和解析得到的 webpage_url"""
+        keys = {normalize_url(url)}
+        if webpage_url:
+            keys.add(normalize_url(webpage_url))
+        return keys
+    
+    def _migrate_json(self):
+        """将旧版JSON历史导入数据库（需持有锁）"""
+        if not os.path.exists(self.history_file):
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except Exception:
+            records = []
+        
+        # JSON 中新记录在前，倒序插入使自增ID与时间顺序一致
+        self._db.executemany(
+            'INSERT INTO history (url, title, platform, filepath, thumbnail, '
+            'duration, quality, status, download_time, webpage_url) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (
+                    r.get('url', ''), r.get('title'), r.get('platform'),
+                    r.get('filepath'), r.get('thumbnail'), r.get('duration'),
+                    r.get('quality'), r.get('status', 'completed'),
+                    r.get('download_time') or datetime.now().isoformat(),
+                    r.get('webpage_url'),
+                )
+                for r in reversed(records)
+            ]
+        )
+        self._db.commit()
+        os.replace(self.history_file, self.history_file + '.migrated')
+    
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        return {key: row[key] for key in FIELDS}
     
     def add_record(
         self,
@@ -55,7 +225,8 @@ class HistoryManager:
         thumbnail: Optional[str] = None,
         duration: Optional[int] = None,
         quality: Optional[str] = None,
-        status: str = 'completed'
+        status: str = 'completed',
+        webpage_url: Optional[str] = None
     ):
         """
         添加下载记录
@@ -69,50 +240,308 @@ class HistoryManager:
             duration: 视频时长(秒)
             quality: 下载质量
             status: 状态 (completed/failed)
+            webpage_url: 解析得到的视频页面链接，与 url 不同时（如短链接）一并用于去重
+        """
+        if self._closed:
+            print("保存历史记录失败: 历史管理器已关闭")
+            return
+        if status == 'completed':
+            with self._index_lock:
+                for key in self._keys(url, webpage_url):
+                    self._downloaded[key] = filepath or ''
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put((
+            url, title, platform, filepath, thumbnail, duration, quality,
+            status, datetime.now().isoformat(), webpage_url
+        ))
+    
+    def _writer_loop(self):
+        """写入线程：合并队列中的记录，每批一个事务"""
+        self.wait_loaded()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    # flush 请求：立即写入已收集的记录
+                    waiters.append(item)
+                    break
+                if item is None:
+                    # 关闭请求：写完本批后退出
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                self._write_batch(batch)
+                with self._pending_lock:
+                    self._pending -= len(batch)
+            for event in waiters:
+                event.set()
+    
+    def _write_batch(self, batch: List[tuple]):
+        """在一个事务中写入一批记录"""
+        with self._lock:
+            if self._db is None:
+                print("保存历史记录失败: 历史记录数据库未打开")
+                return
+            try:
+                with self._db:
+                    self._db.executemany(
+                        'INSERT INTO history (url, title, platform, filepath, thumbnail, '
+                        'duration, quality, status, download_time, webpage_url) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        batch
+                    )
+                    self._count += len(batch)
+                    self._enforce_retention()
+            except sqlite3.Error as e:
+                print(f"保存历史记录失败: {e}")
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已添加的记录全部写入
+        
+        Returns:
+            是否在超时前完成
+        """
+        if not self._writer.is_alive():
+            return self._queue.empty()
+        event = threading.Event()
+        self._queue.put(event)
+        return event.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = 5.0):
+        """写入所有待写记录并关闭数据库"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def _sync(self) -> bool:
+        """
+        读取前等待数据库加载完成，并写入之前添加的记录
+        
+        Returns:
+            数据库是否可用，加载失败或已关闭时为 False
+        """
+        self.wait_loaded()
+        if self._db is None:
+            return False
+        if self._pending:
+            self.flush()
+        return True
+    
+    def _enforce_retention(self):
+        """超出保留数量时删除最旧的记录（需持有锁）"""
+        if self.max_records is None:
+            return
+        # 留出 10% 余量，批量删除，避免每次插入都触发清理
+        if self._count <= self.max_records + self.max_records // 10:
+            return
+        self._prune(self.max_records)
+    
+    def _prune(self, keep: int):
+        """只保留最新的 keep 条记录，被删除的下载同时移出去重索引（需持有锁）"""
+        if keep > 0:
+            row = self._db.execute(
+                'SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?', (keep - 1,)
+            ).fetchone()
+            if row is None:
+                return
+            where, params = 'id < ?', (row[0],)
+        else:
+            where, params = '1', ()
+        
+        removed = set()
+        for url, webpage_url in self._db.execute(
+            f"SELECT url, webpage_url FROM history WHERE {where} AND status = 'completed'", params
+        ):
+            removed |= self._keys(url, webpage_url)
+        self._db.execute(f'DELETE FROM history WHERE {where}', params)
+        self._count = self._db.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+        
+        self._forget(removed)
+    
+    def _forget(self, removed: set):
+        """
+        记录删除后更新去重索引（需持有锁）
+        
+        同一视频可能还有其他已完成的记录，这些规范ID改为指向其中最近一次下载的文件，
+        没有其他记录的才移出索引。
+        
+        Args:
+            removed: 被删除的已完成记录的规范ID
+        """
+        if not removed:
+            return
+        remaining = {}
+        for url, webpage_url, filepath in self._db.execute(
+            "SELECT url, webpage_url, filepath FROM history WHERE status = 'completed' ORDER BY id"
+        ):
+            for key in self._keys(url, webpage_url) & removed:
+                remaining[key] = filepath or ''
+        with self._index_lock:
+            for key in removed:
+                if key in remaining:
+                    self._downloaded[key] = remaining[key]
+                else:
+                    self._downloaded.pop(key, None)
+    
+    def set_max_records(self, max_records: Optional[int]):
+        """设置最多保留的记录数"""
+        if not self._sync():
+            self.max_records = max_records
+            return
+        with self._lock:
+            self.max_records = max_records
+            if max_records is not None and self._count > max_records:
+                # 立即裁剪到上限
+                self._prune(max_records)
+                self._db.commit()
+    
+    def get_history(self, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """获取历史记录（新记录在前）"""
+        if not self._sync():
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT * FROM history ORDER BY id DESC LIMIT ? OFFSET ?',
+                (limit, offset)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def count(self, keyword: Optional[str] = None) -> int:
+        """记录总数，指定关键词时为 search_history 匹配的记录数"""
+        if not self._sync():
+            return 0
+        if not keyword or not keyword.strip():
+            with self._lock:
+                return self._count
+        where, params = self._search_clause(keyword)
+        with self._lock:
+            return self._db.execute(f'SELECT COUNT(*) FROM history WHERE {where}', params).fetchone()[0]
+    
+    def find_by_url(self, url: str) -> List[Dict]:
+        """按URL精确查找记录"""
+        if not self._sync():
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT * FROM history WHERE url = ? ORDER BY id DESC', (url,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def search_history(self, keyword: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """
+        搜索历史记录（标题或平台包含关键词，不区分大小写）
+        
+        Args:
+            keyword: 关键词
+            limit: 最多返回的记录数，None 表示全部
+            offset: 跳过的记录数
+        """
+        if not self._sync():
+            return []
+        where, params = self._search_clause(keyword)
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT * FROM history WHERE {where} ORDER BY id DESC LIMIT ? OFFSET ?',
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def _search_clause(self, keyword: str):
+        """构造搜索条件"""
+        keyword = keyword.strip().lower()
+        
+        # 平台取值很少，先在索引中取出去重后的平台名再匹配
+        with self._lock:
+            platforms = [
+                row[0] for row in self._db.execute(
+                    'SELECT DISTINCT platform FROM history WHERE platform IS NOT NULL'
+                )
+                if keyword in row[0].lower()
+            ]
+        
+        conditions, params = [], []
+        if self._fts and len(keyword) >= 3:
+            # trigram 索引需要至少3个字符
+            conditions.append('id IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)')
+            params.append('"' + keyword.replace('"', '""') + '"')
+        else:
+            conditions.append("LOWER(title) LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if platforms:
+            conditions.append(f"platform IN ({', '.join('?' * len(platforms))})")
+            params.extend(platforms)
+        return ' OR '.join(conditions), params
+    
+    def is_downloaded(self, url: str, check_file: bool = True) -> Optional[str]:
+        """
+        判断链接对应的视频是否已下载过
+        
+        Args:
+            url: 视频链接，任意写法
+            check_file: 是否要求下载的文件仍然存在
+        
+        Returns:
+            已下载文件的路径，未下载过（或文件已删除）时返回 None
         """
-        record = {
-            'id': len(self.history) + 1,
-            'url': url,
-            'title': title,
-            'platform': platform,
-            'filepath': filepath,
-            'thumbnail': thumbnail,
-            'duration': duration,
-            'quality': quality,
-            'status': status,
-            'download_time': datetime.now().isoformat(),
-        }
-        
-        self.history.insert(0, record)  # 新记录在前
-        
-        # 限制历史记录数量
-        if len(self.history) > 500:
-            self.history = self.history[:500]
-        
-        self._save_history()
-    
-    def get_history(self, limit: int = 50) -> List[Dict]:
-        """获取历史记录"""
-        return self.history[:limit]
-    
-    def search_history(self, keyword: str) -> List[Dict]:
-        """搜索历史记录"""
-        keyword = keyword.lower()
-        return [
-            record for record in self.history
-            if keyword in record.get('title', '').lower()
-            or keyword in record.get('platform', '').lower()
-        ]
+        self.wait_loaded()
+        filepath = self._downloaded.get(normalize_url(url))
+        if filepath is None:
+            return None
+        if check_file and not os.path.exists(filepath):
+            return None
+        return filepath
     
     def clear_history(self):
         """清空历史记录"""
-        self.history = []
-        self._save_history()
+        if not self._sync():
+            print("清空历史记录失败: 历史记录数据库未打开")
+            return
+        with self._lock:
+            self._db.execute('DELETE FROM history')
+            self._db.commit()
+            self._count = 0
+            with self._index_lock:
+                self._downloaded.clear()
     
     def delete_record(self, record_id: int):
         """删除单条记录"""
-        self.history = [r for r in self.history if r.get('id') != record_id]
-        self._save_history()
+        if not self._sync():
+            print("删除历史记录失败: 历史记录数据库未打开")
+            return
+        with self._lock:
+            row = self._db.execute(
+                'SELECT url, webpage_url, status FROM history WHERE id = ?', (record_id,)
+            ).fetchone()
+            cursor = self._db.execute('DELETE FROM history WHERE id = ?', (record_id,))
+            self._db.commit()
+            self._count -= cursor.rowcount
+            if row and row[2] == 'completed':
+                self._forget(self._keys(row[0], row[1]))
 
 
 # 全局实例
@@ -0,0 +1,90 @@
+"""
+启动耗时分析 - 统计各模块导入耗时和启动阶段耗时
+"""
+import builtins
+import json
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+class StartupProfiler:
+    """启动耗时分析器
+    
+    通过包装 builtins.__import__ 统计每个顶层包的导入自身耗时
+    （不含它导入的其它顶层包），并记录启动各阶段的时间点。
+    """
+    
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.import_times: Dict[str, float] = {}
+        self.marks: List[Tuple[str, float]] = []
+        self._stack: List[float] = []
+        self._original_import = None
+    
+    def install(self):
+        """开始统计导入耗时"""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+    
+    def uninstall(self):
+        """停止统计导入耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+    
+    def mark(self, name: str):
+        """记录一个启动阶段的完成时间"""
+        self.marks.append((name, time.perf_counter() - self.start_time))
+    
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 相对导入和已加载的模块不计时
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            package = name.split('.')[0]
+            self.import_times[package] = self.import_times.get(package, 0.0) + elapsed - children
+            if self._stack:
+                self._stack[-1] += elapsed
+    
+    def as_dict(self) -> Dict:
+        """返回可序列化的统计结果（单位：毫秒）"""
+        return {
+            'marks': {name: round(t * 1000, 1) for name, t in self.marks},
+            'imports': {
+                name: round(t * 1000, 1)
+                for name, t in sorted(self.import_times.items(), key=lambda x: -x[1])
+            },
+        }
+    
+    def report(self, as_json: bool = False, stream=None, top: int = 15):
+        """
+        输出统计结果
+        
+        Args:
+            as_json: 是否以JSON格式输出
+            stream: 输出流，默认为 stderr
+            top: 表格模式下显示的导入项数量
+        """
+        stream = stream or sys.stderr
+        data = self.as_dict()
+        if as_json:
+            stream.write(json.dumps(data, ensure_ascii=False) + '\n')
+            return
+        
+        stream.write("启动阶段 (累计 ms):\n")
+        for name, ms in data['marks'].items():
+            stream.write(f"  {ms:9.1f}  {name}\n")
+        stream.write(f"导入耗时 (自身 ms, 前 {top} 项):\n")
+        for name, ms in list(data['imports'].items())[:top]:
+            stream.write(f"  {ms:9.1f}  {name}\n")
+        stream.flush()